@@ -0,0 +1,245 @@
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import joblib
+import sklearn
+import xgboost
+from sklearn.decomposition import PCA
+from sklearn.model_selection import GroupKFold
+from sklearn.preprocessing import RobustScaler
+
+from dataset_io import categorical, read_dataset, widen, write_dataset
+from fold_cache import FoldMatrices, fit_pipeline
+from generate_synthetic_motor_csv import synthesize, synthesize_vectorized
+from motor_bundle import BUNDLE_FILENAME, export_bundle
+from motor_student import distill_student
+from perf_stages import StageRecorder
+from score_one_session import load_artifacts, score_features
+from train_motor_model_v2 import (
+    build_xgb, ensure_pc1_direction, infer_column_groups, make_percentile_labels, run_cv_fold, teacher_proba,
+)
+
+# --------------------------
+# End-to-end benchmark of the synthetic -> train -> score pipeline.
+# `run` times every stage at several dataset sizes (each size in a fresh
+# process so peak RSS is not inherited) and writes a JSON baseline;
+# `compare` diffs two such files and exits 1 on regressions.
+# --------------------------
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+MEAN_SESSIONS = 3.5  # synthesize() default 2..5 sessions per participant
+
+def generate(n_sessions, engine, seed):
+    n_participants = math.ceil(n_sessions / MEAN_SESSIONS * 1.1) + 1
+    fn = synthesize_vectorized if engine == "vectorized" else synthesize
+    df = fn(n_participants=n_participants, seed=seed)
+    return df.head(n_sessions).reset_index(drop=True)
+
+def prepare(df, motor_cols, ctx_num_cols, ctx_cat_cols):
+    # Same missing handling as train_motor_model_v2.main
+    keep = (df[motor_cols].isna().mean(axis=1) <= 0.25)
+    df = df.loc[keep].reset_index(drop=True)
+    for c in motor_cols + ctx_num_cols:
+        if df[c].isna().any():
+            df[c] = df[c].fillna(df[c].median())
+    for c in ctx_cat_cols:
+        df[c] = categorical(df[c])
+    return df
+
+def bench_size(opts):
+    n = opts["size"]
+    rec = StageRecorder()
+    work = tempfile.mkdtemp(prefix=f"motor_bench_{n}_", dir=opts["workdir"])
+    outdir = os.path.join(work, "model")
+    for sub in ("models", "preprocess", "reports"):
+        os.makedirs(os.path.join(outdir, sub), exist_ok=True)
+    try:
+        with rec.stage("generate", engine=opts["engine"]):
+            df = generate(n, opts["engine"], opts["seed"])
+
+        for fmt in opts["formats"]:
+            path = os.path.join(work, f"sessions.{fmt}")
+            with rec.stage(f"write_{fmt}"):
+                write_dataset(df, path)
+            with rec.stage(f"load_{fmt}", bytes=os.path.getsize(path)):
+                df = read_dataset(path)
+
+        with rec.stage("infer_column_groups"):
+            motor_cols, ctx_num_cols, ctx_cat_cols = infer_column_groups(df)
+
+        with rec.stage("missing_values"):
+            df = prepare(df, motor_cols, ctx_num_cols, ctx_cat_cols)
+        groups = df["participantId"].astype(str).values
+
+        with rec.stage("pca_fit"):
+            pca_scaler = RobustScaler()
+            X_scaled = pca_scaler.fit_transform(widen(df, motor_cols).values)
+            pca = PCA(n_components=1, random_state=opts["seed"])
+            pc1 = pca.fit_transform(X_scaled).reshape(-1)
+            pc1_aligned, flipped = ensure_pc1_direction(pc1, df[motor_cols])
+
+        with rec.stage("labeling"):
+            y, thresholds = make_percentile_labels(pc1_aligned, cuts=(10, 30, 60))
+
+        # Same fold path as the trainer: per fold a shared prep stage, then fit/predict per model
+        xgb_model = build_xgb()
+        cache = FoldMatrices(df, motor_cols, ctx_num_cols, ctx_cat_cols)
+        splits = list(GroupKFold(n_splits=opts["folds"]).split(df[motor_cols], y, groups))
+        for i, (tr, te) in enumerate(splits, start=1):
+            run_cv_fold(cache, xgb_model, y, tr, te, i, rec)
+        with rec.stage("final_prep"):
+            full = cache.full(xgb_model, y)
+        with rec.stage("final_fit_A"):
+            modelA = fit_pipeline(xgb_model, *full["A"])
+        with rec.stage("final_fit_B"):
+            fit_pipeline(xgb_model, *full["B"])
+        del full
+        with rec.stage("distill"):
+            distill_student(widen(df, motor_cols).values, teacher_proba(modelA, motor_cols), y, groups,
+                            pca_scaler, pca, flipped, seed=opts["seed"])
+
+        with rec.stage("save_artifacts"):
+            joblib.dump(pca_scaler, os.path.join(outdir, "preprocess", "pca_scaler_motor.joblib"))
+            joblib.dump(pca, os.path.join(outdir, "preprocess", "pca_pc1_motor.joblib"))
+            joblib.dump(modelA, os.path.join(outdir, "models", "modelA_motor_only.joblib"))
+            export_bundle(os.path.join(outdir, "models", BUNDLE_FILENAME),
+                          motor_cols, pca_scaler, pca, flipped, thresholds, modelA)
+            with open(os.path.join(outdir, "reports", "training_report.json"), "w") as f:
+                json.dump({"pca": {"motor_feature_columns": motor_cols}}, f)
+
+        X = df[motor_cols].values
+        rows = min(opts["single_rows"], len(X))
+        for kind, bundle in (("joblib", False), ("bundle", True)):
+            with rec.stage(f"load_artifacts_{kind}"):
+                artifacts = load_artifacts(outdir, bundle=bundle)
+            with rec.stage(f"score_single_{kind}", rows=rows) as r:
+                for i in range(rows):
+                    score_features(X[i:i + 1], artifacts)
+            r["meta"]["per_row_ms"] = round(r["wall_s"] / max(rows, 1) * 1e3, 4)
+            with rec.stage(f"score_batch_{kind}", rows=len(X)) as r:
+                score_features(X, artifacts)
+            r["meta"]["per_row_ms"] = round(r["wall_s"] / max(len(X), 1) * 1e3, 4)
+    finally:
+        rec.close()
+        shutil.rmtree(work, ignore_errors=True)
+
+    return {"rows": n, "rows_after_missing": int(len(df)), "stages": {
+        r["name"]: {k: v for k, v in r.items() if k not in ("name", "depth", "start_s")}
+        for r in rec.summary()
+    }}
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+    }
+
+# --------------------------
+# Regression check
+# --------------------------
+
+def compare(baseline, current, threshold, mem_threshold, min_seconds, min_mb):
+    regressions, lines = [], []
+    for size, cur in current["results"].items():
+        base = baseline["results"].get(size)
+        if base is None:
+            continue
+        for stage, c in cur["stages"].items():
+            b = base["stages"].get(stage)
+            if b is None:
+                continue
+            checks = [("wall_s", threshold, min_seconds)]
+            if b.get("peak_rss_mb") is not None and c.get("peak_rss_mb") is not None:
+                checks.append(("peak_rss_mb", mem_threshold, min_mb))
+            for metric, limit, floor in checks:
+                bv, cv = b[metric], c[metric]
+                ratio = cv / bv if bv > 0 else float("inf")
+                bad = ratio > 1 + limit and cv - bv > floor
+                lines.append(f"{size:>8} {stage:<28} {metric:<12} {bv:>12.4f} {cv:>12.4f} {ratio:>7.2f}x{'  REGRESSION' if bad else ''}")
+                if bad:
+                    regressions.append({"size": size, "stage": stage, "metric": metric,
+                                        "baseline": bv, "current": cv, "ratio": round(ratio, 4)})
+    return regressions, lines
+
+def cmd_run(args):
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    opts = {
+        "engine": args.engine, "seed": args.seed, "folds": args.folds,
+        "formats": [f.strip() for f in args.formats.split(",") if f.strip()],
+        "single_rows": args.single_rows,
+        "workdir": args.workdir,
+    }
+    out = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": environment(),
+           "options": {k: v for k, v in opts.items() if k != "workdir"}, "results": {}}
+    for n in sizes:
+        print(f"Benchmarking {n} sessions ...", flush=True)
+        with ProcessPoolExecutor(max_workers=1) as ex:
+            res = ex.submit(bench_size, dict(opts, size=n)).result()
+        out["results"][str(n)] = res
+        for stage, r in res["stages"].items():
+            print(f"  {stage:<28} wall {r['wall_s']:>9.3f}s  cpu {r['cpu_s']:>9.3f}s  peak {r['peak_rss_mb']} MB")
+        # Write after every size so a long run keeps what it finished
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
+    print("Saved:", args.out)
+
+def cmd_compare(args):
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)
+    regressions, lines = compare(baseline, current, args.threshold, args.mem_threshold,
+                                 args.min_seconds, args.min_mb)
+    print(f"{'size':>8} {'stage':<28} {'metric':<12} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above threshold")
+        sys.exit(1)
+    print("\nNo regressions")
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    run = sub.add_parser("run", help="Benchmark every stage and write a JSON baseline")
+    run.add_argument("--out", required=True, help="Results JSON (e.g., bench_baseline.json)")
+    run.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated session counts")
+    run.add_argument("--engine", choices=["loop", "vectorized"], default="loop",
+                     help="Generator used for the synthetic sessions")
+    run.add_argument("--formats", default="csv,parquet", help="Dataset formats to write/load (csv, parquet)")
+    run.add_argument("--folds", type=int, default=5)
+    run.add_argument("--single_rows", type=int, default=200, help="Rows scored one call at a time")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--workdir", default=None, help="Scratch folder for datasets/artifacts (default: temp)")
+
+    cmp_ = sub.add_parser("compare", help="Fail if current results regress against a baseline")
+    cmp_.add_argument("--baseline", required=True)
+    cmp_.add_argument("--current", required=True)
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="Allowed relative wall-time increase")
+    cmp_.add_argument("--mem_threshold", type=float, default=0.10, help="Allowed relative peak-RSS increase")
+    cmp_.add_argument("--min_seconds", type=float, default=0.05, help="Ignore wall-time increases smaller than this")
+    cmp_.add_argument("--min_mb", type=float, default=16.0, help="Ignore peak-RSS increases smaller than this")
+    args = ap.parse_args()
+
+    if args.cmd == "run":
+        cmd_run(args)
+    else:
+        cmd_compare(args)
+
+if __name__ == "__main__":
+    main()
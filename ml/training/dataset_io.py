@@ -0,0 +1,522 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+# --------------------------
+# Session-table columns (CSV header / Parquet schema)
+# --------------------------
+
+ROUND_METRICS = [
+    "nTargets","nHits","nMisses","hitRate",
+    "reactionTime_mean","reactionTime_std","reactionTime_median",
+    "movementTime_mean","movementTime_std","movementTime_median",
+    "interTap_mean","interTap_std","interTap_cv",
+    "errorDist_mean","errorDist_std",
+    "pathLength_mean","pathLength_std",
+    "straightness_mean","straightness_std",
+    "meanSpeed_mean","peakSpeed_mean","speedVar_mean",
+    "meanAccel_mean","peakAccel_mean",
+    "jerkRMS_mean","jerkRMS_std",
+    "submovementCount_mean","submovementCount_std",
+    "overshootCount_mean","overshootCount_std",
+    "ID_mean","throughput_mean","throughput_std",
+]
+
+DELTA_COLS = [
+    "delta_r2_minus_r1_hitRate","delta_r3_minus_r1_hitRate","delta_r3_minus_r2_hitRate",
+    "delta_r2_minus_r1_reactionTime_mean","delta_r3_minus_r1_reactionTime_mean","delta_r3_minus_r2_reactionTime_mean",
+    "delta_r2_minus_r1_movementTime_mean","delta_r3_minus_r1_movementTime_mean","delta_r3_minus_r2_movementTime_mean",
+    "delta_r2_minus_r1_jerkRMS_mean","delta_r3_minus_r1_jerkRMS_mean","delta_r3_minus_r2_jerkRMS_mean",
+    "delta_r2_minus_r1_throughput_mean","delta_r3_minus_r1_throughput_mean","delta_r3_minus_r2_throughput_mean",
+]
+
+def build_columns():
+    cols = [
+        "sessionId","participantId",
+        "game_gameVersion",
+        "r1_speedPxPerFrame","r2_speedPxPerFrame","r3_speedPxPerFrame",
+        "r1_spawnIntervalMs","r2_spawnIntervalMs","r3_spawnIntervalMs",
+        "device_pointerPrimary","device_os","device_browser",
+        "screen_width","screen_height","screen_dpr",
+        "viewportWidth","viewportHeight",
+        "perf_samplingHzTarget","perf_samplingHzEstimated",
+        "perf_avgFrameMs","perf_p95FrameMs","perf_droppedFrames","perf_inputLagMsEstimate",
+        "highContrastMode","reducedMotionPreference",
+        "userInfo_ageBucket","userInfo_gender",
+    ]
+    for r in [1,2,3]:
+        for m in ROUND_METRICS:
+            cols.append(f"r{r}_{m}")
+    cols += DELTA_COLS
+    return cols
+
+# --------------------------
+# Explicit session-table schema (from build_columns())
+# --------------------------
+
+STRING_COLS = {
+    "sessionId", "participantId", "game_gameVersion",
+    "device_pointerPrimary", "device_os", "device_browser",
+    "userInfo_ageBucket", "userInfo_gender",
+}
+
+# Repeated values -> pandas category (sessionId is unique per row and stays str)
+CATEGORY_COLS = STRING_COLS - {"sessionId"}
+
+# Smallest int type per int column (columns with missing values load as float64)
+INT_DTYPES = {
+    **{c: "int32" for c in (
+        "r1_spawnIntervalMs", "r2_spawnIntervalMs", "r3_spawnIntervalMs",
+        "screen_width", "screen_height", "viewportWidth", "viewportHeight",
+        "perf_samplingHzTarget", "perf_droppedFrames",
+    )},
+    "highContrastMode": "int8",
+    "reducedMotionPreference": "int8",
+    **{f"r{r}_{m}": "int16" for r in [1,2,3] for m in ("nTargets", "nHits", "nMisses")},
+}
+INT_COLS = set(INT_DTYPES)
+
+SCHEMA_COLS = set(build_columns())
+
+def column_kind(col):
+    # None for columns outside build_columns(); their dtype is left to inference
+    if col not in SCHEMA_COLS:
+        return None
+    if col in STRING_COLS:
+        return "string"
+    if col in INT_COLS:
+        return "int"
+    return "float"
+
+def csv_dtypes(columns):
+    # Int columns are left to pandas so NaN in real exports still loads (as float);
+    # compact_frame() narrows them afterwards
+    out = {}
+    for c in columns:
+        kind = column_kind(c)
+        if kind == "string":
+            out[c] = "category" if c in CATEGORY_COLS else str
+        elif kind == "float":
+            out[c] = "float64"
+    return out
+
+def arrow_type(col):
+    import pyarrow as pa
+    kind = column_kind(col)
+    if kind == "int":
+        return pa.from_numpy_dtype(np.dtype(INT_DTYPES[col]))
+    return {"string": pa.string(), "float": pa.float64()}.get(kind)
+
+def arrow_schema(columns=None):
+    import pyarrow as pa
+    return pa.schema([(c, arrow_type(c)) for c in (columns or build_columns())])
+
+# --------------------------
+# Compact in-memory representation shared by the generator, trainer and scorer:
+# small ints for counts/flags, category for repeated strings. Metrics stay
+# float64: every numeric column is a model input, and parsing them as float32
+# would change the scalers' input and so the model outputs. widen() turns the
+# int columns back into float64 blocks for the numeric pipeline.
+# --------------------------
+
+def _fits_int(col, dtype):
+    if col.isna().any() or (col.dtype.kind == "f" and not (col % 1 == 0).all()):
+        return False
+    info = np.iinfo(dtype)
+    return not len(col) or (info.min <= col.min() and col.max() <= info.max)
+
+def compact_frame(df: pd.DataFrame):
+    # Columns outside build_columns() are left as they are
+    out = {}
+    for c in df.columns:
+        kind, col = column_kind(c), df[c]
+        if kind == "float" and col.dtype != np.float64:
+            out[c] = col.astype(np.float64)
+        elif kind == "int" and col.dtype != INT_DTYPES[c]:
+            out[c] = col.astype(INT_DTYPES[c] if _fits_int(col, INT_DTYPES[c]) else np.float64)
+        elif kind == "string" and c in CATEGORY_COLS and not isinstance(col.dtype, pd.CategoricalDtype):
+            out[c] = col.astype("category")
+    if out:
+        df = df.assign(**out)
+    return df
+
+def widen(df: pd.DataFrame, columns):
+    # float64 copy of numeric columns for the numeric pipeline
+    return df[columns].astype(np.float64)
+
+def categorical(col: pd.Series):
+    # Category of strings with missing (and literal "nan"/"None") values as
+    # "unknown": same values as astype(str).fillna("unknown").replace(...)
+    if not isinstance(col.dtype, pd.CategoricalDtype):
+        col = col.astype("category")
+    if any(not isinstance(c, str) for c in col.cat.categories):
+        col = col.cat.rename_categories([str(c) for c in col.cat.categories])
+    col = col.cat.remove_categories([c for c in ("nan", "None") if c in col.cat.categories])
+    if "unknown" not in col.cat.categories:
+        col = col.cat.add_categories("unknown")
+    return col.fillna("unknown")
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise SystemExit("Parquet datasets require pyarrow (pip install pyarrow)")
+
+def is_parquet(path):
+    return str(path).lower().endswith((".parquet", ".pq"))
+
+# --------------------------
+# Reading
+# --------------------------
+
+def dataset_columns(path):
+    if is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def _projection(path, columns):
+    if columns is None:
+        return None
+    available = set(dataset_columns(path))
+    return [c for c in columns if c in available]
+
+def read_dataset(path, columns=None):
+    # columns: optional projection; names missing from the file are skipped
+    cols = _projection(path, columns)
+    if is_parquet(path):
+        _require_pyarrow()
+        return compact_frame(pd.read_parquet(path, columns=cols))
+    names = cols if cols is not None else dataset_columns(path)
+    return compact_frame(pd.read_csv(path, usecols=cols, dtype=csv_dtypes(names)))
+
+def iter_dataset(path, columns=None, chunksize=50000):
+    cols = _projection(path, columns)
+    if is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        for batch in pf.iter_batches(batch_size=chunksize, columns=cols):
+            yield compact_frame(batch.to_pandas())
+        return
+    names = cols if cols is not None else dataset_columns(path)
+    for chunk in pd.read_csv(path, usecols=cols, dtype=csv_dtypes(names), chunksize=chunksize):
+        yield compact_frame(chunk)
+
+# --------------------------
+# Writing
+# --------------------------
+
+def to_arrow_table(df: pd.DataFrame):
+    import pyarrow as pa
+    arrays = []
+    for name in df.columns:
+        col, typ = df[name], arrow_type(name)
+        if typ is None:
+            arrays.append(pa.array(col, from_pandas=True))
+            continue
+        if pa.types.is_integer(typ):
+            col = col.astype("Int64")  # nullable, so NaN becomes null
+        elif pa.types.is_floating(typ):
+            col = col.astype(np.float64)
+        elif pa.types.is_string(typ):
+            col = col.astype(object).where(col.notna(), None)
+        arrays.append(pa.array(col, type=typ, from_pandas=True))
+    return pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+
+CSV_WRITE_ROWS = 50000
+PARQUET_ROW_GROUP_ROWS = 16384  # small enough that an indexed lookup decodes little
+
+def write_dataset(df: pd.DataFrame, path, index=True):
+    # index: also (re)build the sidecar session index (<path>.idx)
+    if is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        pq.write_table(to_arrow_table(df), path, row_group_size=PARQUET_ROW_GROUP_ROWS)
+        if index and "sessionId" in df.columns:
+            build_index(path)
+        return
+    with DatasetWriter(path, index=index) as writer:
+        for i in range(0, max(len(df), 1), CSV_WRITE_ROWS):
+            writer.write(df.iloc[i:i + CSV_WRITE_ROWS])
+
+class DatasetWriter:
+    # Appends DataFrame blocks to a CSV or Parquet file (one row group per block).
+    # append=True continues an existing CSV. With index=True the sidecar index
+    # gets one entry per written row as the block is written.
+    def __init__(self, path, append=False, index=True):
+        self.path = path
+        self.parquet = is_parquet(path)
+        self.writer = None
+        self.n_blocks = 0
+        self.index = index
+        self.append = append and os.path.exists(path)
+        if self.parquet:
+            _require_pyarrow()
+            if self.append:
+                raise ValueError("Parquet files cannot be appended to; write a new file")
+        if self.index and self.append:
+            update_index(path)  # index what is already there before appending
+
+    def write(self, df: pd.DataFrame):
+        indexed = self.index and "sessionId" in df.columns
+        if self.parquet:
+            import pyarrow.parquet as pq
+            table = to_arrow_table(df)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table, row_group_size=max(len(table), 1))
+            if indexed:
+                pos = pd.DataFrame({"row_group": self.n_blocks, "row": np.arange(len(df))})
+                _write_index(self.path, [_index_frame(df, pos)], append=self.n_blocks > 0)
+        else:
+            # Same bytes as df.to_csv(path, mode=...); record spans are taken
+            # from the rendered block so the index needs no re-read
+            first = self.n_blocks == 0 and not self.append
+            data = df.to_csv(index=False, header=first).encode("utf-8")
+            with open(self.path, "wb" if first else "ab") as f:
+                base = f.tell()
+                f.write(data)
+            if indexed:
+                body = len(data.split(b"\n", 1)[0]) + 1 if first else 0
+                starts, ends = _record_spans(data[body:])
+                pos = pd.DataFrame({"offset": base + body + starts, "length": ends - starts})
+                _write_index(self.path, [_index_frame(df, pos)], append=not first)
+        self.n_blocks += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def dataset_ext(path):
+    return ".parquet" if is_parquet(path) else ".csv"
+
+# --------------------------
+# Sidecar session index
+# --------------------------
+# <dataset>.idx is a small CSV with one line per dataset row: sessionId,
+# participantId and where the row lives -- byte offset + length of the CSV
+# record, or (row_group, row) in Parquet. Appending a block appends lines, and
+# rows appended to a CSV by other tools are picked up by scanning only the
+# bytes past the last indexed record. Lookups then seek to the rows instead of
+# parsing the whole table.
+
+INDEX_ID_COLS = ["sessionId", "participantId"]
+CSV_SCAN_BYTES = 64 << 20
+
+def index_path(path):
+    return str(path) + ".idx"
+
+def _position_cols(path):
+    return ["row_group", "row"] if is_parquet(path) else ["offset", "length"]
+
+def _record_spans(buf):
+    # (starts, ends) of the complete records in buf, newline included; a
+    # newline inside a quoted field does not end a record. Blank lines are
+    # dropped (pandas skips them too).
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    ends = np.flatnonzero(arr == 10)
+    quotes = np.flatnonzero(arr == 34)
+    if len(quotes):
+        ends = ends[np.searchsorted(quotes, ends) % 2 == 0]
+    ends = ends + 1
+    starts = np.concatenate([[0], ends[:-1]]).astype(ends.dtype)
+    eol = 1 + ((ends - starts >= 2) & (arr[np.maximum(ends - 2, 0)] == 13))
+    keep = ends - starts > eol
+    return starts[keep], ends[keep]
+
+def _index_frame(ids, positions):
+    # ids: frame with (some of) INDEX_ID_COLS; positions: frame of position columns
+    out = pd.DataFrame({
+        c: (ids[c].astype(str).to_numpy() if c in ids else np.full(len(positions), "", dtype=object))
+        for c in INDEX_ID_COLS
+    })
+    for c in positions.columns:
+        out[c] = positions[c].to_numpy(dtype=np.int64)
+    return out
+
+def _scan_csv(path, start=None):
+    # Index frames for the records from byte `start` (default: first data row) to EOF
+    with open(path, "rb") as f:
+        header = f.readline()
+        names = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+        id_cols = [c for c in INDEX_ID_COLS if c in names]
+        pos = len(header) if start is None else start
+        f.seek(pos)
+        carry = b""
+        while True:
+            data = f.read(CSV_SCAN_BYTES)
+            buf = carry + data
+            if data:
+                starts, ends = _record_spans(buf)
+            elif buf.strip():
+                # Last record without a trailing newline (after any blank lines)
+                starts, ends = np.array([len(buf) - len(buf.lstrip(b"\r\n"))]), np.array([len(buf)])
+            else:
+                return
+            if len(ends):
+                used = int(ends[-1])
+                ids = pd.read_csv(io.BytesIO(header + buf[:used] + b"\n"), usecols=id_cols,
+                                  dtype=str, keep_default_na=False)
+                if len(ids) != len(starts):
+                    raise ValueError(f"{path}: CSV records and parsed rows disagree; cannot index")
+                yield _index_frame(ids, pd.DataFrame({"offset": pos + starts, "length": ends - starts}))
+                carry = buf[used:]
+                pos += used
+            else:
+                carry = buf
+            if not data:
+                return
+
+def _scan_parquet(path):
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(path)
+    id_cols = [c for c in INDEX_ID_COLS if c in pf.schema_arrow.names]
+    for g in range(pf.num_row_groups):
+        ids = pf.read_row_group(g, columns=id_cols).to_pandas()
+        n = pf.metadata.row_group(g).num_rows
+        yield _index_frame(ids, pd.DataFrame({"row_group": np.full(n, g), "row": np.arange(n)}))
+
+def _write_index(path, frames, append=False):
+    mode = "a" if append and os.path.exists(index_path(path)) else "w"
+    with open(index_path(path), mode, encoding="utf-8", newline="") as f:
+        if mode == "w":
+            pd.DataFrame(columns=INDEX_ID_COLS + _position_cols(path)).to_csv(f, index=False)
+        for frame in frames:
+            frame.to_csv(f, index=False, header=False)
+
+def _read_index(path):
+    dtypes = {**{c: str for c in INDEX_ID_COLS}, **{c: np.int64 for c in _position_cols(path)}}
+    idx = pd.read_csv(index_path(path), dtype=dtypes, keep_default_na=False)
+    if list(idx.columns) != list(dtypes):
+        raise ValueError(f"{index_path(path)}: unexpected columns {list(idx.columns)}")
+    return idx
+
+def build_index(path):
+    if is_parquet(path):
+        _require_pyarrow()
+        _write_index(path, _scan_parquet(path))
+    else:
+        _write_index(path, _scan_csv(path))
+    return _read_index(path)
+
+def _csv_covered(path, idx):
+    # Bytes of the CSV the index accounts for (header included)
+    if len(idx):
+        return int(idx["offset"].iloc[-1] + idx["length"].iloc[-1])
+    with open(path, "rb") as f:
+        return len(f.readline())
+
+def current_index(path):
+    # The dataset's index if it exists and covers the whole file, else None.
+    # Read-only: nothing is built or extended (see update_index)
+    if not os.path.exists(index_path(path)):
+        return None
+    try:
+        idx = _read_index(path)
+    except (ValueError, pd.errors.ParserError):
+        return None
+    if is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        return idx if len(idx) == pq.ParquetFile(path).metadata.num_rows else None
+    return idx if _csv_covered(path, idx) == os.path.getsize(path) else None
+
+def update_index(path):
+    # The dataset's index, built if missing and extended if the CSV has grown
+    if not os.path.exists(index_path(path)):
+        return build_index(path)
+    try:
+        idx = _read_index(path)
+    except (ValueError, pd.errors.ParserError):
+        return build_index(path)
+    if is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        return idx if len(idx) == pq.ParquetFile(path).metadata.num_rows else build_index(path)
+
+    size = os.path.getsize(path)
+    covered = _csv_covered(path, idx)
+    if covered > size:
+        return build_index(path)  # file was rewritten shorter
+    if covered == size:
+        return idx
+    tail = list(_scan_csv(path, covered))
+    if not tail:
+        return idx
+    _write_index(path, tail, append=True)
+    return pd.concat([idx] + tail, ignore_index=True)
+
+def _read_positions(path, hits, cols):
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        parts = []
+        for g, rows in hits.groupby("row_group", sort=False)["row"]:
+            parts.append(pf.read_row_group(int(g), columns=cols).take(rows.to_numpy()).to_pandas())
+        return pd.concat(parts, ignore_index=True)
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        records = []
+        for offset, length in zip(hits["offset"], hits["length"]):
+            f.seek(offset)
+            rec = f.read(length)
+            records.append(rec if rec.endswith(b"\n") else rec + b"\n")
+    names = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+    return pd.read_csv(io.BytesIO(header + b"".join(records)), usecols=cols,
+                       dtype=csv_dtypes(cols if cols is not None else names))
+
+def _select(idx, session_ids, participant_ids, rows):
+    mask = np.zeros(len(idx), dtype=bool)
+    if session_ids is not None:
+        mask |= idx["sessionId"].isin([str(s) for s in session_ids]).to_numpy()
+    if participant_ids is not None:
+        mask |= idx["participantId"].isin([str(p) for p in participant_ids]).to_numpy()
+    if rows is not None:
+        rows = np.asarray(rows, dtype=np.int64)
+        mask[rows[(rows >= 0) & (rows < len(idx))]] = True
+    return idx[mask]
+
+def _read_hits(path, hits, cols):
+    # None when the rows found at the indexed positions are not the indexed sessions
+    check = "sessionId" in dataset_columns(path)
+    read_cols = cols if cols is None or not check or "sessionId" in cols else cols + ["sessionId"]
+    if hits.empty:
+        names = read_cols if read_cols is not None else dataset_columns(path)
+        return compact_frame(pd.DataFrame({c: pd.Series(dtype=object) for c in names}))
+    df = _read_positions(path, hits, read_cols)
+    if check and df["sessionId"].astype(str).tolist() != hits["sessionId"].tolist():
+        return None
+    if read_cols is not cols:
+        df = df.drop(columns=["sessionId"])
+    return compact_frame(df)
+
+def read_indexed(path, session_ids=None, participant_ids=None, rows=None, columns=None, index=None,
+                 rebuild=True):
+    # Rows selected by sessionId, participantId and/or position (0-based), in
+    # file order, read through the sidecar index (built/updated when not
+    # given). Unknown ids are skipped. rebuild=False never writes the index:
+    # a stale one raises ValueError instead of being rebuilt.
+    idx = update_index(path) if index is None else index
+    cols = _projection(path, columns)
+    df = _read_hits(path, _select(idx, session_ids, participant_ids, rows), cols)
+    if df is None:
+        if not rebuild:
+            raise ValueError(f"{index_path(path)} does not match {path}")
+        # Dataset rewritten in place since the index was made: rebuild once
+        idx = build_index(path)
+        df = _read_hits(path, _select(idx, session_ids, participant_ids, rows), cols)
+        if df is None:
+            raise ValueError(f"{index_path(path)} does not match {path}")
+    return df
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import sklearn
+import xgboost as xgb
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, RobustScaler
+
+from dataset_io import widen
+
+# --------------------------
+# Shared preprocessing for Model A / Model B.
+# RobustScaler works column by column, so the motor block of Model B's scaled
+# numeric matrix is exactly Model A's input: one ColumnTransformer fit per set
+# of rows serves both models. The one-hot context block stays sparse; the
+# assembled Model B matrix is sparse or dense by ColumnTransformer's own
+# sparse_threshold rule (XGBoost reads CSR zeros as missing, so forcing either
+# layout would change the trees). Each training matrix becomes one
+# QuantileDMatrix, trained with xgb.train exactly as XGBClassifier.fit would.
+# --------------------------
+
+class FixedRobustScaler(RobustScaler):
+    # RobustScaler with known statistics (e.g. streamed quantiles): fit() takes
+    # center/scale as given and only records X's width and column names;
+    # transform() is RobustScaler's
+    def __init__(self, center=None, scale=None):
+        super().__init__()
+        self.center = center
+        self.scale = scale
+
+    def fit(self, X, y=None):
+        self.center_ = np.asarray(self.center, dtype=np.float64)
+        self.scale_ = np.asarray(self.scale, dtype=np.float64)
+        if X.shape[1] != len(self.center_) or self.scale_.shape != self.center_.shape:
+            raise ValueError(f"Expected {len(self.center_)} columns of statistics, got X with {X.shape[1]}")
+        self.n_features_in_ = X.shape[1]
+        if hasattr(X, "columns"):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        return self
+
+    def __reduce__(self):
+        # Saved as a plain fitted RobustScaler, so model files load with
+        # sklearn alone (no import of this module)
+        state = self.__getstate__()
+        state.pop("center")
+        state.pop("scale")
+        state["_sklearn_version"] = sklearn.__version__
+        return (RobustScaler, (), state)
+
+def make_preprocessor_B(numeric_cols, categorical_cols):
+    return ColumnTransformer(
+        transformers=[
+            ("num", RobustScaler(), numeric_cols),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical_cols),
+        ],
+        remainder="drop",
+    )
+
+def xgb_train_params(model):
+    # XGBClassifier -> params for xgb.train (n_estimators is the round count)
+    return {k: v for k, v in model.get_xgb_params().items() if v is not None}
+
+def quantile_dmatrix(model, X, y, ref=None):
+    # What XGBClassifier.fit builds for its training / eval sets
+    return xgb.QuantileDMatrix(X, label=y, ref=ref, nthread=model.n_jobs, max_bin=model.max_bin)
+
+def train_booster(model, dtrain, num_boost_round=None, dval=None, early_stopping_rounds=None):
+    evals = [(dval, "validation_0")] if dval is not None else []
+    return xgb.train(
+        xgb_train_params(model), dtrain,
+        num_boost_round=model.n_estimators if num_boost_round is None else num_boost_round,
+        evals=evals, early_stopping_rounds=early_stopping_rounds, verbose_eval=False,
+    )
+
+def predict_labels(booster, X, iteration_range=(0, 0)):
+    return np.argmax(booster.inplace_predict(X, iteration_range=iteration_range), axis=1)
+
+def booster_classifier(model, booster):
+    # Unfitted XGBClassifier template + trained booster -> fitted classifier
+    clf = clone(model)
+    clf.load_model(bytearray(booster.save_raw("json")))
+    return clf
+
+class FoldMatrices:
+    # Model A/B design matrices for row subsets of one dataset
+    def __init__(self, df, motor_cols, ctx_num_cols, ctx_cat_cols):
+        self.df = df
+        self.motor_cols = motor_cols
+        self.numeric_cols = motor_cols + ctx_num_cols
+        self.categorical_cols = ctx_cat_cols
+        self.n_motor = len(motor_cols)
+
+    def _rows(self, rows):
+        # Model B's input columns for these rows; compact int columns are
+        # widened here, one fold at a time
+        X = self.df if rows is None else self.df.iloc[rows]
+        return pd.concat([widen(X, self.numeric_cols), X[self.categorical_cols]], axis=1)
+
+    def _split(self, XB):
+        # (Model A matrix, Model B matrix); A is a view when B is dense
+        XA = XB[:, :self.n_motor]
+        return (XA.toarray() if sparse.issparse(XA) else XA), XB
+
+    def fit_transform(self, rows=None):
+        prep = make_preprocessor_B(self.numeric_cols, self.categorical_cols)
+        return (prep,) + self._split(prep.fit_transform(self._rows(rows)))
+
+    def transform(self, prep, rows=None):
+        return self._split(prep.transform(self._rows(rows)))
+
+    def fold(self, model, y, tr, te):
+        # One preprocessor fit and one QuantileDMatrix per model for this fold
+        prep, A_tr, B_tr = self.fit_transform(tr)
+        A_te, B_te = self.transform(prep, te)
+        return {
+            "A": (quantile_dmatrix(model, A_tr, y[tr]), A_te),
+            "B": (quantile_dmatrix(model, B_tr, y[tr]), B_te),
+        }
+
+    def full(self, model, y):
+        # Every row: {name: (fitted first pipeline step, QuantileDMatrix)}
+        prep, A, B = self.fit_transform()
+        # Same statistics as B's motor block (RobustScaler is per column), but a
+        # real fit on Model A's own input so the scaler's state is its own
+        scaler_A = RobustScaler().fit(widen(self.df, self.motor_cols))
+        return {
+            "A": (scaler_A, quantile_dmatrix(model, A, y)),
+            "B": (prep, quantile_dmatrix(model, B, y)),
+        }
+
+def fit_pipeline(model, step, dtrain):
+    # Pipeline([step, ("xgb", fitted XGBClassifier)]) as the scorer loads it
+    name = "scaler" if isinstance(step, RobustScaler) else "prep"
+    return Pipeline(steps=[(name, step), ("xgb", booster_classifier(model, train_booster(model, dtrain)))])
@@ -1,55 +1,14 @@
 import os
 import argparse
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 
-# --------------------------
-# CSV Header (your exact schema)
-# --------------------------
-
-ROUND_METRICS = [
-    "nTargets","nHits","nMisses","hitRate",
-    "reactionTime_mean","reactionTime_std","reactionTime_median",
-    "movementTime_mean","movementTime_std","movementTime_median",
-    "interTap_mean","interTap_std","interTap_cv",
-    "errorDist_mean","errorDist_std",
-    "pathLength_mean","pathLength_std",
-    "straightness_mean","straightness_std",
-    "meanSpeed_mean","peakSpeed_mean","speedVar_mean",
-    "meanAccel_mean","peakAccel_mean",
-    "jerkRMS_mean","jerkRMS_std",
-    "submovementCount_mean","submovementCount_std",
-    "overshootCount_mean","overshootCount_std",
-    "ID_mean","throughput_mean","throughput_std",
-]
-
-DELTA_COLS = [
-    "delta_r2_minus_r1_hitRate","delta_r3_minus_r1_hitRate","delta_r3_minus_r2_hitRate",
-    "delta_r2_minus_r1_reactionTime_mean","delta_r3_minus_r1_reactionTime_mean","delta_r3_minus_r2_reactionTime_mean",
-    "delta_r2_minus_r1_movementTime_mean","delta_r3_minus_r1_movementTime_mean","delta_r3_minus_r2_movementTime_mean",
-    "delta_r2_minus_r1_jerkRMS_mean","delta_r3_minus_r1_jerkRMS_mean","delta_r3_minus_r2_jerkRMS_mean",
-    "delta_r2_minus_r1_throughput_mean","delta_r3_minus_r1_throughput_mean","delta_r3_minus_r2_throughput_mean",
-]
-
-def build_columns():
-    cols = [
-        "sessionId","participantId",
-        "game_gameVersion",
-        "r1_speedPxPerFrame","r2_speedPxPerFrame","r3_speedPxPerFrame",
-        "r1_spawnIntervalMs","r2_spawnIntervalMs","r3_spawnIntervalMs",
-        "device_pointerPrimary","device_os","device_browser",
-        "screen_width","screen_height","screen_dpr",
-        "viewportWidth","viewportHeight",
-        "perf_samplingHzTarget","perf_samplingHzEstimated",
-        "perf_avgFrameMs","perf_p95FrameMs","perf_droppedFrames","perf_inputLagMsEstimate",
-        "highContrastMode","reducedMotionPreference",
-        "userInfo_ageBucket","userInfo_gender",
-    ]
-    for r in [1,2,3]:
-        for m in ROUND_METRICS:
-            cols.append(f"r{r}_{m}")
-    cols += DELTA_COLS
-    return cols
+from dataset_io import (
+    DELTA_COLS, ROUND_METRICS, DatasetWriter, build_columns, build_index, compact_frame,
+    dataset_ext, is_parquet, write_dataset,
+)
 
 def synthesize(n_participants=80, min_sessions=2, max_sessions=5, seed=42):
     rng = np.random.default_rng(seed)
@@ -232,22 +191,329 @@ def synthesize(n_participants=80, min_sessions=2, max_sessions=5, seed=42):
             row.update(deltas)
             rows.append(row)
 
-    df = pd.DataFrame(rows, columns=build_columns())
-    return df
+    return compact_frame(pd.DataFrame(rows, columns=build_columns()))
+
+# --------------------------
+# Vectorized engine
+# --------------------------
+
+# Same conditions/categories as synthesize(), shared by the vectorized engine
+SPEED_PX = np.array([2.5, 3.5, 4.8])              # px/frame, rounds 1..3
+SPAWN_MS = np.array([900, 750, 600])              # ms, rounds 1..3
+DIFFICULTY = (SPEED_PX / SPEED_PX[0]) + (SPAWN_MS[0] / SPAWN_MS - 1.0)
+
+AGE_BUCKETS = (["18-24","25-34","35-44","45-54","55-64","65+","unknown"], [0.18,0.22,0.18,0.15,0.12,0.10,0.05])
+GENDERS = (["Male","Female","Other","Prefer not to say"], [0.48,0.48,0.02,0.02])
+POINTER_PRIMARY = (["mouse","touch","pen","unknown"], [0.7,0.2,0.05,0.05])
+OSES = (["Windows","macOS","Linux","Android","iOS"], [0.55,0.18,0.07,0.12,0.08])
+BROWSERS = (["Chrome","Edge","Firefox","Safari"], [0.55,0.18,0.15,0.12])
+
+DEFAULT_BLOCK_PARTICIPANTS = 10000
+
+def session_counts(n_participants, min_sessions, max_sessions, seed):
+    # Drawn up front from their own stream so every block knows its
+    # session offset without generating the blocks before it.
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0,)))
+    return rng.integers(min_sessions, max_sessions+1, size=n_participants)
+
+def block_seed(seed, block_index):
+    return np.random.SeedSequence(seed, spawn_key=(1, block_index))
+
+def _prefixed_ids(prefix, numbers, width):
+    return np.char.add(prefix, np.char.zfill(numbers.astype(str), width))
+
+def synthesize_block(participant_start, n_sess, session_start, seed_seq):
+    # participant_start / session_start are 0-based; n_sess holds the session
+    # count of each participant in the block.
+    rng = np.random.default_rng(seed_seq)
+    n_part = len(n_sess)
+    n = int(n_sess.sum())
+
+    participant_num = np.repeat(np.arange(participant_start+1, participant_start+n_part+1), n_sess)
+    ability = rng.normal(0, 1, size=n_part)
+    z = np.repeat(ability, n_sess) + rng.normal(0, 0.25, size=n)  # session-specific ability
+
+    # device/perf context
+    screen_w = rng.choice([1366, 1440, 1536, 1920, 2560], size=n)
+    screen_h = rng.choice([768, 900, 864, 1080, 1440], size=n)
+    dpr = rng.choice([1.0, 1.25, 1.5, 2.0], size=n)
+    viewport_w = (screen_w * rng.uniform(0.6, 0.95, size=n)).astype(np.int64)
+    viewport_h = (screen_h * rng.uniform(0.6, 0.95, size=n)).astype(np.int64)
+
+    sampling_est = np.clip(rng.normal(55, 5, size=n), 20, 60)
+    dropped_frames = np.maximum(0, rng.normal(20, 15, size=n)).astype(np.int64)
+    avg_frame = rng.normal(16.7 + dropped_frames*0.02, 2.0)
+    p95_frame = avg_frame + np.abs(rng.normal(6, 3, size=n))
+    input_lag = np.maximum(5, rng.normal(18 + dropped_frames*0.1, 6))
+
+    high_contrast = rng.choice([0,1], size=n, p=[0.85,0.15])
+    reduced_motion = rng.choice([0,1], size=n, p=[0.75,0.25])
+
+    cat = lambda spec: rng.choice(spec[0], size=n, p=spec[1])
+    age_bucket, gender = cat(AGE_BUCKETS), cat(GENDERS)
+    dev_pointer, dev_os, dev_browser = cat(POINTER_PRIMARY), cat(OSES), cat(BROWSERS)
+
+    # round stats: (n, 3) arrays, one column per round
+    zr = z[:, None]
+    dd = DIFFICULTY[None, :] - 1.0
+    drop = dropped_frames[:, None]
+    shape = (n, 3)
+    noise = lambda sd: rng.normal(0, sd, size=shape)
+    clip = np.clip
+
+    nTargets = rng.integers(22, 32, size=shape)
+    base_hit = 0.86 + 0.08*np.tanh(zr/1.2) - 0.07*dd - 0.01*(drop/50)
+    hitRate = clip(base_hit + noise(0.03), 0.35, 0.98)
+    nHits = np.rint(hitRate * nTargets).astype(np.int64)
+    nMisses = nTargets - nHits
+
+    rt_mean = clip(420 - 60*zr + 40*dd + noise(25), 180, 900)
+    rt_std  = clip(90 - 10*zr + 10*dd + noise(8), 30, 220)
+    rt_med  = clip(rt_mean - noise(15), 160, 900)
+
+    mt_mean = clip(360 - 45*zr + 35*dd + noise(20), 160, 900)
+    mt_std  = clip(85 - 8*zr + 10*dd + noise(8), 25, 220)
+    mt_med  = clip(mt_mean - noise(12), 150, 900)
+
+    it_mean = clip(520 - 50*zr + 40*dd + noise(35), 200, 1500)
+    it_std  = clip(160 - 15*zr + 20*dd + noise(15), 50, 450)
+    it_cv   = clip(it_std / np.maximum(it_mean, 1e-6), 0.05, 0.9)
+
+    err_mean = clip(0.18 - 0.03*zr + 0.03*dd + noise(0.02), 0.03, 0.6)
+    err_std  = clip(0.12 - 0.02*zr + noise(0.02), 0.02, 0.4)
+
+    path_mean = clip(0.42 - 0.04*zr + 0.03*dd + noise(0.03), 0.15, 1.2)
+    path_std  = clip(0.18 - 0.02*zr + noise(0.02), 0.05, 0.6)
+    straight_mean = clip(0.88 + 0.03*zr - 0.04*dd + noise(0.02), 0.35, 0.99)
+    straight_std  = clip(0.08 - 0.01*zr + noise(0.01), 0.01, 0.25)
+
+    meanSpeed = clip(0.70 + 0.08*zr - 0.05*dd + noise(0.05), 0.2, 2.0)
+    peakSpeed = clip(meanSpeed + np.abs(rng.normal(0.25, 0.12, size=shape)), 0.3, 3.0)
+    speedVar  = clip(0.12 - 0.02*zr + 0.02*dd + noise(0.02), 0.02, 0.5)
+
+    meanAccel = clip(0.95 + 0.10*zr - 0.05*dd + noise(0.07), 0.2, 3.0)
+    peakAccel = clip(meanAccel + np.abs(rng.normal(0.35, 0.15, size=shape)), 0.3, 4.0)
+
+    jerk_mean = clip(0.010 - 0.002*zr + 0.002*dd + noise(0.0015), 0.002, 0.05)
+    jerk_std  = clip(0.006 - 0.001*zr + noise(0.001), 0.001, 0.03)
+
+    sub_mean = clip(2.6 - 0.7*zr + 0.4*dd + noise(0.4), 0.0, 12.0)
+    sub_std  = clip(1.2 - 0.2*zr + noise(0.2), 0.1, 6.0)
+    over_mean = clip(1.8 - 0.5*zr + 0.3*dd + noise(0.3), 0.0, 10.0)
+    over_std  = clip(1.0 - 0.15*zr + noise(0.2), 0.1, 5.0)
+
+    ID_mean = clip(3.2 + 0.2*dd + noise(0.15), 1.5, 6.0)
+    tp_mean = clip(4.2 + 0.8*np.tanh(zr/1.0) - 0.6*dd + noise(0.35), 0.5, 10.0)
+    tp_std  = clip(1.1 - 0.15*zr + noise(0.15), 0.2, 3.0)
+
+    rstats = dict(
+        nTargets=nTargets, nHits=nHits, nMisses=nMisses, hitRate=hitRate,
+        reactionTime_mean=rt_mean, reactionTime_std=rt_std, reactionTime_median=rt_med,
+        movementTime_mean=mt_mean, movementTime_std=mt_std, movementTime_median=mt_med,
+        interTap_mean=it_mean, interTap_std=it_std, interTap_cv=it_cv,
+        errorDist_mean=err_mean, errorDist_std=err_std,
+        pathLength_mean=path_mean, pathLength_std=path_std,
+        straightness_mean=straight_mean, straightness_std=straight_std,
+        meanSpeed_mean=meanSpeed, peakSpeed_mean=peakSpeed, speedVar_mean=speedVar,
+        meanAccel_mean=meanAccel, peakAccel_mean=peakAccel,
+        jerkRMS_mean=jerk_mean, jerkRMS_std=jerk_std,
+        submovementCount_mean=sub_mean, submovementCount_std=sub_std,
+        overshootCount_mean=over_mean, overshootCount_std=over_std,
+        ID_mean=ID_mean, throughput_mean=tp_mean, throughput_std=tp_std
+    )
+
+    cols = {
+        "sessionId": _prefixed_ids("S_", np.arange(session_start+1, session_start+n+1), 5),
+        "participantId": _prefixed_ids("P_", participant_num, 3),
+        "game_gameVersion": np.full(n, "1.0.0"),
+    }
+    for r in [1,2,3]:
+        cols[f"r{r}_speedPxPerFrame"] = np.full(n, SPEED_PX[r-1])
+    for r in [1,2,3]:
+        cols[f"r{r}_spawnIntervalMs"] = np.full(n, SPAWN_MS[r-1])
+    cols.update({
+        "device_pointerPrimary": dev_pointer,
+        "device_os": dev_os,
+        "device_browser": dev_browser,
+        "screen_width": screen_w,
+        "screen_height": screen_h,
+        "screen_dpr": dpr,
+        "viewportWidth": viewport_w,
+        "viewportHeight": viewport_h,
+        "perf_samplingHzTarget": np.full(n, 60),
+        "perf_samplingHzEstimated": sampling_est,
+        "perf_avgFrameMs": avg_frame,
+        "perf_p95FrameMs": p95_frame,
+        "perf_droppedFrames": dropped_frames,
+        "perf_inputLagMsEstimate": input_lag,
+        "highContrastMode": high_contrast,
+        "reducedMotionPreference": reduced_motion,
+        "userInfo_ageBucket": age_bucket,
+        "userInfo_gender": gender,
+    })
+
+    for r in [1,2,3]:
+        for m in ROUND_METRICS:
+            cols[f"r{r}_{m}"] = rstats[m][:, r-1]
+
+    for c in DELTA_COLS:
+        # delta_r{a}_minus_r{b}_{metric}
+        _, ra, _, rb, metric = c.split("_", 4)
+        cols[c] = rstats[metric][:, int(ra[1])-1] - rstats[metric][:, int(rb[1])-1]
+
+    return compact_frame(pd.DataFrame(cols, columns=build_columns()))
+
+def iter_blocks(n_participants=80, min_sessions=2, max_sessions=5, seed=42,
+                block_participants=DEFAULT_BLOCK_PARTICIPANTS):
+    # Yields (block_index, participant_start, n_sess, session_start) for each
+    # fixed-size participant block; output depends on seed and block size only.
+    counts = session_counts(n_participants, min_sessions, max_sessions, seed)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    for b, start in enumerate(range(0, n_participants, block_participants)):
+        stop = min(start + block_participants, n_participants)
+        yield b, start, counts[start:stop], int(offsets[start])
+
+def iter_synthesize_vectorized(n_participants=80, min_sessions=2, max_sessions=5, seed=42,
+                               block_participants=DEFAULT_BLOCK_PARTICIPANTS):
+    for b, start, n_sess, session_start in iter_blocks(
+        n_participants, min_sessions, max_sessions, seed, block_participants
+    ):
+        yield synthesize_block(start, n_sess, session_start, block_seed(seed, b))
+
+def synthesize_vectorized(n_participants=80, min_sessions=2, max_sessions=5, seed=42,
+                          block_participants=DEFAULT_BLOCK_PARTICIPANTS):
+    blocks = iter_synthesize_vectorized(n_participants, min_sessions, max_sessions, seed, block_participants)
+    # Blocks may carry different category sets; concat falls back to strings, so re-compact
+    return compact_frame(pd.concat(list(blocks), ignore_index=True))
+
+def write_chunked(outpath, blocks):
+    # Appends each block to the CSV/Parquet file as it is produced so only one block is in memory
+    n_rows, n_cols = 0, 0
+    with DatasetWriter(outpath) as writer:
+        for block in blocks:
+            writer.write(block)
+            n_rows += len(block)
+            n_cols = block.shape[1]
+    return n_rows, n_cols
+
+# --------------------------
+# Parallel sharded generation
+# --------------------------
+
+def shard_path(shard_dir, block_index, ext=".csv"):
+    return os.path.join(shard_dir, f"shard_{block_index:05d}{ext}")
+
+def _write_shard(job):
+    # Top-level so it can be pickled into worker processes
+    path, start, n_sess, session_start, seed, block_index = job
+    block = synthesize_block(start, n_sess, session_start, block_seed(seed, block_index))
+    write_dataset(block, path, index=False)  # the merged file gets the index
+    return path, block.shape
+
+def write_shards(shard_dir, n_participants=80, min_sessions=2, max_sessions=5, seed=42,
+                 block_participants=DEFAULT_BLOCK_PARTICIPANTS, workers=1, ext=".csv"):
+    # One shard per participant block. Blocks are seeded by index, so the
+    # shards (and their merge) are identical for any worker count.
+    os.makedirs(shard_dir, exist_ok=True)
+    jobs = [
+        (shard_path(shard_dir, b, ext), start, n_sess, session_start, seed, b)
+        for b, start, n_sess, session_start in iter_blocks(
+            n_participants, min_sessions, max_sessions, seed, block_participants
+        )
+    ]
+    if workers <= 1:
+        return [_write_shard(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(_write_shard, jobs))
+
+def merge_shards(outpath, paths):
+    if is_parquet(outpath):
+        # One row group per shard
+        import pyarrow.parquet as pq
+        writer = None
+        for path in paths:
+            table = pq.read_table(path)
+            if writer is None:
+                writer = pq.ParquetWriter(outpath, table.schema)
+            writer.write_table(table, row_group_size=max(len(table), 1))
+        if writer is not None:
+            writer.close()
+        build_index(outpath)
+        return
+
+    # Byte-level concatenation; the header is kept from the first shard only
+    with open(outpath, "wb") as out:
+        for i, path in enumerate(paths):
+            with open(path, "rb") as f:
+                if i > 0:
+                    f.readline()
+                shutil.copyfileobj(f, out)
+    build_index(outpath)
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--out", default=r"..\datasets\final\motor_sessions.csv")
+    ap.add_argument("--out", default=r"..\datasets\final\motor_sessions.csv",
+                    help="Output .csv or .parquet")
     ap.add_argument("--participants", type=int, default=80)
     ap.add_argument("--min_sessions", type=int, default=2)
     ap.add_argument("--max_sessions", type=int, default=5)
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--engine", choices=["loop", "vectorized"], default=None,
+                    help="loop: original per-row generator (default); vectorized: whole-array NumPy engine "
+                         "(always used by --chunked / --workers / --shard_dir)")
+    ap.add_argument("--chunked", action="store_true",
+                    help="Vectorized engine only: write one participant block at a time")
+    ap.add_argument("--block_participants", type=int, default=DEFAULT_BLOCK_PARTICIPANTS,
+                    help="Participants per vectorized block (part of the seed contract)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Vectorized engine: processes writing block shards in parallel")
+    ap.add_argument("--shard_dir", default=None,
+                    help="Write one shard file per block here (default with --workers > 1: <out>.shards)")
+    ap.add_argument("--merge", action="store_true",
+                    help="Concatenate the shards into --out and remove them")
     args = ap.parse_args()
+    sharded = args.workers > 1 or args.shard_dir
+    if (sharded or args.chunked) and args.engine == "loop":
+        ap.error("--chunked, --workers and --shard_dir generate blocks with the vectorized engine; "
+                 "drop --engine loop")
+    if args.merge and not sharded:
+        ap.error("--merge needs --workers > 1 or --shard_dir")
 
-    df = synthesize(args.participants, args.min_sessions, args.max_sessions, args.seed)
     outpath = os.path.abspath(args.out)
     os.makedirs(os.path.dirname(outpath), exist_ok=True)
-    df.to_csv(outpath, index=False)
+
+    if sharded:
+        shard_dir = os.path.abspath(args.shard_dir or outpath + ".shards")
+        shards = write_shards(shard_dir, args.participants, args.min_sessions, args.max_sessions,
+                              args.seed, args.block_participants, args.workers, dataset_ext(outpath))
+        n_rows = sum(shape[0] for _, shape in shards)
+        n_cols = shards[0][1][1] if shards else len(build_columns())
+        if args.merge:
+            merge_shards(outpath, [path for path, _ in shards])
+            for path, _ in shards:
+                os.remove(path)
+            if not os.listdir(shard_dir):
+                os.rmdir(shard_dir)
+            print("Wrote synthetic dataset:", outpath)
+        else:
+            print(f"Wrote {len(shards)} shards to:", shard_dir)
+        print("Shape:", (n_rows, n_cols))
+        return
+
+    if args.chunked:
+        blocks = iter_synthesize_vectorized(args.participants, args.min_sessions, args.max_sessions,
+                                            args.seed, args.block_participants)
+        n_rows, n_cols = write_chunked(outpath, blocks)
+        print("Wrote synthetic dataset:", outpath)
+        print("Shape:", (n_rows, n_cols))
+        return
+
+    if args.engine == "vectorized":
+        df = synthesize_vectorized(args.participants, args.min_sessions, args.max_sessions,
+                                   args.seed, args.block_participants)
+    else:
+        df = synthesize(args.participants, args.min_sessions, args.max_sessions, args.seed)
+    write_dataset(df, outpath)
     print("Wrote synthetic dataset:", outpath)
     print("Shape:", df.shape)
     print(df.head(2).to_string(index=False))
@@ -0,0 +1,96 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+
+from motor_bundle import PC1Projection
+from streaming_stats import QuantileSketch, ColumnSketches, StreamingCovariance
+
+# --------------------------
+# Compact per-version state that lets retrain_incremental.py update a model
+# with new sessions only: the streamed mean and covariance of the scaled motor
+# features (exact, so PC1 can be recomputed from all sessions seen), quantile
+# sketches of the aligned PC1 and of every numeric feature, label counts, and
+# a uniform sample of scaled motor rows. The sample is re-projected whenever
+# PCA moves, so thresholds always come from a single projection.
+# --------------------------
+
+STATE_FILENAME = "incremental_state.joblib"
+SAMPLE_ROWS = 10000  # ~4.5 MB of float32 for 114 motor features
+
+def state_path(outdir):
+    return os.path.join(outdir, "preprocess", STATE_FILENAME)
+
+def build_state(X_motor_scaled, pc1_aligned, y, df, motor_cols, ctx_num_cols, seed=0):
+    X = np.asarray(X_motor_scaled, dtype=np.float64)
+    return {
+        "n_sessions": int(X.shape[0]),
+        "motor_cov": StreamingCovariance(X.shape[1]).update(X),
+        "pc1_sketch": QuantileSketch().update(pc1_aligned),
+        "feature_sketches": ColumnSketches(motor_cols + ctx_num_cols).update(df),
+        "label_counts": np.bincount(np.asarray(y, dtype=int), minlength=4).tolist(),
+        "motor_sample": update_sample(None, X, np.random.default_rng(seed)),
+    }
+
+def update_sample(sample, X_scaled, rng, size=SAMPLE_ROWS):
+    # Uniform sample of all rows seen so far: every row gets a random key and
+    # the `size` largest keys are kept, so chunks can be added in any order
+    X = np.asarray(X_scaled, dtype=np.float32)
+    keys = rng.random(len(X))
+    if sample is not None:
+        X = np.concatenate([sample["X"], X])
+        keys = np.concatenate([sample["keys"], keys])
+    if len(keys) > size:
+        keep = np.sort(np.argpartition(keys, len(keys) - size)[len(keys) - size:])
+        X, keys = X[keep], keys[keep]
+    return {"X": X, "keys": keys}
+
+def save_state(outdir, state):
+    joblib.dump(state, state_path(outdir))
+
+def load_state(outdir):
+    state = joblib.load(state_path(outdir))
+    if "motor_cov" not in state:
+        state["motor_cov"] = _covariance_from_ipca(state.pop("ipca"))
+    return state
+
+def _covariance_from_ipca(ipca):
+    # States saved before motor_cov kept a k-component IncrementalPCA. Its
+    # components and singular values are the retained part of the scatter
+    # matrix; the rest of the total variance (var_) is spread evenly over the
+    # discarded directions, so PC1 and its explained variance ratio carry over
+    V = ipca.components_
+    k, p = V.shape
+    cov = StreamingCovariance(p)
+    cov.n = int(ipca.n_samples_seen_)
+    cov.mean = np.asarray(ipca.mean_, dtype=np.float64).copy()
+    cov.m2 = (V.T * ipca.singular_values_ ** 2) @ V
+    if k < p:
+        residual = max(cov.n * float(np.sum(ipca.var_)) - float(np.sum(ipca.singular_values_ ** 2)), 0.0)
+        cov.m2 += residual / (p - k) * (np.eye(p) - V.T @ V)
+    return cov
+
+def bootstrap_state(outdir, report, pca_scaler):
+    # Versions trained before the state existed: rebuild it from the saved
+    # training table (reports/sessions_with_latent_and_labels.csv)
+    path = os.path.join(outdir, "reports", "sessions_with_latent_and_labels.csv")
+    if not os.path.exists(path):
+        raise SystemExit(f"{outdir} has no {STATE_FILENAME} and no sessions_with_latent_and_labels.csv; run a full training first")
+    motor_cols = report["pca"]["motor_feature_columns"]
+    ctx_num_cols = report["modelB_motor_plus_context"]["context_numeric_columns"]
+    df = pd.read_csv(path, usecols=lambda c: c in set(motor_cols + ctx_num_cols + ["latent_pc1_motor", "label_level"]))
+    X = pca_scaler.transform(df[motor_cols].values)
+    return build_state(X, df["latent_pc1_motor"].values, df["label_level"].values, df, motor_cols, ctx_num_cols)
+
+def pc1_from_covariance(cov, reference=None):
+    # PC1 of the rows behind a StreamingCovariance. Signed to agree with the
+    # reference loadings if given, else as sklearn's svd_flip would (largest
+    # absolute loading positive)
+    evals, evecs = np.linalg.eigh(cov.covariance())
+    evals = np.clip(evals, 0, None)
+    comp = evecs[:, np.argmax(evals)]
+    if reference is not None:
+        sign = -1.0 if float(np.dot(comp, reference)) < 0 else 1.0
+    else:
+        sign = np.sign(comp[np.argmax(np.abs(comp))])
+    return PC1Projection(cov.mean, sign * comp, evals.max() / evals.sum())
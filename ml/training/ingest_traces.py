@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import shutil
+import zlib
+import numpy as np
+import pandas as pd
+
+from dataset_io import DatasetWriter, build_columns
+from trace_features import session_features
+
+# --------------------------
+# Streaming ingestion of Mongo JSONL exports (mongoexport, one document per line)
+# into the session table (build_columns() schema).
+#
+#   --traces   MotorPointerTraceBucket docs  {userId, bucketNumber, samples: [...]}
+#   --attempts MotorAttemptBucket docs       {userId, bucketNumber, attempts: [...]}
+#   --sessions OnboardingSession docs        {userId, device, screen, game, perf}   (optional)
+#   --users    User docs                     {_id, age, gender}                     (optional)
+#
+# Buckets are per user (one onboarding session each), so sessionId = participantId = userId.
+# Pass 1 hash-partitions every document by userId into spill files; pass 2 loads
+# one partition at a time, so memory is bounded by the largest partition and the
+# flush buffer, not by the export size.
+# --------------------------
+
+SAMPLE_COLS = ["userId", "bucketNumber", "seq", "round", "tms", "x", "y"]
+ATTEMPT_COLS = ["userId", "bucketNumber", "seq", "round", "spawnTms", "despawnTms",
+                "target_x", "target_y", "target_radius", "click_clicked", "click_hit", "click_tms"]
+CONTEXT_COLS = [
+    "userId", "game_gameVersion",
+    "device_pointerPrimary", "device_os", "device_browser",
+    "screen_width", "screen_height", "screen_dpr",
+    "perf_samplingHzTarget", "perf_samplingHzEstimated",
+    "perf_avgFrameMs", "perf_p95FrameMs", "perf_droppedFrames", "perf_inputLagMsEstimate",
+]
+USER_COLS = ["userId", "userInfo_ageBucket", "userInfo_gender"]
+
+GENDER_LABELS = {"male": "Male", "female": "Female", "other": "Other", "prefer-not-to-say": "Prefer not to say"}
+
+def age_bucket(age):
+    if age is None or not np.isfinite(age):
+        return "unknown"
+    for hi, label in [(24, "18-24"), (34, "25-34"), (44, "35-44"), (54, "45-54"), (64, "55-64")]:
+        if age <= hi:
+            return label
+    return "65+"
+
+# --------------------------
+# Reading exports
+# --------------------------
+
+def _ejson(obj):
+    # Relaxed/canonical Extended JSON wrappers -> plain values
+    if len(obj) == 1:
+        (k, v), = obj.items()
+        if k == "$oid":
+            return v
+        if k in ("$numberInt", "$numberLong", "$numberDouble", "$numberDecimal"):
+            return float(v)
+        if k == "$date":
+            return v
+    return obj
+
+def iter_docs(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line, object_hook=_ejson)
+
+def _get(doc, path, default=None):
+    for k in path.split("."):
+        if not isinstance(doc, dict) or k not in doc:
+            return default
+        doc = doc[k]
+    return doc
+
+def sample_rows(doc):
+    uid, bucket = str(doc["userId"]), doc.get("bucketNumber", 1)
+    return [(uid, bucket, i, s["round"], s["tms"], s["x"], s["y"])
+            for i, s in enumerate(doc.get("samples", []))]
+
+def attempt_rows(doc):
+    uid, bucket = str(doc["userId"]), doc.get("bucketNumber", 1)
+    return [(uid, bucket, i, a["round"], a["spawnTms"], a.get("despawnTms"),
+             _get(a, "target.x"), _get(a, "target.y"), _get(a, "target.radius"),
+             bool(_get(a, "click.clicked", False)), bool(_get(a, "click.hit", False)), _get(a, "click.tms"))
+            for i, a in enumerate(doc.get("attempts", []))]
+
+def context_rows(doc):
+    row = [str(doc["userId"]), _get(doc, "game.gameVersion")]
+    row += [_get(doc, c.replace("_", ".", 1)) for c in CONTEXT_COLS[2:]]
+    return [tuple(row)]
+
+def user_rows(doc):
+    return [(str(doc["_id"]), age_bucket(doc.get("age")), GENDER_LABELS.get(str(doc.get("gender")).lower(), "unknown"))]
+
+# --------------------------
+# Pass 1: partitioned spill
+# --------------------------
+
+def partition_of(user_id, n_partitions):
+    return zlib.crc32(user_id.encode("utf-8")) % n_partitions
+
+def spill_path(spill_dir, kind, p):
+    return os.path.join(spill_dir, f"{kind}_{p:04d}.csv")
+
+class Spiller:
+    # Buffers rows per partition and appends them to CSV spill files once the
+    # total number of buffered rows reaches flush_rows
+    def __init__(self, spill_dir, kind, columns, n_partitions, flush_rows):
+        self.spill_dir, self.kind, self.columns = spill_dir, kind, columns
+        self.n_partitions, self.flush_rows = n_partitions, flush_rows
+        self.buffers = [[] for _ in range(n_partitions)]
+        self.buffered = 0
+        self.n_rows = 0
+
+    def add(self, rows):
+        if not rows:
+            return
+        self.buffers[partition_of(rows[0][0], self.n_partitions)].extend(rows)
+        self.buffered += len(rows)
+        self.n_rows += len(rows)
+        if self.buffered >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        for p, rows in enumerate(self.buffers):
+            if not rows:
+                continue
+            path = spill_path(self.spill_dir, self.kind, p)
+            pd.DataFrame(rows, columns=self.columns).to_csv(
+                path, index=False, mode="a", header=not os.path.exists(path))
+            self.buffers[p] = []
+        self.buffered = 0
+
+def spill(path, kind, columns, to_rows, spill_dir, n_partitions, flush_rows):
+    spiller = Spiller(spill_dir, kind, columns, n_partitions, flush_rows)
+    n_docs = 0
+    for doc in iter_docs(path):
+        spiller.add(to_rows(doc))
+        n_docs += 1
+    spiller.flush()
+    print(f"  {kind}: {n_docs} documents, {spiller.n_rows} rows")
+
+def _read_spill(spill_dir, kind, p):
+    path = spill_path(spill_dir, kind, p)
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, dtype={"userId": str})
+
+# --------------------------
+# Pass 2: one partition at a time
+# --------------------------
+
+def partition_table(spill_dir, p):
+    samples = _read_spill(spill_dir, "samples", p)
+    attempts = _read_spill(spill_dir, "attempts", p)
+    if attempts is None:
+        return None
+    if samples is None:
+        samples = pd.DataFrame(columns=SAMPLE_COLS)
+
+    # Bucket order then position restores the original attempt sequence (interTap)
+    attempts = attempts.sort_values(["userId", "bucketNumber", "seq"], kind="stable").reset_index(drop=True)
+    attempts = attempts.rename(columns={"userId": "sessionId"})
+    samples = samples.rename(columns={"userId": "sessionId"})
+    attempts["click_clicked"] = attempts["click_clicked"].astype(bool)
+    attempts["click_hit"] = attempts["click_hit"].astype(bool)
+
+    df = session_features(samples, attempts)
+    df.insert(1, "participantId", df["sessionId"])
+
+    for kind in ("context", "users"):
+        extra = _read_spill(spill_dir, kind, p)
+        if extra is not None:
+            extra = extra.drop_duplicates("userId", keep="last").rename(columns={"userId": "sessionId"})
+            df = df.merge(extra, on="sessionId", how="left")
+    return df.reindex(columns=build_columns())
+
+def ingest(args):
+    spill_dir = args.spill_dir or args.out + ".spill"
+    if os.path.exists(spill_dir):
+        shutil.rmtree(spill_dir)
+    os.makedirs(spill_dir)
+
+    print("Pass 1: partitioning exports...")
+    spill(args.attempts, "attempts", ATTEMPT_COLS, attempt_rows, spill_dir, args.partitions, args.flush_rows)
+    if args.traces:
+        spill(args.traces, "samples", SAMPLE_COLS, sample_rows, spill_dir, args.partitions, args.flush_rows)
+    if args.sessions:
+        spill(args.sessions, "context", CONTEXT_COLS, context_rows, spill_dir, args.partitions, args.flush_rows)
+    if args.users:
+        spill(args.users, "users", USER_COLS, user_rows, spill_dir, args.partitions, args.flush_rows)
+
+    print("Pass 2: computing session features...")
+    n_sessions = 0
+    with DatasetWriter(args.out) as writer:
+        for p in range(args.partitions):
+            df = partition_table(spill_dir, p)
+            if df is None or df.empty:
+                continue
+            writer.write(df)
+            n_sessions += len(df)
+
+    if not args.keep_spill:
+        shutil.rmtree(spill_dir)
+    return n_sessions
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--attempts", required=True, help="MotorAttemptBucket export (JSONL)")
+    ap.add_argument("--traces", default=None, help="MotorPointerTraceBucket export (JSONL)")
+    ap.add_argument("--sessions", default=None, help="OnboardingSession export (JSONL) for device/screen/perf context")
+    ap.add_argument("--users", default=None, help="User export (JSONL) for age bucket / gender")
+    ap.add_argument("--out", required=True, help="Output dataset (.csv or .parquet)")
+    ap.add_argument("--partitions", type=int, default=64, help="Hash partitions by userId (more = less memory in pass 2)")
+    ap.add_argument("--flush_rows", type=int, default=200000, help="Buffered rows before spilling to disk")
+    ap.add_argument("--spill_dir", default=None, help="Spill folder (default: <out>.spill)")
+    ap.add_argument("--keep_spill", action="store_true", help="Keep the partition files after ingestion")
+    args = ap.parse_args()
+
+    n = ingest(args)
+    print("Wrote dataset:", os.path.abspath(args.out))
+    print("Sessions:", n)
+
+if __name__ == "__main__":
+    main()
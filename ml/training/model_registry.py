@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import joblib
+
+from motor_bundle import BUNDLE_FILENAME, load_bundle
+
+# --------------------------
+# Versioned model registry: <root>/<version>/{models,preprocess,reports}/ as
+# written by train_motor_model_v2.py (e.g. ..\model_registry\motor\1.0.0).
+# Artifacts load on first access only (scoring never touches Model B), joblib
+# files are opened with mmap_mode so their numpy arrays are paged in from the
+# file, and an in-process LRU keeps each loaded version exactly once, so two
+# versions can be served side by side (A/B) without duplicate copies.
+# --------------------------
+
+REPORT_PATH = os.path.join("reports", "training_report.json")
+
+ARTIFACT_PATHS = {
+    "model": os.path.join("models", "modelA_motor_only.joblib"),
+    "modelB": os.path.join("models", "modelB_motor_plus_context.joblib"),
+    "pca_scaler": os.path.join("preprocess", "pca_scaler_motor.joblib"),
+    "pca": os.path.join("preprocess", "pca_pc1_motor.joblib"),
+}
+
+# What score_features() reads for each scoring mode (model_fingerprint keys
+# caches of model outputs, e.g. motor_explain.ExplanationCache)
+SCORING_KEYS = {
+    False: ("report", "motor_cols", "model_version", "model_fingerprint", "model", "pca_scaler", "pca"),
+    True: ("report", "motor_cols", "model_version", "model_fingerprint", "bundle"),
+}
+
+# Files that determine Model A's outputs and the latent score
+FINGERPRINT_PATHS = (
+    ARTIFACT_PATHS["model"], ARTIFACT_PATHS["pca_scaler"], ARTIFACT_PATHS["pca"],
+    os.path.join("models", BUNDLE_FILENAME),
+)
+
+def version_key(name):
+    # "1.0.10" sorts after "1.0.9"; non-numeric parts compare as text after numbers
+    return tuple((0, int(p), "") if p.isdigit() else (1, 0, p) for p in re.split(r"[.\-_+]", name))
+
+def is_version_dir(path):
+    return os.path.isfile(os.path.join(path, REPORT_PATH))
+
+def artifact_fingerprint(path):
+    # Content hash of the scoring artifacts present in a version folder; a
+    # retrain into the same folder (same version name) changes it
+    h = hashlib.blake2b(digest_size=12)
+    for rel in FINGERPRINT_PATHS:
+        full = os.path.join(path, rel)
+        if not os.path.isfile(full):
+            continue
+        h.update(rel.encode("utf-8"))
+        with open(full, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+def list_versions(root):
+    if not os.path.isdir(root):
+        return []
+    names = [n for n in os.listdir(root) if is_version_dir(os.path.join(root, n))]
+    return sorted(names, key=version_key)
+
+class LazyArtifacts(Mapping):
+    # Read-only artifacts dict (the shape score_features() expects) whose
+    # values are loaded by the owning ModelVersion on first lookup
+    def __init__(self, version, keys):
+        self._version = version
+        self._keys = keys
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        return self._version.get(key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+class ModelVersion:
+    def __init__(self, path, version=None, mmap_mode="r"):
+        self.path = os.path.abspath(path)
+        self.version = version or os.path.basename(os.path.normpath(self.path))
+        self.mmap_mode = mmap_mode
+        self._cache = {}
+        self._lock = threading.RLock()  # derived keys look up "report" while holding it
+
+    def _load(self, key):
+        if key == "report":
+            with open(os.path.join(self.path, REPORT_PATH), "r", encoding="utf-8") as f:
+                return json.load(f)
+        if key == "motor_cols":
+            return self.get("report")["pca"]["motor_feature_columns"]
+        if key == "model_version":
+            return self.get("report").get("modelA_motor_only", {}).get("version", self.version)
+        if key == "model_fingerprint":
+            return artifact_fingerprint(self.path)
+        if key == "bundle":
+            return load_bundle(os.path.join(self.path, "models", BUNDLE_FILENAME))
+        if key in ARTIFACT_PATHS:
+            return joblib.load(os.path.join(self.path, ARTIFACT_PATHS[key]), mmap_mode=self.mmap_mode)
+        raise KeyError(key)
+
+    def get(self, key):
+        # Per-version lock: concurrent first lookups load the file once
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = self._load(key)
+            return self._cache[key]
+
+    def loaded(self):
+        return sorted(self._cache)
+
+    def artifacts(self, bundle=False):
+        return LazyArtifacts(self, SCORING_KEYS[bool(bundle)])
+
+class ModelRegistry:
+    def __init__(self, root, capacity=4, mmap_mode="r"):
+        self.root = os.path.abspath(root)
+        self.capacity = capacity
+        self.mmap_mode = mmap_mode
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def versions(self):
+        return list_versions(self.root)
+
+    def resolve(self, version="latest"):
+        # "latest" (or None) -> highest version folder holding a training report
+        if version in (None, "", "latest"):
+            versions = self.versions()
+            if not versions:
+                raise FileNotFoundError(f"No model versions under {self.root}")
+            return versions[-1]
+        if not is_version_dir(os.path.join(self.root, version)):
+            raise FileNotFoundError(f"Model version {version} not found under {self.root}")
+        return version
+
+    def get(self, version="latest"):
+        name = self.resolve(version)
+        with self._lock:
+            mv = self._versions.get(name)
+            if mv is None:
+                mv = ModelVersion(os.path.join(self.root, name), version=name, mmap_mode=self.mmap_mode)
+                self._versions[name] = mv
+                while len(self._versions) > self.capacity:
+                    self._versions.popitem(last=False)
+            self._versions.move_to_end(name)
+            return mv
+
+    def cached(self):
+        with self._lock:
+            return list(self._versions)
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+
+# One registry per root per process, so every caller shares the same LRU
+_REGISTRIES = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+def open_registry(root, capacity=4):
+    root = os.path.abspath(root)
+    with _REGISTRIES_LOCK:
+        reg = _REGISTRIES.get(root)
+        if reg is None:
+            reg = _REGISTRIES[root] = ModelRegistry(root, capacity=capacity)
+        return reg
+
+def open_version(outdir):
+    # A plain version folder (e.g. --outdir) through its parent's registry
+    outdir = os.path.abspath(outdir)
+    root, name = os.path.split(os.path.normpath(outdir))
+    return open_registry(root).get(name)
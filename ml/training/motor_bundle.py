@@ -0,0 +1,262 @@
+import json
+import threading
+import numpy as np
+
+# --------------------------
+# Single-file inference bundle for Model A + PC1 latent score.
+# Loading and scoring need only json + numpy (no pandas/sklearn/xgboost).
+# --------------------------
+
+BUNDLE_FORMAT = "aura-motor-bundle"
+BUNDLE_VERSION = 1
+BUNDLE_FILENAME = "motor_inference_bundle.json"
+
+def _robust_scaler_params(scaler, n_features):
+    center = getattr(scaler, "center_", None)
+    scale = getattr(scaler, "scale_", None)
+    return {
+        "center": (np.zeros(n_features) if center is None else center).tolist(),
+        "scale": (np.ones(n_features) if scale is None else scale).tolist(),
+    }
+
+class PC1Projection:
+    # PC1 as plain mean + loadings, for versions whose PC1 comes from a streamed
+    # covariance (out-of-core / incremental training) rather than a fitted PCA.
+    # Saved as pca_pc1_motor.joblib; offers what scoring reads from a PCA.
+    def __init__(self, mean, loadings, explained_variance_ratio):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.components_ = np.asarray(loadings, dtype=np.float64).reshape(1, -1)
+        self.explained_variance_ratio_ = np.array([float(explained_variance_ratio)])
+
+    def transform(self, X):
+        # (n, 1) raw PC1, like PCA.transform
+        return ((np.asarray(X, dtype=np.float64) - self.mean_) @ self.components_[0]).reshape(-1, 1)
+
+def export_bundle(path, motor_cols, pca_scaler, pca, pc1_flipped, thresholds, modelA, model_version=None,
+                  fast_path=None):
+    # modelA: fitted Pipeline([("scaler", RobustScaler()), ("xgb", XGBClassifier())])
+    n = len(motor_cols)
+    booster = modelA.named_steps["xgb"].get_booster()
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "format_version": BUNDLE_VERSION,
+        "model_version": model_version,
+        "columns": list(motor_cols),
+        "pca_scaler": _robust_scaler_params(pca_scaler, n),
+        "pc1": {
+            "mean": pca.mean_.tolist(),
+            "loadings": pca.components_[0].tolist(),
+            "flipped": bool(pc1_flipped),
+        },
+        "thresholds": thresholds,
+        "model_scaler": _robust_scaler_params(modelA.named_steps["scaler"], n),
+        "booster": json.loads(booster.save_raw("json")),  # XGBoost native JSON
+    }
+    if fast_path is not None:
+        bundle["fast_path"] = fast_path
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, separators=(",", ":"))
+
+def _parse_base_score(raw, n_class):
+    # XGBoost >= 3 stores one intercept per class as "[a,b,...]"; older versions a scalar
+    raw = str(raw).strip()
+    if raw.startswith("["):
+        vals = [float(v) for v in raw.strip("[]").split(",")]
+    else:
+        vals = [float(raw)] * n_class
+    return np.asarray(vals, dtype=np.float64)
+
+class TreeEnsemble:
+    # Multi-class gbtree flattened into 1-D node arrays (global node ids).
+    # Leaves point to themselves, so every tree can be advanced one level per
+    # step for all rows at once; the loop runs max_depth times.
+    def __init__(self, booster_json):
+        learner = booster_json["learner"]
+        params = learner["learner_model_param"]
+        model = learner["gradient_booster"]["model"]
+
+        self.n_class = max(int(params.get("num_class", "0")), 1)
+        self.base_score = _parse_base_score(params["base_score"], self.n_class)
+
+        trees = model["trees"]
+        tree_info = model["tree_info"]
+        best = learner.get("attributes", {}).get("best_iteration")
+        if best is not None:
+            n_keep = (int(best) + 1) * self.n_class * int(model["gbtree_model_param"].get("num_parallel_tree", "1"))
+            trees, tree_info = trees[:n_keep], tree_info[:n_keep]
+
+        if any(any(t.get("split_type", [])) for t in trees):
+            raise ValueError("Categorical splits are not supported by the NumPy tree evaluator")
+
+        sizes = np.array([len(t["left_children"]) for t in trees])
+        self.roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        offsets = np.repeat(self.roots, sizes)
+
+        left = np.concatenate([t["left_children"] for t in trees]).astype(np.int64)
+        right = np.concatenate([t["right_children"] for t in trees]).astype(np.int64)
+        leaf = left < 0
+        ids = np.arange(len(left))
+        self.left = np.where(leaf, ids, left + offsets)
+        self.right = np.where(leaf, ids, right + offsets)
+        self.feature = np.concatenate([t["split_indices"] for t in trees]).astype(np.int64)
+        self.cond = np.concatenate([t["split_conditions"] for t in trees]).astype(np.float32)
+        self.default_left = np.concatenate([t["default_left"] for t in trees]).astype(bool)
+        self.leaf_value = np.where(leaf, self.cond, 0.0).astype(np.float64)  # split_conditions holds leaf values
+
+        # (n_trees, n_class) one-hot so per-class sums are one matmul
+        self.class_matrix = np.zeros((len(trees), self.n_class))
+        self.class_matrix[np.arange(len(trees)), np.asarray(tree_info, dtype=np.int64)] = 1.0
+        self.max_depth = self._max_depth(leaf)
+
+    def _max_depth(self, leaf):
+        depth = np.zeros(len(self.left), dtype=np.int64)
+        for j in np.nonzero(~leaf)[0]:  # parents precede their children
+            depth[self.left[j]] = depth[self.right[j]] = depth[j] + 1
+        return int(depth.max())
+
+    def predict_margin(self, X, block_rows=2048):
+        X = np.asarray(X, dtype=np.float32)  # XGBoost compares in float32
+        n, n_feat = X.shape
+        out = np.empty((n, self.n_class))
+        for start in range(0, n, block_rows):
+            Xb = X[start:start + block_rows]
+            flat = Xb.reshape(-1)
+            row_base = (np.arange(Xb.shape[0]) * n_feat)[:, None]
+            node = np.broadcast_to(self.roots, (Xb.shape[0], len(self.roots))).copy()
+            for _ in range(self.max_depth):
+                x = flat[row_base + self.feature[node]]
+                go_left = np.where(np.isnan(x), self.default_left[node], x < self.cond[node])
+                node = np.where(go_left, self.left[node], self.right[node])
+            out[start:start + Xb.shape[0]] = self.leaf_value[node] @ self.class_matrix
+        return out + self.base_score
+
+    def predict_proba(self, X):
+        m = self.predict_margin(X)
+        m -= m.max(axis=1, keepdims=True)
+        e = np.exp(m)
+        return e / e.sum(axis=1, keepdims=True)
+
+class XGBoostTrees:
+    # Same booster through XGBoost's native predictor; faster for large batches
+    def __init__(self, booster_json):
+        import xgboost as xgb
+        self.booster = xgb.Booster()
+        self.booster.load_model(bytearray(json.dumps(booster_json).encode("utf-8")))
+
+    def predict_proba(self, X):
+        return np.asarray(self.booster.inplace_predict(np.asarray(X, dtype=np.float32)))
+
+class MotorBundle:
+    def __init__(self, bundle):
+        if bundle.get("format") != BUNDLE_FORMAT:
+            raise ValueError("Not a motor inference bundle")
+        self.columns = bundle["columns"]
+        self.model_version = bundle.get("model_version")
+        self.thresholds = bundle["thresholds"]
+        self.pca_center = np.asarray(bundle["pca_scaler"]["center"])
+        self.pca_scale = np.asarray(bundle["pca_scaler"]["scale"])
+        self.pc1_mean = np.asarray(bundle["pc1"]["mean"])
+        self.pc1_loadings = np.asarray(bundle["pc1"]["loadings"])
+        self.pc1_flipped = bool(bundle["pc1"]["flipped"])
+        self.model_center = np.asarray(bundle["model_scaler"]["center"])
+        self.model_scale = np.asarray(bundle["model_scaler"]["scale"])
+        self._booster_json = bundle["booster"]
+        self.trees = TreeEnsemble(self._booster_json)
+        # Bundles are shared between threads (registry memo), so the native
+        # predictor is built once under a lock and never replaces self.trees
+        self._xgb_trees = None
+        self._xgb_lock = threading.Lock()
+
+    def xgboost_trees(self):
+        # Same booster through XGBoost's native predictor (needs xgboost)
+        with self._xgb_lock:
+            if self._xgb_trees is None:
+                self._xgb_trees = XGBoostTrees(self._booster_json)
+            return self._xgb_trees
+
+    def xgboost_booster(self):
+        # Native booster, e.g. for pred_contribs
+        return self.xgboost_trees().booster
+
+    def model_inputs(self, X):
+        # Features as Model A's trees see them (after its robust scaler)
+        return (np.asarray(X, dtype=np.float64) - self.model_center) / self.model_scale
+
+    def latent(self, X):
+        # Raw PC1, same as pca.transform(pca_scaler.transform(X))
+        Xs = (np.asarray(X, dtype=np.float64) - self.pca_center) / self.pca_scale
+        return (Xs - self.pc1_mean) @ self.pc1_loadings
+
+    def aligned_latent(self, X):
+        # PC1 with the training-time flip applied (the scale the thresholds live on)
+        pc1 = self.latent(X)
+        return -pc1 if self.pc1_flipped else pc1
+
+    def threshold_labels(self, aligned):
+        return threshold_labels(aligned, self.thresholds)
+
+    def predict_proba(self, X, trees=None):
+        # trees: another predictor for the same booster (e.g. xgboost_trees())
+        return (trees or self.trees).predict_proba(self.model_inputs(X))
+
+    def score(self, X):
+        # Same outputs as score_one_session.score_features: labels, confidence, raw PC1
+        proba = self.predict_proba(X)
+        return np.argmax(proba, axis=1), np.max(proba, axis=1), self.latent(X)
+
+# --------------------------
+# Threshold-only fast path.
+# Labels are percentile bands on aligned PC1, so away from the band edges the
+# scaler + PC1 dot product + flip already gives Model A's answer; only rows
+# within `margin` of a threshold need the trees. The margin is calibrated at
+# training time against out-of-fold Model A predictions.
+# --------------------------
+
+THRESHOLD_KEYS = ("p10", "p30", "p60")
+
+def threshold_labels(aligned, thresholds):
+    t = thresholds
+    return np.select(
+        [aligned <= t["p10"], aligned <= t["p30"], aligned <= t["p60"]],
+        [3, 2, 1], default=0,
+    )
+
+def threshold_distance(aligned, thresholds):
+    # Distance (PC1 units) to the nearest band edge
+    t = np.array([thresholds[k] for k in THRESHOLD_KEYS])
+    return np.min(np.abs(np.asarray(aligned, dtype=np.float64)[:, None] - t), axis=1)
+
+def calibrate_fast_path(aligned, thresholds, model_labels, max_disagreement=0.01):
+    # Smallest margin such that, among rows at least `margin` from every
+    # threshold, threshold labels and Model A disagree on at most
+    # max_disagreement of them. margin None: no margin qualifies (always fall back).
+    aligned = np.asarray(aligned, dtype=np.float64)
+    disagree = threshold_labels(aligned, thresholds) != np.asarray(model_labels)
+    dist = threshold_distance(aligned, thresholds)
+    order = np.argsort(dist, kind="stable")
+    d, dis = dist[order], disagree[order]
+    n = len(d)
+    # Disagreement among the fast rows if the first i (nearest) rows fall back
+    served = n - np.arange(n)
+    tail = np.cumsum(dis[::-1])[::-1] / served
+    ok = np.flatnonzero(tail <= max_disagreement)
+    if not len(ok):
+        margin = None
+    else:
+        i = int(ok[0])
+        margin = 0.0 if i == 0 else float((d[i - 1] + d[i]) / 2)
+    fast = np.zeros(n, dtype=bool) if margin is None else dist >= margin
+    agreement = 1.0 - float(disagree[fast].mean()) if fast.any() else None
+    return {
+        "margin": margin,
+        "max_disagreement": max_disagreement,
+        "n_sessions": int(n),
+        "threshold_only_disagreement": float(disagree.mean()) if n else 0.0,
+        "fallback_rate": 1.0 - float(fast.mean()) if n else 1.0,
+        "fast_rows_agreement": agreement,
+        "calibrated_on": "out-of-fold Model A predictions",
+    }
+
+def load_bundle(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return MotorBundle(json.load(f))
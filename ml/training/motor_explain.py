@@ -0,0 +1,199 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# --------------------------
+# Per-session explanations, computed for whole batches.
+#   - Model A: XGBoost pred_contribs (TreeSHAP) for the predicted class, in
+#     margin units: bias + feature terms = that class's raw margin.
+#   - Latent: PC1 terms (z_j - mean_j) * loading_j, summing to the raw PC1
+#     score that score_one_session reports as latent_score.
+# An optional on-disk cache (SQLite, stdlib) keeps the vectors per
+# (model, sessionId), so repeated views of a results page are lookups. The
+# model key includes the registry's artifact fingerprint, not just the
+# version name, so a retrain into the same folder never serves stale rows.
+# --------------------------
+
+def model_contributions(X, artifacts):
+    # -> (n, n_class, n_features + 1); the last column is the bias term.
+    # Both scoring modes go through XGBoost's native predictor.
+    import xgboost as xgb
+    X = np.asarray(X, dtype=np.float64)
+    if "bundle" in artifacts:
+        bundle = artifacts["bundle"]
+        booster = bundle.xgboost_booster()
+        Xs = bundle.model_inputs(X)
+    else:
+        model = artifacts["model"]
+        booster = model.named_steps["xgb"].get_booster()
+        Xs = model[:-1].transform(pd.DataFrame(X, columns=artifacts["motor_cols"]))
+    dm = xgb.DMatrix(np.asarray(Xs, dtype=np.float32), feature_names=booster.feature_names)
+    return booster.predict(dm, pred_contribs=True)
+
+def latent_terms(X, artifacts):
+    # -> (n, n_features); rows sum to the raw PC1 score
+    X = np.asarray(X, dtype=np.float64)
+    if "bundle" in artifacts:
+        b = artifacts["bundle"]
+        center, scale, mean, loadings = b.pca_center, b.pca_scale, b.pc1_mean, b.pc1_loadings
+    else:
+        scaler, pca = artifacts["pca_scaler"], artifacts["pca"]
+        center = getattr(scaler, "center_", None)
+        scale = getattr(scaler, "scale_", None)
+        center = 0.0 if center is None else center
+        scale = 1.0 if scale is None else scale
+        mean, loadings = pca.mean_, pca.components_[0]
+    return ((X - center) / scale - mean) * loadings
+
+def row_digests(X):
+    # Short hash of each feature row: a cached entry is reused only if the
+    # session's features are unchanged
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    return [hashlib.blake2b(row.tobytes(), digest_size=8).digest() for row in X]
+
+# --------------------------
+# On-disk cache
+# --------------------------
+
+class ExplanationCache:
+    # One row per (model key, sessionId): label + float32 vectors. Least
+    # recently used rows are evicted once there are more than max_entries.
+    # A single connection shared across threads, serialized by a lock.
+    QUERY_CHUNK = 500  # bound parameters per IN (...) query
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS explanations ("
+            " model_key TEXT NOT NULL, session_id TEXT NOT NULL, digest BLOB NOT NULL,"
+            " label INTEGER NOT NULL, contribs BLOB NOT NULL, terms BLOB NOT NULL, used REAL NOT NULL,"
+            " PRIMARY KEY (model_key, session_id))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS explanations_used ON explanations (used)")
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+
+    def get_many(self, model_key, session_ids, digests):
+        # -> {position: (label, contribs, terms)} for ids cached with the same digest
+        positions = {}
+        for i, sid in enumerate(session_ids):
+            positions.setdefault(sid, []).append(i)
+        found = {}
+        ids = list(positions)
+        with self._lock:
+            for start in range(0, len(ids), self.QUERY_CHUNK):
+                part = ids[start:start + self.QUERY_CHUNK]
+                marks = ",".join("?" * len(part))
+                rows = self.conn.execute(
+                    f"SELECT session_id, digest, label, contribs, terms FROM explanations "
+                    f"WHERE model_key = ? AND session_id IN ({marks})", [model_key] + part,
+                ).fetchall()
+                hit_ids = []
+                for sid, digest, label, contribs, terms in rows:
+                    entry = (int(label), np.frombuffer(contribs, dtype=np.float32),
+                             np.frombuffer(terms, dtype=np.float32))
+                    for i in positions[sid]:
+                        if digests[i] == digest:
+                            found[i] = entry
+                            hit_ids.append(sid)
+                if hit_ids:
+                    self.conn.execute(
+                        f"UPDATE explanations SET used = ? WHERE model_key = ? "
+                        f"AND session_id IN ({','.join('?' * len(hit_ids))})", [time.time(), model_key] + hit_ids,
+                    )
+            self.hits += len(found)
+            self.misses += len(session_ids) - len(found)
+        return found
+
+    def put_many(self, model_key, entries):
+        # entries: (session_id, digest, label, contribs, terms)
+        now = time.time()
+        rows = [
+            (model_key, sid, digest, int(label), np.asarray(c, dtype=np.float32).tobytes(),
+             np.asarray(t, dtype=np.float32).tobytes(), now)
+            for sid, digest, label, c, t in entries
+        ]
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("INSERT OR REPLACE INTO explanations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("COMMIT")
+            self._evict()
+
+    def _evict(self):
+        n = self.conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+        if n > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM explanations WHERE rowid IN "
+                "(SELECT rowid FROM explanations ORDER BY used LIMIT ?)", (n - self.max_entries,),
+            )
+
+    def stats(self):
+        return {"entries": len(self), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+# --------------------------
+# Batches
+# --------------------------
+
+def model_key(artifacts):
+    # Version name + artifact fingerprint (artifacts from model_registry)
+    fingerprint = artifacts.get("model_fingerprint")
+    if fingerprint is None:
+        raise ValueError("Caching explanations needs artifacts loaded through model_registry (model_fingerprint)")
+    return f"{artifacts['model_version']}@{fingerprint}"
+
+def explain_batch(X, artifacts, session_ids=None, cache=None):
+    # -> (labels, contribs, terms): Model A's predicted class, its TreeSHAP
+    # row (n, n_features + 1; bias last) and the PC1 terms (n, n_features).
+    # With a cache, rows with a sessionId are looked up first and only the
+    # misses are computed, in one pred_contribs call.
+    X = np.asarray(X, dtype=np.float64)
+    n, n_features = X.shape
+    labels = np.empty(n, dtype=np.int64)
+    contribs = np.empty((n, n_features + 1), dtype=np.float32)
+    terms = np.empty((n, n_features), dtype=np.float32)
+
+    todo = np.arange(n)
+    cached = cache is not None and session_ids is not None
+    if cached:
+        key = model_key(artifacts)
+        sids = ["" if s is None else str(s) for s in session_ids]
+        keyed = [i for i, s in enumerate(sids) if s]
+        digests = row_digests(X)
+        hits = cache.get_many(key, [sids[i] for i in keyed], [digests[i] for i in keyed])
+        for k, (label, c, t) in hits.items():
+            i = keyed[k]
+            labels[i], contribs[i], terms[i] = label, c, t
+        done = {keyed[k] for k in hits}
+        todo = np.array([i for i in range(n) if i not in done], dtype=np.int64)
+
+    if len(todo):
+        full = model_contributions(X[todo], artifacts)
+        # Class margins are the row sums; their argmax is Model A's label
+        lab = np.argmax(full.sum(axis=2), axis=1)
+        labels[todo] = lab
+        contribs[todo] = full[np.arange(len(todo)), lab]
+        terms[todo] = latent_terms(X[todo], artifacts)
+        if cached:
+            cache.put_many(key, [
+                (sids[i], digests[i], labels[i], contribs[i], terms[i]) for i in todo if sids[i]
+            ])
+    return labels, contribs, terms
+
+def open_cache(path, max_entries=100000):
+    return None if not path else ExplanationCache(path, max_entries=max_entries)
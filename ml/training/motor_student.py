@@ -0,0 +1,156 @@
+import json
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from sklearn.model_selection import GroupShuffleSplit
+
+# --------------------------
+# Distilled client-side student of Model A.
+# A multinomial logistic regression over the robust-scaled motor features
+# plus aligned PC1, fitted to Model A's class probabilities (soft targets).
+# Scaling, PC1 and the flip are linear, so they are folded into one weight
+# matrix over the raw features: scoring is 4 dot products + softmax, easy
+# to port to JS (see README_TRAINING.md for the file format).
+# --------------------------
+
+STUDENT_FORMAT = "aura-motor-student"
+STUDENT_VERSION = 1
+STUDENT_FILENAME = "motor_student.json"
+
+def _sig(v, digits=7):
+    # ~float32 precision keeps the JSON small
+    return [float(f"{x:.{digits}g}") for x in np.asarray(v, dtype=np.float64).ravel()]
+
+class LinearStudent:
+    # logits = W x + b over raw motor features (columns in training order);
+    # latent = u x + u0 is the raw PC1 score, as score_features() returns it
+    def __init__(self, weights, bias, latent_weights, latent_bias):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.latent_weights = np.asarray(latent_weights, dtype=np.float64)
+        self.latent_bias = float(latent_bias)
+
+    @classmethod
+    def fold(cls, clf, pca_scaler, pca, pc1_flipped):
+        # clf was fitted on [z, aligned] with z = (x - c) / s and
+        # aligned = sign * (z - m) . v; rewrite both in terms of x
+        c = np.asarray(pca_scaler.center_, dtype=np.float64)
+        s = np.asarray(pca_scaler.scale_, dtype=np.float64)
+        m, v = pca.mean_, pca.components_[0]
+        sign = -1.0 if pc1_flipped else 1.0
+        coef_z, coef_a = clf.coef_[:, :-1], clf.coef_[:, -1]
+        w_z = coef_z + sign * coef_a[:, None] * v          # per unit of z
+        bias = clf.intercept_ - sign * coef_a * float(m @ v)
+        u = v / s
+        return cls(w_z / s, bias - (w_z / s) @ c, u, -float(u @ c) - float(m @ v))
+
+    def logits(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.weights.T + self.bias
+
+    def predict_proba(self, X):
+        z = self.logits(X)
+        z -= z.max(axis=1, keepdims=True)
+        e = np.exp(z)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def latent(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.latent_weights + self.latent_bias
+
+    def score(self, X):
+        # Same outputs as score_one_session.score_features: labels, confidence, raw PC1
+        proba = self.predict_proba(X)
+        return np.argmax(proba, axis=1), np.max(proba, axis=1), self.latent(X)
+
+def student_inputs(X, pca_scaler, pca, pc1_flipped):
+    # [robust-scaled features, aligned PC1]
+    Z = (np.asarray(X, dtype=np.float64) - pca_scaler.center_) / pca_scaler.scale_
+    aligned = (Z - pca.mean_) @ pca.components_[0]
+    return np.column_stack([Z, -aligned if pc1_flipped else aligned])
+
+def fit_student(F, teacher_proba, C=1.0, min_weight=1e-3):
+    # Soft-target distillation: every row once per class, weighted by the
+    # teacher's probability (= cross-entropy against the teacher). Near-zero
+    # weights are dropped, keeping each class's most probable row.
+    n, k = teacher_proba.shape
+    w = teacher_proba.reshape(-1)
+    keep = w >= min_weight
+    keep[np.argmax(teacher_proba, axis=0) * k + np.arange(k)] = True
+    rows = np.flatnonzero(keep)
+    clf = LogisticRegression(C=C, max_iter=2000)
+    clf.fit(F[rows // k], rows % k, sample_weight=w[rows])
+    return clf
+
+def _agreement(student_proba, teacher_proba, y, teacher_vs_labels=True):
+    # teacher_vs_labels=False for held-out rows: the teacher was fitted on every
+    # session, so its score there is in-sample (held-out Model A scores are the
+    # out-of-fold CV results)
+    s, t = np.argmax(student_proba, axis=1), np.argmax(teacher_proba, axis=1)
+    out = {
+        "n_sessions": int(len(s)),
+        "label_agreement": float(np.mean(s == t)),
+        "macro_f1_vs_teacher": float(f1_score(t, s, average="macro")),
+        "mean_abs_proba_diff": float(np.mean(np.abs(student_proba - teacher_proba))),
+        "student_macro_f1_vs_labels": float(f1_score(y, s, average="macro")),
+    }
+    if teacher_vs_labels:
+        out["teacher_macro_f1_vs_labels"] = float(f1_score(y, t, average="macro"))
+    out["confusion_teacher_x_student"] = np.bincount(t * 4 + s, minlength=16).reshape(4, 4).tolist()
+    return out
+
+def distill_student(X, teacher, y, groups, pca_scaler, pca, pc1_flipped,
+                    C=1.0, holdout=0.2, max_rows=50000, seed=42):
+    # teacher: X -> Model A probabilities. Returns (LinearStudent fitted on
+    # all (sampled) rows, report); agreement is measured on held-out
+    # participants with a student fitted without them.
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    if n > max_rows:
+        idx = np.sort(rng.choice(n, size=max_rows, replace=False))
+        X, y, groups = X[idx], y[idx], groups[idx]
+    X = np.asarray(X, dtype=np.float64)
+    teacher_proba = np.asarray(teacher(X), dtype=np.float64)
+    F = student_inputs(X, pca_scaler, pca, pc1_flipped)
+
+    report = {"kind": "softmax_linear", "C": C, "n_sessions": int(len(F)), "n_sessions_total": int(n)}
+    if holdout > 0 and len(np.unique(groups)) >= 2:
+        tr, te = next(GroupShuffleSplit(n_splits=1, test_size=holdout, random_state=seed).split(F, y, groups))
+        clf = fit_student(F[tr], teacher_proba[tr], C)
+        report["holdout"] = _agreement(clf.predict_proba(F[te]), teacher_proba[te], y[te], teacher_vs_labels=False)
+
+    clf = fit_student(F, teacher_proba, C)
+    student = LinearStudent.fold(clf, pca_scaler, pca, pc1_flipped)
+    report["in_sample"] = _agreement(student.predict_proba(X), teacher_proba, y)
+    return student, report
+
+def export_student(path, student, motor_cols, pc1_flipped, thresholds, model_version=None, agreement=None):
+    doc = {
+        "format": STUDENT_FORMAT,
+        "format_version": STUDENT_VERSION,
+        "model_version": model_version,
+        "kind": "softmax_linear",
+        "columns": list(motor_cols),
+        "weights": [_sig(row) for row in student.weights],
+        "bias": _sig(student.bias),
+        "latent": {"weights": _sig(student.latent_weights), "bias": _sig([student.latent_bias])[0],
+                   "flipped": bool(pc1_flipped)},
+        "thresholds": thresholds,
+        "agreement": agreement,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, separators=(",", ":"))
+
+def student_summary(report):
+    # Compact agreement block carried in the student JSON
+    ref = report.get("holdout", report["in_sample"])
+    return {
+        "measured_on": "held-out participants" if "holdout" in report else "training sessions",
+        "label_agreement": ref["label_agreement"],
+        "mean_abs_proba_diff": ref["mean_abs_proba_diff"],
+    }
+
+def load_student(path):
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    if doc.get("format") != STUDENT_FORMAT:
+        raise ValueError("Not a motor student file")
+    return LinearStudent(doc["weights"], doc["bias"], doc["latent"]["weights"], doc["latent"]["bias"]), doc
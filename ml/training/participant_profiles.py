@@ -0,0 +1,214 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# --------------------------
+# Longitudinal participant profiles.
+# Running aggregates per participant, each updated in O(1) per scored session:
+#   - EWMA of the latent PC1 score
+#   - EWMA of the class probabilities (argmax = the stable motor level)
+#   - PC1 trend per session: exponentially weighted least-squares slope over
+#     the session ordinal, kept as five decayed sums
+#   - the last `history` probability vectors (ring buffer)
+# State is array-backed: one row per participant, an id -> row dict, arrays
+# grown by doubling. Saved as a single .npz (no pickling).
+# Applied sessionIds are remembered as a set of 64-bit hashes (O(1) lookup
+# per session; saved as a uint64 array, 8 bytes per session), so re-scoring a
+# session (e.g. a nightly --all run) does not fold it in twice.
+# --------------------------
+
+TREND_SUMS = 5  # sum w, w*t, w*y, w*t^2, w*t*y
+
+def session_keys(session_ids):
+    return np.array([int.from_bytes(hashlib.blake2b(str(s).encode("utf-8"), digest_size=8).digest(), "little")
+                     for s in session_ids], dtype=np.uint64)
+
+class ParticipantProfiles:
+    ARRAYS = ("n_sessions", "latent_ewma", "last_latent", "proba_ewma", "proba_history", "trend")
+
+    def __init__(self, n_classes=4, alpha=0.3, history=8, capacity=1024):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.n_classes = n_classes
+        self.alpha = alpha
+        self.history = history
+        self.ids = {}
+        self.id_list = []
+        self.seen_sessions = set()
+        self._lock = threading.Lock()
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        self.n_sessions = np.zeros(capacity, dtype=np.int32)
+        self.latent_ewma = np.zeros(capacity, dtype=np.float64)
+        self.last_latent = np.zeros(capacity, dtype=np.float32)
+        self.proba_ewma = np.zeros((capacity, self.n_classes), dtype=np.float32)
+        self.proba_history = np.zeros((capacity, self.history, self.n_classes), dtype=np.float32)
+        self.trend = np.zeros((capacity, TREND_SUMS), dtype=np.float64)
+
+    def __len__(self):
+        return len(self.id_list)
+
+    def _grow(self, needed):
+        capacity = len(self.n_sessions)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = {name: getattr(self, name) for name in self.ARRAYS}
+        self._alloc(capacity)
+        for name, arr in old.items():
+            getattr(self, name)[:len(arr)] = arr
+
+    def _rows(self, participant_ids):
+        rows = np.empty(len(participant_ids), dtype=np.int64)
+        for i, pid in enumerate(participant_ids):
+            row = self.ids.get(pid)
+            if row is None:
+                row = self.ids[pid] = len(self.id_list)
+                self.id_list.append(pid)
+            rows[i] = row
+        self._grow(len(self.id_list))
+        return rows
+
+    # --------------------------
+    # Updates
+    # --------------------------
+
+    def update(self, participant_ids, proba, latent, session_ids=None):
+        # Sessions in chronological order. A participant seen k times in one
+        # call is updated in k vectorized rounds (its k-th session in round k).
+        # Returns per-session snapshots (arrays aligned with the input) taken
+        # right after that session's update. With session_ids, sessions
+        # already applied (earlier or within this call) are skipped and
+        # "repeated" marks them; their snapshot is the participant's
+        # profile at the end of the call. Empty ids are always applied.
+        participant_ids = [str(p) for p in participant_ids]
+        proba = np.asarray(proba, dtype=np.float64)
+        latent = np.asarray(latent, dtype=np.float64)
+        with self._lock:
+            rows = self._rows(participant_ids)
+            repeated = self._mark_seen(session_ids, len(rows))
+            apply = np.flatnonzero(~repeated)
+            rank = np.full(len(rows), -1)
+            rank[apply] = pd.Series(rows[apply]).groupby(rows[apply]).cumcount().to_numpy()
+            out = {
+                "n_sessions": np.empty(len(rows), dtype=np.int32),
+                "latent_ewma": np.empty(len(rows)),
+                "proba_ewma": np.empty((len(rows), self.n_classes)),
+                "latent_trend": np.empty(len(rows)),
+                "repeated": repeated,
+            }
+            for k in range(int(rank.max()) + 1 if len(rank) else 0):
+                sel = np.flatnonzero(rank == k)
+                self._update_rows(rows[sel], proba[sel], latent[sel])
+                self._snapshot(out, sel, rows[sel])
+            sel = np.flatnonzero(repeated)
+            self._snapshot(out, sel, rows[sel])
+            return out
+
+    def _snapshot(self, out, sel, r):
+        out["n_sessions"][sel] = self.n_sessions[r]
+        out["latent_ewma"][sel] = self.latent_ewma[r]
+        out["proba_ewma"][sel] = self.proba_ewma[r]
+        out["latent_trend"][sel] = self._slope(r)
+
+    def _mark_seen(self, session_ids, n):
+        # -> repeated mask; records the new sessionIds
+        repeated = np.zeros(n, dtype=bool)
+        if session_ids is None:
+            return repeated
+        ids = ["" if s is None else str(s) for s in session_ids]
+        keyed = [i for i, s in enumerate(ids) if s]
+        seen = self.seen_sessions
+        # Within the call, only the first occurrence of an id counts
+        for i, key in zip(keyed, session_keys([ids[i] for i in keyed]).tolist()):
+            if key in seen:
+                repeated[i] = True
+            else:
+                seen.add(key)
+        return repeated
+
+    def _update_rows(self, r, proba, latent):
+        # r: distinct rows
+        a = self.alpha
+        first = self.n_sessions[r] == 0
+        self.latent_ewma[r] = np.where(first, latent, a * latent + (1 - a) * self.latent_ewma[r])
+        self.proba_ewma[r] = np.where(first[:, None], proba, a * proba + (1 - a) * self.proba_ewma[r])
+        self.last_latent[r] = latent
+        self.proba_history[r, self.n_sessions[r] % self.history] = proba
+        t = self.n_sessions[r].astype(np.float64)
+        self.trend[r] = (1 - a) * self.trend[r] + np.stack([np.ones_like(t), t, latent, t * t, t * latent], axis=1)
+        self.n_sessions[r] += 1
+
+    def _slope(self, r):
+        # Weighted LS slope of latent vs session ordinal; NaN until 2 sessions
+        sw, st, sy, stt, sty = self.trend[r].T
+        denom = sw * stt - st * st
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = (sw * sty - st * sy) / denom
+        return np.where((self.n_sessions[r] >= 2) & (denom > 1e-12), slope, np.nan)
+
+    # --------------------------
+    # Reads
+    # --------------------------
+
+    def get(self, participant_id):
+        # Under the lock: a concurrent update() may reallocate the arrays
+        with self._lock:
+            row = self.ids.get(str(participant_id))
+            if row is None:
+                return None
+            n = int(self.n_sessions[row])
+            k = min(n, self.history)
+            # Ring buffer -> oldest first
+            order = [(n - k + i) % self.history for i in range(k)]
+            return {
+                "n_sessions": n,
+                "latent_ewma": float(self.latent_ewma[row]),
+                "last_latent": float(self.last_latent[row]),
+                "proba_ewma": self.proba_ewma[row].astype(float).tolist(),
+                "latent_trend": float(self._slope(np.array([row]))[0]),
+                "proba_history": self.proba_history[row, order].astype(float).tolist(),
+            }
+
+    # --------------------------
+    # Persistence
+    # --------------------------
+
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        with self._lock:
+            # Inside the lock: update() may add participants meanwhile
+            n = len(self.id_list)
+            np.savez(
+                tmp,
+                ids=np.array(self.id_list, dtype=str),
+                params=np.array([self.n_classes, self.history], dtype=np.int64),
+                alpha=np.array(self.alpha),
+                seen_sessions=np.sort(np.fromiter(self.seen_sessions, dtype=np.uint64, count=len(self.seen_sessions))),
+                **{name: getattr(self, name)[:n] for name in self.ARRAYS},
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            n_classes, history = (int(v) for v in z["params"])
+            ids = [str(s) for s in z["ids"]]
+            prof = cls(n_classes=n_classes, alpha=float(z["alpha"]), history=history,
+                       capacity=max(len(ids), 1))
+            for name in prof.ARRAYS:
+                getattr(prof, name)[:len(ids)] = z[name]
+            if "seen_sessions" in z:
+                prof.seen_sessions = set(z["seen_sessions"].astype(np.uint64).tolist())
+        prof.id_list = ids
+        prof.ids = {pid: i for i, pid in enumerate(ids)}
+        return prof
+
+def open_profiles(path, **kw):
+    # Existing state file, or a fresh store (saved on the first save())
+    return ParticipantProfiles.load(path) if os.path.exists(path) else ParticipantProfiles(**kw)
@@ -0,0 +1,152 @@
+import cProfile
+import fnmatch
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# --------------------------
+# Per-stage wall time, CPU time and peak RSS.
+# RSS is sampled by a background thread (psutil if installed, else /proc on
+# Linux); without either, memory fields are None.
+# Profiling is opt-in: cProfile around the whole run or only around stages
+# matching a pattern, dumped as a .prof file (pstats / snakeviz). Stages are
+# plain context managers, so external samplers such as py-spy see the real
+# call stacks.
+# --------------------------
+
+try:
+    import psutil
+    _PROC = psutil.Process()
+except ImportError:
+    _PROC = None
+
+def current_rss():
+    if _PROC is not None:
+        return _PROC.memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _mb(n):
+    return None if n is None else round(n / (1024 * 1024), 2)
+
+class StageRecorder:
+    def __init__(self, sample_interval=0.005, profile_path=None, profile_stages=None):
+        self.sample_interval = sample_interval
+        self.t0 = time.perf_counter()
+        self.stages = []
+        self._active = []
+        self.profile_path = profile_path
+        self.profile_stages = profile_stages
+        self._profiler = cProfile.Profile() if profile_path else None
+        self._profiling = False
+        if self._profiler is not None and not profile_stages:
+            self._profiler.enable()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        if current_rss() is not None:
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_interval):
+            rss = current_rss()
+            with self._lock:
+                for rec in self._active:
+                    rec["_peak"] = max(rec["_peak"], rss)
+
+    @contextmanager
+    def stage(self, name, **meta):
+        rss = current_rss()
+        rec = {"name": name, "depth": len(self._active), "pid": os.getpid(), "_peak": rss or 0}
+        with self._lock:
+            self._active.append(rec)
+        # Nested matches stay inside the outermost profiled stage
+        profile = (self._profiler is not None and bool(self.profile_stages) and not self._profiling
+                   and fnmatch.fnmatch(name, self.profile_stages))
+        if profile:
+            self._profiling = True
+            self._profiler.enable()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield rec
+        finally:
+            wall1, cpu1 = time.perf_counter(), time.process_time()
+            if profile:
+                self._profiler.disable()
+                self._profiling = False
+            end_rss = current_rss()
+            with self._lock:
+                self._active.remove(rec)
+            peak = rec.pop("_peak")
+            rec.update({
+                "start_s": round(wall0 - self.t0, 6),
+                "wall_s": round(wall1 - wall0, 6),
+                "cpu_s": round(cpu1 - cpu0, 6),
+                "rss_start_mb": _mb(rss),
+                "rss_end_mb": _mb(end_rss),
+                "peak_rss_mb": _mb(None if rss is None else max(peak, end_rss or 0)),
+            })
+            if meta:
+                rec["meta"] = meta
+            self.stages.append(rec)
+
+    def absorb(self, records, t0):
+        # Records from a recorder in another process (e.g. a CV worker), nested
+        # under the currently open stage; perf_counter is system-wide, so start
+        # times are re-based on t0
+        depth = len(self._active)
+        for r in records:
+            r = dict(r, start_s=round(r["start_s"] + t0 - self.t0, 6), depth=r["depth"] + depth)
+            self.stages.append(r)
+
+    def close(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+            self._profiler = None
+
+    def summary(self):
+        # Stages in start order
+        return sorted(self.stages, key=lambda r: r["start_s"])
+
+    def by_name(self):
+        return {r["name"]: r for r in self.stages}
+
+    def report(self):
+        # Section for training_report.json
+        return {
+            "total_wall_s": round(time.perf_counter() - self.t0, 6),
+            "peak_rss_mb": max((r["peak_rss_mb"] or 0 for r in self.stages), default=None) or None,
+            "stages": [{k: v for k, v in r.items() if k != "pid"} for r in self.summary()],
+        }
+
+    def chrome_trace(self):
+        # chrome://tracing / Perfetto "complete" events
+        events = []
+        for r in self.summary():
+            args = {k: r[k] for k in ("cpu_s", "rss_start_mb", "rss_end_mb", "peak_rss_mb")}
+            args.update(r.get("meta", {}))
+            events.append({
+                "name": r["name"], "ph": "X", "pid": r["pid"], "tid": 0,
+                "ts": round(r["start_s"] * 1e6, 1), "dur": round(r["wall_s"] * 1e6, 1),
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+def stage(recorder, name, **meta):
+    # recorder may be None (instrumentation off)
+    return recorder.stage(name, **meta) if recorder is not None else nullcontext()
@@ -0,0 +1,274 @@
+import argparse
+import copy
+import json
+import os
+import joblib
+import numpy as np
+import xgboost as xgb
+
+from sklearn.model_selection import GroupShuffleSplit
+from sklearn.metrics import f1_score, balanced_accuracy_score
+from xgboost import XGBClassifier
+
+from dataset_io import categorical, read_dataset, widen
+from motor_bundle import BUNDLE_FILENAME, export_bundle
+from incremental_state import (
+    load_state, save_state, state_path, bootstrap_state, pc1_from_covariance, update_sample,
+)
+from train_motor_model_v2 import ID_COLS, labels_from_thresholds
+
+# --------------------------
+# Warm-start retraining: base version + new sessions only -> new version.
+# The robust scalers and Model B's encoder stay frozen (the trees were grown on
+# their output); PC1 is recomputed from the state's streamed covariance with
+# the new sessions folded in, thresholds come from the state's row sample (history + new sessions) re-projected onto
+# the updated PC1, and both boosters get extra rounds on the new sessions.
+# States without a sample fall back to the merged PC1 sketch, which mixes
+# the base projection with the new one; the report records which was used.
+# --------------------------
+
+CUTS = (10, 30, 60)
+
+def prepare_new_sessions(df, motor_cols, ctx_num_cols, ctx_cat_cols, medians):
+    # Same cleaning as the full trainer, but missing values use the stored
+    # (base + history) medians instead of medians of the new batch
+    missing = [c for c in ID_COLS + motor_cols if c not in df.columns]
+    if missing:
+        raise ValueError(f"New sessions are missing columns: {missing[:10]}{'...' if len(missing) > 10 else ''}")
+    n_in = len(df)
+    df = df.loc[df[motor_cols].isna().mean(axis=1) <= 0.25].reset_index(drop=True)
+    for c in motor_cols + ctx_num_cols:
+        if c not in df.columns:
+            df[c] = np.nan
+        if df[c].isna().any():
+            df[c] = df[c].fillna(medians[c])
+    df[motor_cols + ctx_num_cols] = widen(df, motor_cols + ctx_num_cols)
+    for c in ctx_cat_cols:
+        if c not in df.columns:
+            df[c] = "unknown"
+        df[c] = categorical(df[c])
+    return df, n_in - len(df)
+
+def continue_boosting(pipeline, X, y, n_rounds):
+    # Fitted Pipeline([prep, ("xgb", XGBClassifier)]) -> copy with n_rounds more
+    # trees trained on X, y. Uses xgb.train so batches missing a class still work.
+    model = copy.deepcopy(pipeline)
+    prep = model.steps[0][1]
+    clf = model.named_steps["xgb"]
+    params = {k: v for k, v in clf.get_xgb_params().items() if v is not None}
+    booster = xgb.train(params, xgb.DMatrix(prep.transform(X), label=y),
+                        num_boost_round=n_rounds, xgb_model=clf.get_booster())
+    new_clf = XGBClassifier(**{**clf.get_params(), "n_estimators": booster.num_boosted_rounds()})
+    new_clf.load_model(bytearray(booster.save_raw("json")))
+    model.steps[-1] = ("xgb", new_clf)
+    return model
+
+def holdout_eval(modelA, XA, y, groups, n_rounds, holdout, seed):
+    # Participant-disjoint split of the new sessions: base vs continued Model A
+    if holdout <= 0 or len(np.unique(groups)) < 2:
+        return None
+    tr, te = next(GroupShuffleSplit(n_splits=1, test_size=holdout, random_state=seed).split(XA, y, groups=groups))
+    updated = continue_boosting(modelA, XA.iloc[tr], y[tr], n_rounds)
+    base_pred = modelA.predict(XA.iloc[te])
+    new_pred = updated.predict(XA.iloc[te])
+
+    def scores(pred):
+        return {
+            "macro_f1": float(f1_score(y[te], pred, average="macro")),
+            "balanced_acc": float(balanced_accuracy_score(y[te], pred)),
+        }
+
+    return {
+        "n_train": int(len(tr)),
+        "n_test": int(len(te)),
+        "base_model": scores(base_pred),
+        "updated_model": scores(new_pred),
+        "base_vs_updated_agreement": float(np.mean(base_pred == new_pred)),
+    }
+
+def drift_summary(base_sketches, new_df, motor_cols, pca_scaler, base_comp, new_comp,
+                  base_thresholds, new_thresholds, base_label_counts, new_pc1_aligned, top=10):
+    base_med = base_sketches.quantile(0.5)
+    base_iqr = base_sketches.quantile(0.75) - base_sketches.quantile(0.25)
+    X = new_df[motor_cols].values
+    new_med = np.median(X, axis=0)
+    new_iqr = np.percentile(X, 75, axis=0) - np.percentile(X, 25, axis=0)
+    n_motor = len(motor_cols)
+    # Median shift in units of the (frozen) robust scale used by PCA
+    shift = (new_med - base_med[:n_motor]) / pca_scaler.scale_
+    with np.errstate(divide="ignore", invalid="ignore"):
+        iqr_ratio = new_iqr / base_iqr[:n_motor]
+
+    order = np.argsort(-np.abs(shift))[:top]
+    base_dist = np.asarray(base_label_counts, dtype=float)
+    return {
+        "features": {
+            "mean_abs_median_shift": float(np.mean(np.abs(shift))),
+            "n_shift_gt_0_5": int(np.sum(np.abs(shift) > 0.5)),
+            "top_shifted": [
+                {
+                    "column": motor_cols[i],
+                    "base_median": float(base_med[i]),
+                    "new_median": float(new_med[i]),
+                    "robust_shift": float(shift[i]),
+                    "iqr_ratio": float(iqr_ratio[i]) if np.isfinite(iqr_ratio[i]) else None,
+                }
+                for i in order
+            ],
+        },
+        "pc1": {
+            "axis_cosine": float(abs(np.dot(base_comp, new_comp)) / (np.linalg.norm(base_comp) * np.linalg.norm(new_comp))),
+            "base_thresholds": base_thresholds,
+            "new_thresholds": new_thresholds,
+            "new_batch_percentiles": {f"p{p}": float(v) for p, v in zip(CUTS + (50,), np.percentile(new_pc1_aligned, CUTS + (50,)))},
+        },
+        "labels": {
+            "base_distribution": (base_dist / base_dist.sum()).tolist(),
+            "new_batch_under_base_thresholds": np.bincount(labels_from_thresholds(new_pc1_aligned, base_thresholds), minlength=4).tolist(),
+            "new_batch_under_new_thresholds": np.bincount(labels_from_thresholds(new_pc1_aligned, new_thresholds), minlength=4).tolist(),
+        },
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", required=True, help="Existing version folder (e.g., ..\\model_registry\\motor\\1.0.0)")
+    ap.add_argument("--csv", required=True, help="New sessions only (.csv or .parquet)")
+    ap.add_argument("--outdir", required=True, help="New version folder (e.g., ..\\model_registry\\motor\\1.0.1)")
+    ap.add_argument("--extra_trees", type=int, default=50, help="Boosting rounds added to Model A and B")
+    ap.add_argument("--holdout", type=float, default=0.2, help="Share of new participants held out to compare base vs updated Model A (0 = skip)")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    if os.path.abspath(args.base) == os.path.abspath(args.outdir):
+        raise SystemExit("--outdir must differ from --base (versions are immutable)")
+
+    with open(os.path.join(args.base, "reports", "training_report.json"), "r", encoding="utf-8") as f:
+        base_report = json.load(f)
+    motor_cols = base_report["pca"]["motor_feature_columns"]
+    ctx_num_cols = base_report["modelB_motor_plus_context"]["context_numeric_columns"]
+    ctx_cat_cols = base_report["modelB_motor_plus_context"]["context_categorical_columns"]
+    flipped = base_report["pca"]["pc1_flipped"]
+    base_thresholds = base_report["labeling"]["thresholds"]
+
+    pca_scaler = joblib.load(os.path.join(args.base, "preprocess", "pca_scaler_motor.joblib"))
+    base_pca = joblib.load(os.path.join(args.base, "preprocess", "pca_pc1_motor.joblib"))
+    modelA = joblib.load(os.path.join(args.base, "models", "modelA_motor_only.joblib"))
+    modelB = joblib.load(os.path.join(args.base, "models", "modelB_motor_plus_context.joblib"))
+    if os.path.exists(state_path(args.base)):
+        state = load_state(args.base)
+    else:
+        print("No incremental state in base version; rebuilding it from the saved training table")
+        state = bootstrap_state(args.base, base_report, pca_scaler)
+
+    base_sketches = copy.deepcopy(state["feature_sketches"])
+    df, n_dropped = prepare_new_sessions(read_dataset(args.csv), motor_cols, ctx_num_cols, ctx_cat_cols,
+                                         base_sketches.median())
+    if len(df) == 0:
+        raise SystemExit("No usable new sessions")
+    groups = df["participantId"].astype(str).values
+
+    # PCA: fold the new sessions into the covariance, read PC1 off it
+    X_scaled = pca_scaler.transform(df[motor_cols].values)
+    base_comp = base_pca.components_[0]
+    state["motor_cov"].update(X_scaled)
+    pca = pc1_from_covariance(state["motor_cov"], reference=base_comp)
+    new_comp = pca.components_[0]
+    pc1 = pca.transform(X_scaled).reshape(-1)
+    pc1_aligned = -pc1 if flipped else pc1
+
+    state["pc1_sketch"].update(pc1_aligned)
+    sketch_thresholds = {f"p{p}": float(v) for p, v in zip(CUTS, state["pc1_sketch"].percentile(CUTS))}
+    if state.get("motor_sample") is not None:
+        # Thresholds on one projection: sampled history + new rows through the new PC1
+        state["motor_sample"] = update_sample(state["motor_sample"], X_scaled, np.random.default_rng(args.seed))
+        sample_pc1 = pca.transform(state["motor_sample"]["X"].astype(np.float64)).reshape(-1)
+        sample_pc1 = -sample_pc1 if flipped else sample_pc1
+        thresholds = {f"p{p}": float(v) for p, v in zip(CUTS, np.percentile(sample_pc1, CUTS))}
+        n_sample = len(sample_pc1)
+        threshold_source = {
+            "method": "row sample re-projected on the updated PC1",
+            "n_sample": int(n_sample),
+            # Binomial standard error of the sampled percentile ranks
+            "rank_std_error": {f"p{p}": float(np.sqrt(p / 100 * (1 - p / 100) / n_sample)) for p in CUTS},
+            "merged_sketch_thresholds": sketch_thresholds,
+        }
+    else:
+        thresholds = sketch_thresholds
+        threshold_source = {
+            "method": "merged PC1 sketch (base sessions on the base PC1, new sessions on the updated PC1)",
+            "note": "base state has no row sample; retrain fully to get thresholds on a single projection",
+        }
+    y = labels_from_thresholds(pc1_aligned, thresholds)
+
+    XA = df[motor_cols]
+    XB = df[motor_cols + ctx_num_cols + ctx_cat_cols]
+    holdout = holdout_eval(modelA, XA, y, groups, args.extra_trees, args.holdout, args.seed)
+    newA = continue_boosting(modelA, XA, y, args.extra_trees)
+    newB = continue_boosting(modelB, XB, y, args.extra_trees)
+
+    drift = drift_summary(base_sketches, df, motor_cols, pca_scaler, base_comp, new_comp,
+                          base_thresholds, thresholds, state["label_counts"], pc1_aligned)
+
+    state["feature_sketches"].update(df)
+    state["label_counts"] = (np.asarray(state["label_counts"]) + np.bincount(y, minlength=4)).tolist()
+    base_n = state["n_sessions"]
+    state["n_sessions"] = base_n + len(df)
+
+    for sub in ("models", "preprocess", "reports"):
+        os.makedirs(os.path.join(args.outdir, sub), exist_ok=True)
+    joblib.dump(pca_scaler, os.path.join(args.outdir, "preprocess", "pca_scaler_motor.joblib"))
+    joblib.dump(pca, os.path.join(args.outdir, "preprocess", "pca_pc1_motor.joblib"))
+    joblib.dump(newA, os.path.join(args.outdir, "models", "modelA_motor_only.joblib"))
+    joblib.dump(newB, os.path.join(args.outdir, "models", "modelB_motor_plus_context.joblib"))
+    # CV is not rerun, so the fast-path margin is the base version's calibration
+    fast_path = base_report.get("fast_path")
+    if fast_path is not None:
+        fast_path = dict(fast_path, calibrated_on=f"base version {os.path.basename(os.path.normpath(args.base))}")
+    export_bundle(os.path.join(args.outdir, "models", BUNDLE_FILENAME),
+                  motor_cols, pca_scaler, pca, flipped, thresholds, newA, fast_path=fast_path)
+    save_state(args.outdir, state)
+
+    report = copy.deepcopy(base_report)
+    report["seed"] = args.seed
+    # Stage timings belong to the base training run
+    report.pop("timings", None)
+    report["pca"]["explained_variance_ratio_pc1"] = float(pca.explained_variance_ratio_[0])
+    report["pca"]["pc1_loadings"] = {c: float(w) for c, w in zip(motor_cols, pca.components_[0])}
+    report["labeling"]["thresholds"] = thresholds
+    if fast_path is not None:
+        report["fast_path"] = fast_path
+    # The base version's student was distilled from the old Model A
+    report.pop("student", None)
+    report["xgb_params"] = {**report.get("xgb_params", {}),
+                            "n_estimators": int(newA.named_steps["xgb"].get_booster().num_boosted_rounds())}
+    report["incremental"] = {
+        "base_version": os.path.basename(os.path.normpath(args.base)),
+        "base_dir": os.path.abspath(args.base),
+        "cv_results_from": "base version (CV is not rerun incrementally)",
+        "n_base_sessions": int(base_n),
+        "n_new_sessions": int(len(df)),
+        "n_dropped_missing": int(n_dropped),
+        "n_total_sessions": int(state["n_sessions"]),
+        "extra_trees": args.extra_trees,
+        "thresholds_from": threshold_source,
+        "holdout": holdout,
+        "drift": drift,
+    }
+    with open(os.path.join(args.outdir, "reports", "training_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+
+    df_out = df.copy()
+    df_out["latent_pc1_motor"] = pc1_aligned
+    df_out["label_level"] = y
+    df_out.to_csv(os.path.join(args.outdir, "reports", "sessions_with_latent_and_labels.csv"), index=False)
+
+    print("Saved outputs to:", args.outdir)
+    print(f"New sessions: {len(df)} (dropped {n_dropped}); total seen: {state['n_sessions']}")
+    print("PC1 axis cosine vs base:", round(drift["pc1"]["axis_cosine"], 4))
+    print("Thresholds:", {k: round(v, 4) for k, v in thresholds.items()})
+    if holdout is not None:
+        print("Holdout macro-F1 base -> updated: "
+              f"{holdout['base_model']['macro_f1']:.3f} -> {holdout['updated_model']['macro_f1']:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,18 @@
 import argparse
+import itertools
 import json
 import os
-import joblib
+import sys
 import numpy as np
 import pandas as pd
 
+from dataset_io import current_index, iter_dataset, read_dataset, read_indexed, update_index
+from model_registry import open_registry, open_version
+from motor_bundle import BUNDLE_FILENAME, threshold_distance, threshold_labels
+from motor_explain import explain_batch, open_cache
+from participant_profiles import open_profiles
+from perf_stages import StageRecorder, stage
+
 LEVELS = {
     0: "typical",
     1: "mild",
@@ -12,75 +20,516 @@ LEVELS = {
     3: "high",
 }
 
+ID_COLS = ["sessionId", "participantId"]
+
+NOTES = [
+    "Not a medical diagnosis.",
+    "Represents functional interaction performance in this specific task."
+]
+
+def load_artifacts(outdir, bundle=False, version=None):
+    # outdir: a version folder, or with version= a registry root
+    # (e.g. ..\model_registry\motor + "latest"). Loaded versions are memoized
+    # per process; only the artifacts scoring needs are read (never Model B).
+    mv = open_registry(outdir).get(version) if version else open_version(outdir)
+    return dict(mv.artifacts(bundle=bundle))
+
+def score_features(X, artifacts):
+    # X holds motor_cols in exact training order (DataFrame or 2-D array);
+    # one call per artifact for the whole batch
+    proba, latent = score_proba(X, artifacts)
+    labels = np.argmax(proba, axis=1)
+    confidence = np.max(proba, axis=1)
+    return labels, confidence, latent
+
+def score_proba(X, artifacts):
+    # (class probabilities, latent PC1 score)
+    X = np.asarray(X, dtype=float)
+    return model_proba(X, artifacts), latent_score(X, artifacts)
+
+def latent_score(X, artifacts):
+    X = np.asarray(X, dtype=float)
+    if "bundle" in artifacts:
+        return artifacts["bundle"].latent(X)
+    X_scaled = artifacts["pca_scaler"].transform(X)
+    return artifacts["pca"].transform(X_scaled).reshape(-1)
+
+def model_proba(X, artifacts):
+    X = np.asarray(X, dtype=float)
+    if "bundle" in artifacts:
+        return artifacts["bundle"].predict_proba(X, trees=artifacts.get("bundle_trees"))
+    # Model A was fitted with feature names
+    return artifacts["model"].predict_proba(pd.DataFrame(X, columns=artifacts["motor_cols"]))
+
+# --------------------------
+# Threshold-only fast path (see motor_bundle.calibrate_fast_path): label by
+# the PC1 bands and run Model A only for rows near a band edge. Fast rows
+# have no class probabilities; results mark them with "source": "fast_path"
+# and a null confidence.
+# --------------------------
+
+def fast_path_settings(artifacts, margin=None):
+    # margin: override of the calibrated margin (PC1 units)
+    report = artifacts["report"]
+    cal = report.get("fast_path")
+    if margin is None:
+        if cal is None:
+            raise ValueError("This model version has no fast-path calibration; retrain it or pass a margin")
+        # None: no margin met the target at training time -> every row falls back
+        margin = np.inf if cal["margin"] is None else cal["margin"]
+    # Measured at calibration; None without a calibration or without fast rows
+    agreement = None if cal is None else cal.get("fast_rows_agreement")
+    return {
+        "margin": float(margin),
+        "expected_agreement": None if agreement is None else float(agreement),
+        "flipped": bool(report["pca"]["pc1_flipped"]),
+        "thresholds": report["labeling"]["thresholds"],
+    }
+
+def score_fast(X, artifacts, fast):
+    # -> (labels, proba, latent, near): near marks the rows scored by Model A;
+    # the other rows get the threshold label and NaN probabilities
+    X = np.asarray(X, dtype=float)
+    latent = latent_score(X, artifacts)
+    aligned = -latent if fast["flipped"] else latent
+    labels = threshold_labels(aligned, fast["thresholds"])
+    near = threshold_distance(aligned, fast["thresholds"]) < fast["margin"]
+    proba = np.full((len(X), len(LEVELS)), np.nan)
+    if near.any():
+        proba[near] = model_proba(X[near], artifacts)
+        labels[near] = np.argmax(proba[near], axis=1)
+    return labels, proba, latent, near
+
+def profile_proba(proba, labels):
+    # Participant profiles need a probability vector per session: fast-path
+    # rows (NaN) enter as a one-hot vector of their label
+    proba = np.array(proba, dtype=float)
+    fast = np.isnan(proba).any(axis=1)
+    proba[fast] = np.eye(proba.shape[1])[labels[fast]]
+    return proba
+
+def source_of(near, i):
+    # "source" of row i under the fast path (None: fast path off)
+    return None if near is None else ("modelA" if near[i] else "fast_path")
+
+def profile_result(snapshot, i):
+    # Participant aggregates right after session i (see participant_profiles.py)
+    proba = snapshot["proba_ewma"][i]
+    trend = snapshot["latent_trend"][i]
+    return {
+        "n_sessions": int(snapshot["n_sessions"][i]),
+        "level": LEVELS[int(np.argmax(proba))],
+        "confidence": round(float(np.max(proba)), 4),
+        "latent_ewma": round(float(snapshot["latent_ewma"][i]), 4),
+        "latent_trend": None if np.isnan(trend) else round(float(trend), 4),
+        # Already applied earlier: the profile was not updated again
+        "repeated": bool(snapshot["repeated"][i]),
+    }
+
+def make_result(session_id, participant_id, label, confidence, latent_score, profile=None, explanation=None,
+                source=None):
+    # confidence NaN (fast-path rows) -> null
+    result = {
+        "sessionId": str(session_id),
+        "participantId": str(participant_id),
+        "motor_profile": {
+            "level": LEVELS[int(label)],
+            "confidence": None if np.isnan(confidence) else round(float(confidence), 4),
+            "latent_score": round(float(latent_score), 4),
+        },
+        "notes": NOTES,
+    }
+    if source is not None:
+        result["motor_profile"]["source"] = source
+    if profile is not None:
+        result["participant_profile"] = profile
+    if explanation is not None:
+        result["explanation"] = explanation
+    return result
+
+def _top_terms(values, x, motor_cols, top):
+    # Largest |contribution| first; top=0 keeps every feature
+    order = np.argsort(-np.abs(values), kind="stable")
+    if top:
+        order = order[:top]
+    return [
+        {"feature": motor_cols[j], "value": None if np.isnan(x[j]) else float(f"{x[j]:.6g}"),
+         "contribution": round(float(values[j]), 4)}
+        for j in order
+    ]
+
+def explanation_result(x, motor_cols, label, contribs, terms, top=5):
+    # One session's row of explain_batch(): Model A terms are in margin
+    # (log-odds) units of its predicted class, PC1 terms in latent units
+    return {
+        "modelA": {
+            "level": LEVELS[int(label)],
+            "margin": round(float(contribs.sum()), 4),
+            "bias": round(float(contribs[-1]), 4),
+            "top_features": _top_terms(contribs[:-1], x, motor_cols, top),
+        },
+        "latent": {
+            "latent_score": round(float(terms.sum()), 4),
+            "top_features": _top_terms(terms, x, motor_cols, top),
+        },
+    }
+
+def explain_rows(X, artifacts, session_ids=None, cache=None, top=5):
+    # explanation_result() per row; one batched computation for the cache misses
+    X = np.asarray(X, dtype=float)
+    try:
+        labels, contribs, terms = explain_batch(X, artifacts, session_ids, cache)
+    except ImportError:
+        raise SystemExit("Explanations need xgboost (pip install xgboost)")
+    motor_cols = artifacts["motor_cols"]
+    return [explanation_result(X[i], motor_cols, labels[i], contribs[i], terms[i], top) for i in range(len(X))]
+
+def read_session_ids(args):
+    ids = []
+    if args.sessionIds:
+        ids += [s.strip() for s in args.sessionIds.split(",") if s.strip()]
+    if args.sessionIdsFile:
+        with open(args.sessionIdsFile, "r", encoding="utf-8") as f:
+            ids += [line.strip() for line in f if line.strip()]
+    return ids
+
+def split_ids(value):
+    return [s.strip() for s in value.split(",") if s.strip()] if value else []
+
+def load_rows(args, columns, session_ids=None, participant_ids=None, rows=None):
+    # Selected rows + dataset row count. Seeks through the sidecar index
+    # (<csv>.idx) when it is up to date, without writing it; --build_index
+    # creates or extends it first. Otherwise the whole dataset is read.
+    if not args.no_index:
+        try:
+            index = update_index(args.csv) if args.build_index else current_index(args.csv)
+            if index is not None:
+                return read_indexed(args.csv, session_ids, participant_ids, rows, columns, index=index,
+                                    rebuild=args.build_index), len(index)
+        except (OSError, ValueError) as e:
+            print(f"Session index unavailable ({e}); reading the whole dataset", file=sys.stderr)
+    df = read_dataset(args.csv, columns)
+    mask = np.zeros(len(df), dtype=bool)
+    if session_ids is not None:
+        mask |= df["sessionId"].astype(str).isin(session_ids).to_numpy()
+    if participant_ids is not None:
+        mask |= df["participantId"].astype(str).isin(participant_ids).to_numpy()
+    if rows is not None:
+        mask[[r for r in rows if 0 <= r < len(df)]] = True
+    return df[mask].reset_index(drop=True), len(df)
+
+def open_profile_store(args):
+    if not args.profiles:
+        return None
+    return open_profiles(args.profiles, alpha=args.profile_alpha, n_classes=len(LEVELS))
+
+class JsonlSink:
+    def __init__(self, path):
+        self.f = sys.stdout if path in (None, "-") else open(path, "w", encoding="utf-8")
+
+    def write(self, chunk, labels, confidence, latent, snapshot=None, explanations=None, near=None):
+        for i, (sid, pid, lab, conf, lat) in enumerate(zip(
+            chunk["sessionId"], chunk["participantId"], labels, confidence, latent
+        )):
+            profile = None if snapshot is None else profile_result(snapshot, i)
+            explanation = None if explanations is None else explanations[i]
+            self.f.write(json.dumps(make_result(sid, pid, lab, conf, lat, profile, explanation,
+                                                source_of(near, i))) + "\n")
+
+    def close(self):
+        if self.f is not sys.stdout:
+            self.f.close()
+
+class ParquetSink:
+    def __init__(self, path, profiles=False, explain=False, fast_path=False):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([
+            ("sessionId", pa.string()),
+            ("participantId", pa.string()),
+            ("label", pa.int8()),
+            ("level", pa.string()),
+            ("confidence", pa.float32()),  # null on fast-path rows
+            ("latent_score", pa.float64()),
+        ] + ([
+            ("source", pa.string()),  # "modelA" or "fast_path"
+        ] if fast_path else []) + ([
+            ("profile_n_sessions", pa.int32()),
+            ("profile_level", pa.string()),
+            ("profile_confidence", pa.float32()),
+            ("profile_latent_ewma", pa.float64()),
+            ("profile_latent_trend", pa.float64()),
+            ("profile_repeated", pa.bool_()),
+        ] if profiles else []) + ([
+            ("explanation", pa.string()),  # explanation_result() as JSON
+        ] if explain else []))
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, chunk, labels, confidence, latent, snapshot=None, explanations=None, near=None):
+        confidence = np.asarray(confidence, dtype=np.float32)
+        columns = {
+            "sessionId": chunk["sessionId"].astype(str).tolist(),
+            "participantId": chunk["participantId"].astype(str).tolist(),
+            "label": labels.astype(np.int8),
+            "level": [LEVELS[int(l)] for l in labels],
+            "confidence": self.pa.array(confidence, mask=np.isnan(confidence)),
+            "latent_score": latent.astype(np.float64),
+        }
+        if near is not None:
+            columns["source"] = np.where(near, "modelA", "fast_path").tolist()
+        if snapshot is not None:
+            stable = np.argmax(snapshot["proba_ewma"], axis=1)
+            columns.update({
+                "profile_n_sessions": snapshot["n_sessions"],
+                "profile_level": [LEVELS[int(l)] for l in stable],
+                "profile_confidence": np.max(snapshot["proba_ewma"], axis=1).astype(np.float32),
+                "profile_latent_ewma": snapshot["latent_ewma"],
+                "profile_latent_trend": snapshot["latent_trend"],
+                "profile_repeated": snapshot["repeated"],
+            })
+        if explanations is not None:
+            columns["explanation"] = [json.dumps(e) for e in explanations]
+        table = self.pa.table(columns, schema=self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+def open_fast_path(args, artifacts):
+    if not args.fast_path:
+        return None
+    try:
+        return fast_path_settings(artifacts, args.fast_margin)
+    except ValueError as e:
+        raise SystemExit(f"{e} (--fast_margin)")
+
+def score_batch(args, artifacts, recorder=None):
+    # Streams the dataset in chunks so memory stays bounded; each chunk is scored
+    # with a single predict_proba / pca.transform call.
+    motor_cols = artifacts["motor_cols"]
+    wanted = None if args.all else set(read_session_ids(args))
+    participants = None if args.all else set(split_ids(args.participantIds))
+    if wanted is not None and not wanted and not participants:
+        raise SystemExit("Batch mode needs --all, --sessionIds, --sessionIdsFile or --participantIds")
+
+    if "bundle" in artifacts:
+        # Batches are large enough that XGBoost's own predictor wins, if
+        # installed; kept in this run's artifacts dict, not on the shared bundle
+        try:
+            artifacts["bundle_trees"] = artifacts["bundle"].xgboost_trees()
+        except ImportError:
+            pass
+
+    fast = open_fast_path(args, artifacts)
+    profiles = open_profile_store(args)
+    cache = open_cache(args.explain_cache, args.explain_cache_max) if args.explain else None
+    if args.out and args.out.endswith(".parquet"):
+        sink = ParquetSink(args.out, profiles=profiles is not None, explain=args.explain, fast_path=fast is not None)
+    else:
+        sink = JsonlSink(args.out)
+
+    n_scored = n_fallback = n_disagree = n_repeated = 0
+    seen, seen_participants = set(), set()
+    if wanted is None:
+        chunks = iter_dataset(args.csv, ID_COLS + motor_cols, chunksize=args.chunksize)
+    else:
+        # A few ids: read just those rows through the index
+        def chunks_by_id():
+            df, _ = load_rows(args, ID_COLS + motor_cols, session_ids=sorted(wanted),
+                              participant_ids=sorted(participants) if participants else None)
+            for start in range(0, len(df), args.chunksize):
+                yield df.iloc[start:start + args.chunksize]
+        chunks = chunks_by_id()
+    try:
+        for i in itertools.count():
+            with stage(recorder, "read", chunk=i):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            if chunk.empty:
+                continue
+            with stage(recorder, "score", chunk=i, rows=len(chunk)):
+                near = None
+                if fast is None:
+                    proba, latent = score_proba(chunk[motor_cols], artifacts)
+                    labels = np.argmax(proba, axis=1)
+                else:
+                    labels, proba, latent, near = score_fast(chunk[motor_cols], artifacts, fast)
+                    n_fallback += int(near.sum())
+                confidence = np.max(proba, axis=1)
+            if fast is not None and args.fast_path_check:
+                # Shadow run: Model A on every row
+                with stage(recorder, "fast_path_check", chunk=i):
+                    n_disagree += int(np.sum(np.argmax(model_proba(chunk[motor_cols], artifacts), axis=1) != labels))
+            snapshot = None
+            if profiles is not None:
+                with stage(recorder, "profiles", chunk=i):
+                    snapshot = profiles.update(chunk["participantId"], profile_proba(proba, labels), latent,
+                                               chunk["sessionId"])
+                    n_repeated += int(snapshot["repeated"].sum())
+            explanations = None
+            if args.explain:
+                with stage(recorder, "explain", chunk=i):
+                    explanations = explain_rows(chunk[motor_cols], artifacts, chunk["sessionId"], cache,
+                                                args.explain_top)
+            with stage(recorder, "write", chunk=i):
+                sink.write(chunk, labels, confidence, latent, snapshot, explanations, near)
+            n_scored += len(chunk)
+            if wanted is not None:
+                seen.update(chunk["sessionId"].astype(str))
+                seen_participants.update(chunk["participantId"].astype(str))
+    finally:
+        sink.close()
+        if cache is not None:
+            cache.close()
+    if profiles is not None:
+        profiles.save(args.profiles)
+
+    print(f"Scored {n_scored} sessions", file=sys.stderr)
+    if n_repeated:
+        print(f"Profiles: {n_repeated} session(s) already applied were not counted again", file=sys.stderr)
+    if fast is not None and n_scored:
+        print(f"Fast path: margin {fast['margin']:.4f}, {n_fallback} ({n_fallback / n_scored:.1%}) "
+              "fell back to Model A", file=sys.stderr)
+        if args.fast_path_check:
+            print(f"Fast path check: {n_disagree} ({n_disagree / n_scored:.2%}) labels differ from Model A",
+                  file=sys.stderr)
+    if cache is not None:
+        print(f"Explanations: {cache.hits} from cache, {cache.misses} computed", file=sys.stderr)
+    if wanted is not None and wanted - seen:
+        print(f"No row found for {len(wanted - seen)} sessionId(s)", file=sys.stderr)
+    if participants and participants - seen_participants:
+        print(f"No row found for {len(participants - seen_participants)} participantId(s)", file=sys.stderr)
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--csv", required=True, help="Path to motor_sessions.csv")
+    ap.add_argument("--csv", required=True, help="Path to motor_sessions.csv (or .parquet)")
     ap.add_argument("--outdir", required=True, help="Model output folder (e.g., ..\\model_registry\\motor\\1.0.0)")
+    ap.add_argument("--version", default=None,
+                    help="Treat --outdir as a registry root and score with this version ('latest' or e.g. 1.0.1)")
     ap.add_argument("--sessionId", default=None, help="Pick a specific sessionId to score")
     ap.add_argument("--row", type=int, default=None, help="Or score by row index (0-based)")
+    ap.add_argument("--batch", action="store_true", help="Score many sessions in one process")
+    ap.add_argument("--all", action="store_true", help="Batch: score every row of the CSV")
+    ap.add_argument("--sessionIds", default=None, help="Batch: comma-separated sessionIds")
+    ap.add_argument("--sessionIdsFile", default=None, help="Batch: file with one sessionId per line")
+    ap.add_argument("--participantIds", default=None, help="Batch: comma-separated participantIds (all their sessions)")
+    ap.add_argument("--out", default=None, help="Batch: output .jsonl or .parquet (default: JSONL to stdout)")
+    ap.add_argument("--profiles", default=None,
+                    help="Participant profile state (.npz): update it with every scored session, in dataset "
+                         "order, and add each participant's running profile to the results")
+    ap.add_argument("--profile_alpha", type=float, default=0.3,
+                    help="EWMA weight of the newest session (used when --profiles is created)")
+    ap.add_argument("--fast_path", action="store_true",
+                    help="Label by the PC1 thresholds and run Model A only near a threshold "
+                         "(margin calibrated at training time)")
+    ap.add_argument("--fast_margin", type=float, default=None,
+                    help="With --fast_path: override the calibrated margin (aligned PC1 units)")
+    ap.add_argument("--fast_path_check", action="store_true",
+                    help="Batch, with --fast_path: also run Model A on every row and report how often labels differ")
+    ap.add_argument("--explain", action="store_true",
+                    help="Add per-feature contributions: Model A (XGBoost pred_contribs) and PC1 terms")
+    ap.add_argument("--explain_top", type=int, default=5, help="With --explain: features listed per part (0 = all)")
+    ap.add_argument("--explain_cache", default=None,
+                    help="With --explain: SQLite file caching explanations per (model artifacts, sessionId)")
+    ap.add_argument("--explain_cache_max", type=int, default=100000,
+                    help="Cache size in sessions; least recently used entries are evicted")
+    ap.add_argument("--no_index", action="store_true",
+                    help="Scan the whole dataset instead of seeking through its sidecar index (<csv>.idx)")
+    ap.add_argument("--build_index", action="store_true",
+                    help="Create or extend <csv>.idx before a lookup; by default an existing index is only "
+                         "used when it covers the whole file, and nothing is written")
+    ap.add_argument("--chunksize", type=int, default=50000, help="Batch: rows read and scored per chunk")
+    ap.add_argument("--bundle", action="store_true", help=f"Score with models/{BUNDLE_FILENAME} instead of the joblib files")
+    ap.add_argument("--timings", action="store_true", help="Print per-stage wall/CPU time and peak RSS to stderr")
+    ap.add_argument("--trace", default=None, help="Write per-stage timings as Chrome-trace JSON")
+    ap.add_argument("--profile", default=None, help="cProfile the run and dump stats to this .prof file")
+    ap.add_argument("--profile_stages", default=None, help="With --profile: only profile stages matching this pattern")
     args = ap.parse_args()
+    if args.build_index and args.no_index:
+        ap.error("--build_index and --no_index are mutually exclusive")
 
-    # Load report for feature order + metadata
-    report_path = os.path.join(args.outdir, "reports", "training_report.json")
-    with open(report_path, "r", encoding="utf-8") as f:
-        report = json.load(f)
+    recorder = None
+    if args.timings or args.trace or args.profile:
+        recorder = StageRecorder(profile_path=args.profile, profile_stages=args.profile_stages)
+    try:
+        score(args, recorder)
+    finally:
+        if recorder is not None:
+            recorder.close()
+    if recorder is not None:
+        if args.timings:
+            for r in recorder.summary():
+                print(f"{'  ' * r['depth']}{r['name']:<16} wall {r['wall_s']:.4f}s  cpu {r['cpu_s']:.4f}s  "
+                      f"peak {r['peak_rss_mb']} MB", file=sys.stderr)
+        if args.trace:
+            recorder.write_chrome_trace(args.trace)
 
-    motor_cols = report["pca"]["motor_feature_columns"]
-    model_version = report.get("modelA_motor_only", {}).get("version", "1.0.0")
+def score(args, recorder=None):
+    with stage(recorder, "load_artifacts", bundle=args.bundle):
+        try:
+            artifacts = load_artifacts(args.outdir, bundle=args.bundle, version=args.version)
+        except FileNotFoundError as e:
+            raise SystemExit(str(e))
+    motor_cols = artifacts["motor_cols"]
 
-    # Load artifacts
-    model_path = os.path.join(args.outdir, "models", "modelA_motor_only.joblib")
-    pca_scaler_path = os.path.join(args.outdir, "preprocess", "pca_scaler_motor.joblib")
-    pca_path = os.path.join(args.outdir, "preprocess", "pca_pc1_motor.joblib")
+    if args.batch or args.all or args.sessionIds or args.sessionIdsFile or args.participantIds:
+        score_batch(args, artifacts, recorder)
+        return
 
-    model = joblib.load(model_path)
-    pca_scaler = joblib.load(pca_scaler_path)
-    pca = joblib.load(pca_path)
+    # Load just the picked row (IDs + motor features only)
+    with stage(recorder, "load"):
+        if args.sessionId is not None:
+            df, n_rows = load_rows(args, ID_COLS + motor_cols, session_ids=[args.sessionId])
+        else:
+            # Default: score the first row
+            df, n_rows = load_rows(args, ID_COLS + motor_cols, rows=[args.row or 0])
 
-    # Load dataset
-    df = pd.read_csv(args.csv)
-
-    # Pick row
-    if args.sessionId is not None:
-        matches = df.index[df["sessionId"] == args.sessionId].tolist()
-        if not matches:
+    if df.empty:
+        if args.sessionId is not None:
             raise SystemExit(f"No row found with sessionId={args.sessionId}")
-        idx = matches[0]
-    elif args.row is not None:
-        idx = args.row
-        if idx < 0 or idx >= len(df):
-            raise SystemExit(f"--row out of range. Must be 0..{len(df)-1}")
-    else:
-        # Default: score the first row
-        idx = 0
+        raise SystemExit(f"--row out of range. Must be 0..{n_rows-1}")
 
-    row = df.iloc[idx]
+    row = df.iloc[[0]]
 
     # Build feature vector (in exact training order)
-    X = row[motor_cols].astype(float).values.reshape(1, -1)
+    fast = open_fast_path(args, artifacts)
+    near = None
+    with stage(recorder, "score"):
+        if fast is None:
+            proba, latent = score_proba(row[motor_cols], artifacts)
+            labels = np.argmax(proba, axis=1)
+        else:
+            labels, proba, latent, near = score_fast(row[motor_cols], artifacts, fast)
 
-    # Latent score (PC1)
-    X_scaled = pca_scaler.transform(X)
-    latent_score = float(pca.transform(X_scaled).reshape(-1)[0])
+    participant_id = row["participantId"].iloc[0] if "participantId" in row else ""
+    session_id = row["sessionId"].iloc[0] if "sessionId" in row else ""
+    profile = None
+    profiles = open_profile_store(args)
+    if profiles is not None:
+        profile = profile_result(profiles.update([participant_id], profile_proba(proba, labels), latent,
+                                                 [session_id]), 0)
+        profiles.save(args.profiles)
 
-    # Predict level + confidence
-    proba = model.predict_proba(X)[0]
-    label = int(np.argmax(proba))
-    confidence = float(np.max(proba))
+    explanation = None
+    if args.explain:
+        cache = open_cache(args.explain_cache, args.explain_cache_max)
+        try:
+            with stage(recorder, "explain"):
+                explanation = explain_rows(row[motor_cols], artifacts, [session_id], cache, args.explain_top)[0]
+        finally:
+            if cache is not None:
+                cache.close()
 
-    result = {
-        "sessionId": str(row.get("sessionId", "")),
-        "participantId": str(row.get("participantId", "")),
-        "motor_profile": {
-            "level": LEVELS[label],
-            "confidence": round(confidence, 4),
-            "latent_score": round(latent_score, 4),
-        },
-        "notes": [
-            "Not a medical diagnosis.",
-            "Represents functional interaction performance in this specific task."
-        ]
-    }
+    result = make_result(
+        session_id,
+        participant_id,
+        labels[0], np.max(proba[0]), latent[0], profile, explanation, source_of(near, 0),
+    )
 
     print(json.dumps(result, indent=2))
 
@@ -0,0 +1,367 @@
+import argparse
+import json
+import os
+import queue
+import socketserver
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from model_registry import open_registry
+from motor_explain import open_cache
+from participant_profiles import open_profiles
+from score_one_session import (
+    LEVELS, explain_rows, fast_path_settings, load_artifacts, make_result, profile_proba, profile_result, score_fast,
+    score_proba, source_of,
+)
+
+# --------------------------
+# Micro-batching
+# --------------------------
+
+class MicroBatcher:
+    # Collects rows from concurrent requests and scores them with one
+    # score_proba() call (one predict_proba for the whole group). With
+    # profiles, rows carrying a participantId also update that participant's
+    # running profile, in arrival order. With fast_path, rows away from the
+    # PC1 thresholds skip Model A (score_fast); counters feed /health.
+    # Requests asking for explanations get them from one explain_rows() call
+    # per group, through the shared explanation cache if there is one.
+    def __init__(self, artifacts, max_batch=256, max_wait_ms=5.0, profiles=None, fast_path=False, fast_margin=None,
+                 explain_cache=None, explain_top=5):
+        self.artifacts = artifacts
+        self.profiles = profiles
+        self.explain_cache = explain_cache
+        self.explain_top = explain_top
+        self.fast = fast_path_settings(artifacts, fast_margin) if fast_path else None
+        self.n_scored = 0
+        self.n_fallback = 0
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.q = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, rows, X, explain=False):
+        # X: the rows' motor features as a float array (see feature_matrix)
+        fut = Future()
+        self.q.put((rows, X, fut, explain))
+        return fut
+
+    def _run(self):
+        while True:
+            pending = [self.q.get()]
+            n_rows = len(pending[0][0])
+            # Keep draining until the batch is full or the wait window closes
+            while n_rows < self.max_batch:
+                try:
+                    item = self.q.get(timeout=self.max_wait)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                n_rows += len(item[0])
+            self._score(pending)
+
+    def _score(self, pending):
+        rows = [r for rs, _, _, _ in pending for r in rs]
+        try:
+            X = np.vstack([X for _, X, _, _ in pending])
+            near = None
+            if self.fast is None:
+                proba, latent = score_proba(X, self.artifacts)
+                labels = np.argmax(proba, axis=1)
+            else:
+                labels, proba, latent, near = score_fast(X, self.artifacts, self.fast)
+                self.n_fallback += int(near.sum())
+            self.n_scored += len(rows)
+            confidence = np.max(proba, axis=1)
+            profiles = [None] * len(rows)
+            if self.profiles is not None:
+                known = [j for j, r in enumerate(rows) if r.get("participantId")]
+                if known:
+                    snapshot = self.profiles.update([rows[j]["participantId"] for j in known],
+                                                    profile_proba(proba[known], labels[known]), latent[known],
+                                                    [rows[j].get("sessionId") for j in known])
+                    for k, j in enumerate(known):
+                        profiles[j] = profile_result(snapshot, k)
+            explanations = [None] * len(rows)
+            wanted, i = [], 0
+            for rs, _, _, explain in pending:
+                if explain:
+                    wanted.extend(range(i, i + len(rs)))
+                i += len(rs)
+            if wanted:
+                for j, e in zip(wanted, explain_rows(X[wanted], self.artifacts,
+                                                     [rows[j].get("sessionId") for j in wanted],
+                                                     self.explain_cache, self.explain_top)):
+                    explanations[j] = e
+        except (Exception, SystemExit) as e:
+            for _, _, fut, _ in pending:
+                fut.set_exception(e)
+            return
+
+        i = 0
+        for rs, _, fut, _ in pending:
+            results = [
+                make_result(r.get("sessionId", ""), r.get("participantId", ""),
+                            labels[j], confidence[j], latent[j], profiles[j], explanations[j], source_of(near, j))
+                for j, r in enumerate(rs, start=i)
+            ]
+            i += len(rs)
+            fut.set_result(results)
+
+class BatcherPool:
+    # One MicroBatcher per served model version. With a registry root,
+    # requests may pick a version (?version=1.0.1) for A/B tests; versions are
+    # resolved and loaded on first use and memoized by the registry.
+    # Only the default version updates participant profiles, so A/B variants
+    # do not mix their scores into the running aggregates.
+    def __init__(self, outdir, default_version=None, bundle=False, profiles=None, **batcher_kw):
+        self.outdir = outdir
+        self.profiles = profiles
+        # "latest" is pinned at startup; ?version=latest re-resolves per request
+        if default_version == "latest":
+            default_version = open_registry(outdir).resolve("latest")
+        self.default_version = default_version
+        self.bundle = bundle
+        self.batcher_kw = batcher_kw
+        self.batchers = {}
+        self._lock = threading.Lock()
+        self.default = self.get(None)
+
+    def get(self, version):
+        if version is not None and self.default_version is None:
+            raise LookupError("Version selection needs --version (serve --outdir as a registry root)")
+        key = version or self.default_version
+        if key == "latest":
+            key = open_registry(self.outdir).resolve("latest")
+        with self._lock:
+            batcher = self.batchers.get(key)
+            if batcher is None:
+                artifacts = load_artifacts(self.outdir, bundle=self.bundle, version=key)
+                profiles = self.profiles if key == self.default_version else None
+                batcher = self.batchers[key] = MicroBatcher(artifacts, profiles=profiles, **self.batcher_kw)
+            return batcher
+
+# --------------------------
+# HTTP handler
+# --------------------------
+
+def feature_matrix(rows, motor_cols):
+    # Per-request conversion, so a bad value is rejected before it can fail
+    # the micro-batch shared with other requests. -> (X, invalid columns)
+    # Models were fitted without missing values, so null/NaN is rejected too.
+    X = np.empty((len(rows), len(motor_cols)), dtype=float)
+    invalid = set()
+    for i, r in enumerate(rows):
+        for j, c in enumerate(motor_cols):
+            v = r[c]
+            if isinstance(v, (int, float)) and not isinstance(v, bool) and np.isfinite(v):
+                X[i, j] = v
+            else:
+                invalid.add(c)
+    return X, sorted(invalid)
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    server_version = "AuraMotorScoring/1.0"
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port) tuple
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        # (path, batcher for ?version=, or None after sending an error)
+        url = urlsplit(self.path)
+        version = parse_qs(url.query).get("version", [None])[0]
+        try:
+            return url.path, self.server.batchers.get(version)
+        except (LookupError, FileNotFoundError, ValueError) as e:
+            self._send_json(404, {"error": str(e)})
+            return url.path, None
+
+    def do_GET(self):
+        path, batcher = self._route()
+        if batcher is None:
+            return
+        if path.startswith("/participants/"):
+            return self._send_profile(path[len("/participants/"):])
+        if path != "/health":
+            return self._send_json(404, {"error": "Not found"})
+        artifacts = batcher.artifacts
+        health = {
+            "status": "ok",
+            "model_version": artifacts["model_version"],
+            "n_motor_features": len(artifacts["motor_cols"]),
+            "loaded_versions": sorted(b.artifacts["model_version"] for b in self.server.batchers.batchers.values()),
+        }
+        if batcher.fast is not None:
+            health["fast_path"] = {
+                "margin": batcher.fast["margin"],
+                "expected_agreement": batcher.fast["expected_agreement"],
+                "n_scored": batcher.n_scored,
+                "n_fallback": batcher.n_fallback,
+                "fallback_rate": batcher.n_fallback / batcher.n_scored if batcher.n_scored else None,
+            }
+        if batcher.explain_cache is not None:
+            health["explain_cache"] = batcher.explain_cache.stats()
+        self._send_json(200, health)
+
+    def _send_profile(self, participant_id):
+        profiles = self.server.batchers.profiles
+        if profiles is None:
+            return self._send_json(404, {"error": "Participant profiles are off (start with --profiles)"})
+        profile = profiles.get(participant_id)
+        if profile is None:
+            return self._send_json(404, {"error": f"No sessions scored for participantId={participant_id}"})
+        trend = profile["latent_trend"]
+        self._send_json(200, dict(
+            profile,
+            participantId=participant_id,
+            level=LEVELS[int(np.argmax(profile["proba_ewma"]))],
+            latent_trend=None if np.isnan(trend) else trend,
+        ))
+
+    def do_POST(self):
+        path, batcher = self._route()
+        if batcher is None:
+            return
+        if path != "/score":
+            return self._send_json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            return self._send_json(400, {"error": "Body must be JSON"})
+
+        # Accept a single feature row or {"rows": [...]}
+        single = not (isinstance(payload, dict) and "rows" in payload)
+        rows = [payload] if single else payload["rows"]
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            return self._send_json(400, {"error": "Expected a feature object or {\"rows\": [...]}"})
+        if not rows:
+            return self._send_json(200, {"results": []})
+
+        motor_cols = batcher.artifacts["motor_cols"]
+        missing = sorted({c for r in rows for c in motor_cols if c not in r})
+        if missing:
+            return self._send_json(400, {"error": "Missing motor features", "missing": missing})
+        X, invalid = feature_matrix(rows, motor_cols)
+        if invalid:
+            return self._send_json(400, {"error": "Motor features must be finite numbers", "invalid": invalid})
+
+        explain = parse_qs(urlsplit(self.path).query).get("explain", ["0"])[0] not in ("", "0", "false")
+        try:
+            results = batcher.submit(rows, X, explain=explain).result(timeout=self.server.request_timeout)
+        except (Exception, SystemExit) as e:
+            return self._send_json(500, {"error": str(e)})
+
+        self._send_json(200, results[0] if single else {"results": results})
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            super().log_message(fmt, *args)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(args, batchers):
+    # Bound after setting the listen backlog: socketserver's default of 5 makes
+    # the kernel reset a burst of concurrent clients before the micro-batcher
+    # sees them
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = UnixHTTPServer(args.socket, ScoringHandler, bind_and_activate=False)
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), ScoringHandler, bind_and_activate=False)
+    server.request_queue_size = args.backlog
+    try:
+        server.server_bind()
+        server.server_activate()
+    except BaseException:
+        server.server_close()
+        raise
+    server.batchers = batchers
+    server.quiet = args.quiet
+    server.request_timeout = args.timeout
+    return server
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--outdir", required=True, help="Model output folder (e.g., ..\\model_registry\\motor\\1.0.0)")
+    ap.add_argument("--version", default=None,
+                    help="Treat --outdir as a registry root: default version ('latest' or e.g. 1.0.0); "
+                         "requests can pick another with ?version=")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--socket", default=None, help="Listen on this Unix socket path instead of TCP")
+    ap.add_argument("--backlog", type=int, default=1024,
+                    help="Pending connections the listening socket queues (capped by the OS, e.g. net.core.somaxconn)")
+    ap.add_argument("--max_batch", type=int, default=256, help="Max rows per XGBoost call")
+    ap.add_argument("--max_wait_ms", type=float, default=5.0, help="How long to wait for more rows before scoring")
+    ap.add_argument("--timeout", type=float, default=30.0, help="Per-request scoring timeout (s)")
+    ap.add_argument("--quiet", action="store_true", help="Disable per-request logging")
+    ap.add_argument("--bundle", action="store_true", help="Load the fused inference bundle instead of the joblib files")
+    ap.add_argument("--profiles", default=None,
+                    help="Participant profile state (.npz) updated with every scored row that has a participantId")
+    ap.add_argument("--profile_alpha", type=float, default=0.3, help="EWMA weight of the newest session (new state only)")
+    ap.add_argument("--profile_save_s", type=float, default=60.0, help="Save the profile state this often (s)")
+    ap.add_argument("--fast_path", action="store_true",
+                    help="Label by the PC1 thresholds and run Model A only near a threshold")
+    ap.add_argument("--fast_margin", type=float, default=None, help="With --fast_path: override the calibrated margin")
+    ap.add_argument("--explain_cache", default=None,
+                    help="SQLite file caching ?explain=1 results per (model artifacts, sessionId)")
+    ap.add_argument("--explain_cache_max", type=int, default=100000,
+                    help="Cache size in sessions; least recently used entries are evicted")
+    ap.add_argument("--explain_top", type=int, default=5, help="Features listed per explanation part (0 = all)")
+    args = ap.parse_args()
+
+    profiles = None
+    if args.profiles:
+        profiles = open_profiles(args.profiles, alpha=args.profile_alpha, n_classes=len(LEVELS))
+    explain_cache = open_cache(args.explain_cache, args.explain_cache_max)
+    try:
+        batchers = BatcherPool(args.outdir, default_version=args.version, bundle=args.bundle, profiles=profiles,
+                               max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                               fast_path=args.fast_path, fast_margin=args.fast_margin,
+                               explain_cache=explain_cache, explain_top=args.explain_top)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    artifacts = batchers.default.artifacts
+    server = make_server(args, batchers)
+
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Scoring service (model {artifacts['model_version']}) listening on {where}")
+    stop = threading.Event()
+    if profiles is not None:
+        def save_periodically():
+            while not stop.wait(args.profile_save_s):
+                profiles.save(args.profiles)
+        threading.Thread(target=save_periodically, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        if profiles is not None:
+            profiles.save(args.profiles)
+        if explain_cache is not None:
+            explain_cache.close()
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
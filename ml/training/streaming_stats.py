@@ -0,0 +1,181 @@
+import numpy as np
+
+# --------------------------
+# Mergeable streaming quantile sketch (t-digest style: weighted centroids,
+# finer at the tails, so p10/p25/p75 stay accurate after many updates)
+# --------------------------
+
+DEFAULT_COMPRESSION = 200
+
+class QuantileSketch:
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values, weights=None):
+        v = np.asarray(values, dtype=np.float64).reshape(-1)
+        w = np.ones(len(v)) if weights is None else np.broadcast_to(np.asarray(weights, dtype=np.float64), v.shape)
+        ok = np.isfinite(v) & (w > 0)
+        v, w = v[ok], w[ok]
+        if len(v):
+            self.min = min(self.min, float(v.min()))
+            self.max = max(self.max, float(v.max()))
+            self._absorb(v, w)
+        return self
+
+    def merge(self, other):
+        if other.count:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._absorb(other.means, other.weights)
+        return self
+
+    def _absorb(self, means, weights):
+        m = np.concatenate([self.means, means])
+        w = np.concatenate([self.weights, weights])
+        order = np.argsort(m, kind="stable")
+        m, w = m[order], w[order]
+        total = w.sum()
+        # Centroids whose mid-quantile falls in the same arcsine bucket are merged
+        q = (np.cumsum(w) - w / 2) / total
+        k = np.floor(self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5))
+        starts = np.concatenate([[0], np.nonzero(np.diff(k))[0] + 1])
+        self.weights = np.add.reduceat(w, starts)
+        self.means = np.add.reduceat(m * w, starts) / self.weights
+        self.count = float(total)
+
+    def quantile(self, q):
+        q = np.asarray(q, dtype=np.float64)
+        if not self.count:
+            return np.full(q.shape, np.nan)
+        pos = (np.cumsum(self.weights) - self.weights / 2) / self.count
+        x = np.concatenate([[0.0], pos, [1.0]])
+        y = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(q, x, y)
+
+    def percentile(self, p):
+        return self.quantile(np.asarray(p, dtype=np.float64) / 100.0)
+
+    def cdf(self, v):
+        # Fraction of the stream <= v (inverse of quantile(), same interpolation)
+        if not self.count:
+            return np.full(np.shape(v), np.nan)
+        pos = (np.cumsum(self.weights) - self.weights / 2) / self.count
+        x = np.concatenate([[self.min], self.means, [self.max]])
+        y = np.concatenate([[0.0], pos, [1.0]])
+        return np.interp(v, x, y)
+
+    def to_dict(self):
+        return {
+            "compression": self.compression, "count": self.count,
+            "min": self.min, "max": self.max,
+            "means": self.means.tolist(), "weights": self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        s = cls(d["compression"])
+        s.count, s.min, s.max = float(d["count"]), float(d["min"]), float(d["max"])
+        s.means = np.asarray(d["means"], dtype=np.float64)
+        s.weights = np.asarray(d["weights"], dtype=np.float64)
+        return s
+
+class ColumnSketches:
+    # One QuantileSketch per column, updated from DataFrame chunks
+    def __init__(self, columns, compression=DEFAULT_COMPRESSION):
+        self.columns = list(columns)
+        self.sketches = {c: QuantileSketch(compression) for c in self.columns}
+
+    def update(self, df):
+        for c in self.columns:
+            if c in df:
+                self.sketches[c].update(df[c].to_numpy(dtype=np.float64, na_value=np.nan))
+        return self
+
+    def merge(self, other):
+        for c, s in other.sketches.items():
+            if c in self.sketches:
+                self.sketches[c].merge(s)
+        return self
+
+    def quantile(self, q):
+        # (n_columns,) for a scalar q
+        return np.array([float(self.sketches[c].quantile(q)) for c in self.columns])
+
+    def median(self):
+        return dict(zip(self.columns, self.quantile(0.5)))
+
+# --------------------------
+# Exact percentiles in one extra pass: the sketch brackets each order
+# statistic, the pass counts values below the bracket and keeps the ones inside
+# --------------------------
+
+def _lerp(a, b, t):
+    # np.percentile's linear interpolation, bit for bit
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+def refine_percentiles(iter_values, sketch, percentiles, slack=None):
+    # iter_values(): generator factory over the same stream the sketch saw.
+    # Returns what np.percentile(all_values, percentiles) would.
+    n = int(round(sketch.count))
+    q = np.asarray(percentiles, dtype=np.float64) / 100
+    virtual = (n - 1) * q
+    lo = np.floor(virtual).astype(np.int64)
+    hi = np.minimum(lo + 1, n - 1)
+    slack = np.pi / sketch.compression if slack is None else slack
+    pending = list(range(len(q)))
+    out = np.empty(len(q))
+
+    while pending:
+        bounds = [(float(sketch.quantile(max(lo[i] / n - slack, 0.0))),
+                   float(sketch.quantile(min((hi[i] + 1) / n + slack, 1.0)))) for i in pending]
+        below = np.zeros(len(pending), dtype=np.int64)
+        inside = [[] for _ in pending]
+        for v in iter_values():
+            v = np.asarray(v, dtype=np.float64)
+            v = v[np.isfinite(v)]
+            for j, (L, U) in enumerate(bounds):
+                below[j] += int(np.count_nonzero(v < L))
+                inside[j].append(v[(v >= L) & (v <= U)])
+
+        retry = []
+        for j, i in enumerate(pending):
+            vals = np.sort(np.concatenate(inside[j]))
+            if below[j] <= lo[i] and below[j] + len(vals) > hi[i]:
+                out[i] = _lerp(vals[lo[i] - below[j]], vals[hi[i] - below[j]], virtual[i] - lo[i])
+            else:
+                retry.append(i)
+        pending, slack = retry, slack * 4
+    return out
+
+# --------------------------
+# Streaming mean / covariance (Chan et al. pairwise update; no raw-moment cancellation)
+# --------------------------
+
+class StreamingCovariance:
+    def __init__(self, n_features):
+        self.n = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros((n_features, n_features))
+
+    def update(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        nb = X.shape[0]
+        if nb == 0:
+            return self
+        mean_b = X.mean(axis=0)
+        Xc = X - mean_b
+        delta = mean_b - self.mean
+        total = self.n + nb
+        self.m2 += Xc.T @ Xc + np.outer(delta, delta) * (self.n * nb / total)
+        self.mean += delta * (nb / total)
+        self.n = total
+        return self
+
+    def covariance(self, ddof=1):
+        return self.m2 / max(self.n - ddof, 1)
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+# The training scripts import each other as top-level modules
+TRAINING_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TRAINING_DIR)
+
+def repo_root():
+    # Top of the checkout (ml/ and server/ live there): git's answer, else the
+    # nearest parent holding both folders
+    try:
+        out = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=TRAINING_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        path = TRAINING_DIR
+        while not all(os.path.isdir(os.path.join(path, d)) for d in ("ml", "server")):
+            parent = os.path.dirname(path)
+            if parent == path:
+                raise RuntimeError(f"No repository root (with ml/ and server/) above {TRAINING_DIR}")
+            path = parent
+        return path
+
+REPO_ROOT = repo_root()
@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import TRAINING_DIR
+import score_one_session
+from dataset_io import index_path, write_dataset
+from generate_synthetic_motor_csv import synthesize_vectorized
+from motor_bundle import TreeEnsemble
+from score_one_session import load_artifacts, load_rows, score_features
+from scoring_service import feature_matrix
+
+# --------------------------
+# The compact dataset schema must not change what the models see: the CLI
+# scorer (read_dataset / the sidecar index) and the service have to give the
+# same outputs as the original scorer, which read the CSV with pd.read_csv.
+# --------------------------
+
+def run_script(name, *args):
+    subprocess.run([sys.executable, os.path.join(TRAINING_DIR, name), *args],
+                   check=True, capture_output=True)
+
+@pytest.fixture(scope="module")
+def trained(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("parity")
+    csv = str(tmp / "sessions.csv")
+    write_dataset(synthesize_vectorized(n_participants=30, seed=7), csv, index=False)
+    outdir = str(tmp / "model")
+    run_script("train_motor_model_v2.py", "--csv", csv, "--outdir", outdir, "--folds", "2", "--student", "none")
+    return csv, outdir
+
+def baseline_scores(csv, outdir):
+    # What the original score_one_session did: plain read_csv + the joblib files
+    df = pd.read_csv(csv)
+    with open(os.path.join(outdir, "reports", "training_report.json"), encoding="utf-8") as f:
+        motor_cols = json.load(f)["pca"]["motor_feature_columns"]
+    model = joblib.load(os.path.join(outdir, "models", "modelA_motor_only.joblib"))
+    scaler = joblib.load(os.path.join(outdir, "preprocess", "pca_scaler_motor.joblib"))
+    pca = joblib.load(os.path.join(outdir, "preprocess", "pca_pc1_motor.joblib"))
+    X = df[motor_cols].astype(float).values
+    proba = model.predict_proba(pd.DataFrame(X, columns=motor_cols))
+    latent = pca.transform(scaler.transform(X)).reshape(-1)
+    return df, motor_cols, np.max(proba, axis=1), latent, X
+
+@pytest.mark.parametrize("no_index,build_index", [(False, True), (False, False), (True, False)])
+def test_cli_rows_match_baseline(trained, no_index, build_index):
+    csv, outdir = trained
+    df, motor_cols, confidence, latent, _ = baseline_scores(csv, outdir)
+    artifacts = load_artifacts(outdir)
+    args = argparse.Namespace(csv=csv, no_index=no_index, build_index=build_index)
+    rows, n = load_rows(args, ["sessionId", "participantId"] + motor_cols, rows=range(len(df)))
+    assert n == len(df)
+    _, conf, lat = score_features(rows[motor_cols], artifacts)
+    np.testing.assert_array_equal(conf, confidence)
+    np.testing.assert_array_equal(lat, latent)
+
+def test_lookup_writes_index_only_on_request(trained, tmp_path, monkeypatch):
+    csv = str(tmp_path / "sessions.csv")
+    shutil.copy(trained[0], csv)
+    cols = ["sessionId", "participantId"]
+    args = argparse.Namespace(csv=csv, no_index=False, build_index=False)
+    scanned, _ = load_rows(args, cols, rows=[3])
+    assert not os.path.exists(index_path(csv))
+
+    indexed, _ = load_rows(argparse.Namespace(csv=csv, no_index=False, build_index=True), cols, rows=[3])
+    assert os.path.exists(index_path(csv))
+    # An up-to-date index is then used read-only, without a scan
+    monkeypatch.setattr(score_one_session, "read_dataset", None)
+    seeked, _ = load_rows(args, cols, rows=[3])
+    pd.testing.assert_frame_equal(seeked, indexed)
+    # (categories of the compact id columns come from the rows read)
+    pd.testing.assert_frame_equal(seeked.astype(str), scanned.astype(str))
+
+def test_cli_output_matches_baseline(trained, tmp_path):
+    csv, outdir = trained
+    df, _, confidence, latent, _ = baseline_scores(csv, outdir)
+    out = str(tmp_path / "scores.jsonl")
+    run_script("score_one_session.py", "--csv", csv, "--outdir", outdir, "--batch", "--all", "--out", out)
+    with open(out, encoding="utf-8") as f:
+        results = [json.loads(line)["motor_profile"] for line in f]
+    assert [r["confidence"] for r in results] == [round(float(c), 4) for c in confidence]
+    assert [r["latent_score"] for r in results] == [round(float(v), 4) for v in latent]
+
+def test_service_matches_baseline(trained):
+    csv, outdir = trained
+    df, motor_cols, confidence, latent, X_base = baseline_scores(csv, outdir)
+    # Request bodies as clients send them: JSON numbers
+    rows = json.loads(json.dumps(df[motor_cols].to_dict("records")))
+    X, invalid = feature_matrix(rows, motor_cols)
+    assert invalid == []
+    np.testing.assert_array_equal(X, X_base)
+    _, conf, lat = score_features(X, load_artifacts(outdir))
+    np.testing.assert_array_equal(conf, confidence)
+    # Same inputs; the PC1 dot product may sum in a different order for a
+    # row-major matrix than for the frame's column-major values
+    np.testing.assert_allclose(lat, latent, rtol=1e-12)
+
+def test_bundle_batch_leaves_shared_bundle_alone(trained, tmp_path, monkeypatch):
+    # Loaded bundles are memoized per process and shared with other threads;
+    # a batch run may use XGBoost's predictor but must not swap the bundle's own
+    csv, outdir = trained
+    bundle = load_artifacts(outdir, bundle=True)["bundle"]
+    monkeypatch.setattr(sys, "argv", ["score_one_session.py", "--csv", csv, "--outdir", outdir, "--bundle",
+                                      "--batch", "--all", "--out", str(tmp_path / "scores.jsonl")])
+    score_one_session.main()
+    assert load_artifacts(outdir, bundle=True)["bundle"] is bundle
+    assert isinstance(bundle.trees, TreeEnsemble)
@@ -0,0 +1,272 @@
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import REPO_ROOT
+from dataset_io import DELTA_COLS, ROUND_METRICS
+from trace_features import (
+    ATTEMPT_FEATURES, ROUND_AGGREGATES, extract_attempt_features, previous_click_tms,
+    round_features, session_features,
+)
+
+# --------------------------
+# Parity with the server's JavaScript, run through node:
+#   - attempts: utils/featureExtraction.js extractAttemptFeatures
+#   - rounds:   models/MotorSummary.js computeRoundFeatures
+#   - sessions: models/MotorSummary.js computeSessionFeatures
+# MotorSummary.js declares mongoose models when it loads; the driver swaps in
+# a stand-in mongoose whose MotorAttemptBucket.getUserAttempts serves the
+# attempts enriched the way MotorAttemptBucket does, so the real functions run
+# without MongoDB (or npm install).
+# --------------------------
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+JS_FEATURES = os.path.join(REPO_ROOT, "server", "utils", "featureExtraction.js")
+JS_SUMMARY = os.path.join(REPO_ROOT, "server", "models", "MotorSummary.js")
+
+JS_DRIVER = r"""
+const fs = require('fs');
+const Module = require('module');
+const [featurePath, summaryPath, src, dst] = process.argv.slice(2);
+console.log = () => {};  // silence the <4 samples warning
+
+const attemptsByUser = {};
+class Schema { index() { return this; } }
+Schema.Types = { ObjectId: 'ObjectId', Mixed: 'Mixed' };
+const mongoose = {
+  Schema,
+  model: name => name === 'MotorAttemptBucket'
+    ? { getUserAttempts: async (userId, round) => attemptsByUser[userId].filter(a => a.round === round) }
+    : {},
+};
+const load = Module._load;
+Module._load = function (request, ...rest) {
+  return request === 'mongoose' ? mongoose : load.call(this, request, ...rest);
+};
+
+const { extractAttemptFeatures } = require(featurePath);
+const { computeRoundFeatures, computeSessionFeatures } = require(summaryPath);
+
+(async () => {
+  const input = JSON.parse(fs.readFileSync(src, 'utf8'));
+  const out = { attempts: [], rounds: [], sessions: [] };
+  for (const [userId, session] of Object.entries(input)) {
+    // MotorAttemptBucket.addAttempts: clicked -> extractAttemptFeatures, missed -> timing only
+    attemptsByUser[userId] = session.attempts.map(a => {
+      const features = a.click.clicked
+        ? extractAttemptFeatures({
+            samples: session.samples[a.round], spawnTms: a.spawnTms, clickTms: a.click.tms,
+            target: a.target, prevClickTms: a.prevClickTms,
+          })
+        : {
+            timing: {
+              reactionTimeMs: null,
+              movementTimeMs: null,
+              interTapMs: a.prevClickTms ? (a.despawnTms || Date.now()) - a.prevClickTms : null,
+            },
+            spatial: {}, kinematics: {}, fitts: {},
+          };
+      out.attempts.push(Object.assign({}, features.timing, features.spatial, features.kinematics, features.fitts));
+      return { round: a.round, click: a.click, ...features };
+    });
+    for (const round of [1, 2, 3]) {
+      const rf = await computeRoundFeatures(userId, round);
+      if (rf) out.rounds.push(Object.assign({ sessionId: userId, round }, rf));
+    }
+    out.sessions.push(Object.assign({ sessionId: userId }, await computeSessionFeatures(userId)));
+  }
+  fs.writeFileSync(dst, JSON.stringify(out));
+})();
+"""
+
+# ROUND_METRICS name -> computeRoundFeatures key, where they differ
+JS_NAMES = {"nTargets": "nAttempts", "interTap_mean": "interTapTime_mean", "interTap_std": "interTapTime_std"}
+# ROUND_METRICS that computeRoundFeatures does not return; checked against its
+# helpers (js_mean / js_std / js_median) applied to the JS attempt features
+NOT_IN_JS = {"pathLength_std", "speedVar_mean", "meanAccel_mean", "peakAccel_mean", "interTap_cv"}
+
+def synthetic_traces(n_sessions=20, attempts_per_round=12, seed=0):
+    # Pointer traces with jittered ~60 Hz sampling, repeated timestamps,
+    # overshoot/correction, missed bubbles and too-short attempts
+    rng = np.random.default_rng(seed)
+    samples, attempts = [], []
+    for s in range(n_sessions):
+        sid = f"S_{s+1:05d}"
+        for r in [1,2,3]:
+            tms, px, py = 0.0, rng.uniform(0.2, 0.8), rng.uniform(0.2, 0.8)
+            for a in range(attempts_per_round):
+                spawn = tms + rng.uniform(50, 400)
+                tx, ty, rad = rng.uniform(0.1, 0.9), rng.uniform(0.1, 0.9), rng.uniform(0.02, 0.06)
+                n_pts = int(rng.choice([2, 3, rng.integers(6, 60)], p=[0.05, 0.05, 0.9]))
+                overshoot = rng.uniform(0, 0.3)
+                ts = spawn + np.cumsum(rng.choice([0.0, 8.0, 16.0, 17.0, 33.0], size=n_pts, p=[0.05, 0.1, 0.5, 0.25, 0.1]))
+                ts = np.round(ts + rng.normal(0, 0.3, size=n_pts), 1)
+                ts = np.maximum.accumulate(ts)
+                u = np.linspace(0, 1, n_pts)
+                prof = 10*u**3 - 15*u**4 + 6*u**5
+                prof = prof + overshoot * np.sin(np.pi * u) * u
+                xs = px + (tx - px) * prof + rng.normal(0, 0.002, size=n_pts)
+                ys = py + (ty - py) * prof + rng.normal(0, 0.002, size=n_pts)
+                hold = int(rng.integers(0, 4))
+                xs[:hold], ys[:hold] = px, py
+                for t_, x_, y_ in zip(ts, xs, ys):
+                    samples.append((sid, r, float(t_), float(x_), float(y_)))
+                clicked = rng.random() > 0.1
+                click_t = float(ts[-1]) if clicked else np.nan
+                hit = clicked and rng.random() > 0.15
+                attempts.append((sid, r, float(spawn), tx, ty, rad, clicked, hit, click_t,
+                                 np.nan if clicked else float(ts[-1]) + 200))
+                tms = float(ts[-1]) + rng.uniform(0, 200)
+                px, py = xs[-1], ys[-1]
+    samples = pd.DataFrame(samples, columns=["sessionId", "round", "tms", "x", "y"])
+    attempts = pd.DataFrame(attempts, columns=["sessionId", "round", "spawnTms", "target_x", "target_y",
+                                               "target_radius", "click_clicked", "click_hit", "click_tms",
+                                               "despawnTms"])
+    return samples, attempts
+
+def _num(v):
+    return None if v is None or (isinstance(v, float) and np.isnan(v)) else float(v)
+
+def run_js(samples, attempts, prev, tmp_path):
+    sessions = {}
+    for sid, g in samples.groupby("sessionId", sort=False):
+        sessions[sid] = {"samples": {
+            int(r): gr.sort_values("tms", kind="stable")[["tms", "x", "y"]].to_dict("records")
+            for r, gr in g.groupby("round")
+        }, "attempts": []}
+    for i, a in enumerate(attempts.itertuples(index=False)):
+        sessions[a.sessionId]["attempts"].append({
+            "round": int(a.round), "spawnTms": a.spawnTms, "despawnTms": _num(a.despawnTms),
+            "target": {"x": a.target_x, "y": a.target_y, "radius": a.target_radius},
+            "click": {"clicked": bool(a.click_clicked), "hit": bool(a.click_hit), "tms": _num(a.click_tms)},
+            "prevClickTms": _num(prev[i]),
+        })
+    driver, src, dst = (str(tmp_path / n) for n in ("driver.js", "cases.json", "out.json"))
+    with open(driver, "w", encoding="utf-8") as f:
+        f.write(JS_DRIVER)
+    with open(src, "w", encoding="utf-8") as f:
+        json.dump(sessions, f)
+    subprocess.run(["node", driver, JS_FEATURES, JS_SUMMARY, src, dst], check=True)
+    with open(dst, encoding="utf-8") as f:
+        return json.load(f)
+
+# JS helpers of computeRoundFeatures, on lists with nulls already filtered out
+def js_mean(v):
+    return sum(v) / len(v) if v else None
+
+def js_std(v):
+    if len(v) < 2:
+        return None
+    m = js_mean(v)
+    return (sum((x - m) ** 2 for x in v) / len(v)) ** 0.5
+
+def js_median(v):
+    if not v:
+        return None
+    s = sorted(v)
+    mid = len(s) // 2
+    return (s[mid - 1] + s[mid]) / 2 if len(s) % 2 == 0 else s[mid]
+
+def reference_metric(metric, js_attempts, hits):
+    # computeRoundFeatures' conventions for the metrics it does not return
+    if metric == "interTap_cv":
+        std, mean = (reference_metric(m, js_attempts, hits) for m in ("interTap_std", "interTap_mean"))
+        return None if std is None or not mean else std / mean
+    src, stat, hits_only = ROUND_AGGREGATES[metric]
+    values = [a.get(src) for a, hit in zip(js_attempts, hits) if hit or not hits_only]
+    values = [v for v in values if v is not None]
+    return {"mean": js_mean, "std": js_std, "median": js_median}[stat](values)
+
+def mismatches(where, py, js, rtol=1e-9):
+    # py/js: {name: value}; NaN / None / absent all mean "no value"
+    out = []
+    for name in py:
+        a, b = _num(py[name]), _num(js.get(name))
+        if a is None and b is None:
+            continue
+        if a is None or b is None or not np.isclose(a, b, rtol=rtol, atol=1e-12):
+            out.append((where, name, a, b))
+    return out
+
+@pytest.fixture(scope="module", params=[(12, 12, 0), (40, 3, 1), (40, 2, 2)],
+                ids=["12_per_round", "3_per_round", "2_per_round"])
+def traces(request, tmp_path_factory):
+    # Few attempts per round -> many rounds with 0/1 hits (null std) and
+    # even-length medians
+    n_sessions, per_round, seed = request.param
+    samples, attempts = synthetic_traces(n_sessions, per_round, seed)
+    prev = previous_click_tms(attempts)
+    js = run_js(samples, attempts, prev, tmp_path_factory.mktemp("js"))
+    return samples, attempts, prev, js, per_round
+
+def test_attempt_features(traces):
+    samples, attempts, prev, js, _ = traces
+    py = extract_attempt_features(samples, attempts, prev)
+    assert len(js["attempts"]) == len(attempts)
+    bad = []
+    for i, feats in enumerate(js["attempts"]):
+        bad += mismatches(i, py[ATTEMPT_FEATURES].iloc[i].to_dict(), feats)
+    assert not bad, bad[:20]
+
+def test_round_features(traces):
+    samples, attempts, prev, js, _ = traces
+    py = round_features(attempts, extract_attempt_features(samples, attempts, prev))
+    assert len(py) == len(js["rounds"])
+    py = py.set_index(["sessionId", "round"])
+
+    pos = pd.Series(np.arange(len(attempts)), index=pd.MultiIndex.from_frame(attempts[["sessionId", "round"]]))
+    hit = attempts["click_hit"].to_numpy(bool)
+    bad = []
+    for jr in js["rounds"]:
+        key = (jr["sessionId"], jr["round"])
+        rows = pos.loc[key].to_numpy()
+        js_attempts = [js["attempts"][i] for i in rows]
+        expected = {}
+        for m in ROUND_METRICS:
+            if m in NOT_IN_JS:
+                expected[m] = reference_metric(m, js_attempts, hit[rows])
+            else:
+                expected[m] = jr.get(JS_NAMES.get(m, m))
+        bad += mismatches(key, py.loc[key, ROUND_METRICS].to_dict(), expected)
+    assert not bad, bad[:20]
+
+    # Every ROUND_METRICS column is either returned by computeRoundFeatures or listed in NOT_IN_JS
+    js_keys = set().union(*(r.keys() for r in js["rounds"]))
+    assert {m for m in ROUND_METRICS if JS_NAMES.get(m, m) not in js_keys} == NOT_IN_JS
+
+def test_round_edge_cases_covered(traces):
+    # The conventions that differ from pandas/NumPy defaults actually occur
+    _, _, _, js, per_round = traces
+    if per_round > 3:
+        pytest.skip("long rounds rarely have a single hit")
+    rounds = js["rounds"]
+    assert any(r["movementTime_mean"] is not None and r["movementTime_std"] is None for r in rounds)
+    assert any(r["nHits"] < r["nAttempts"] for r in rounds)
+    assert any(r["nHits"] >= 2 and r["nHits"] % 2 == 0 and r["movementTime_median"] is not None for r in rounds)
+
+def test_session_features(traces):
+    samples, attempts, _, js, _ = traces
+    py = session_features(samples, attempts).set_index("sessionId")
+    assert len(py) == len(js["sessions"])
+    bad = []
+    for js_sess in js["sessions"]:
+        sid = js_sess["sessionId"]
+        expected = {}
+        for r in [1,2,3]:
+            for m in ROUND_METRICS:
+                if m not in NOT_IN_JS:
+                    expected[f"r{r}_{m}"] = js_sess.get(f"r{r}_{JS_NAMES.get(m, m)}")
+        for c in DELTA_COLS:
+            _, ra, _, rb, metric = c.split("_", 4)
+            a, b = expected[f"{ra}_{metric}"], expected[f"{rb}_{metric}"]
+            expected[c] = None if a is None or b is None else a - b
+        if all(f"r{r}_hitRate" in js_sess for r in [1,2,3]):
+            expected["delta_r3_minus_r1_hitRate"] = js_sess["hitRate_trend"]
+        bad += mismatches(sid, py.loc[sid, list(expected)].to_dict(), expected)
+    assert not bad, bad[:20]
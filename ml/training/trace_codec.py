@@ -0,0 +1,481 @@
+import argparse
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+from ingest_traces import ATTEMPT_COLS, _read_spill, attempt_rows, spill
+from trace_features import session_features
+
+# --------------------------
+# Compact binary store for pointer traces (MotorPointerTraceBucket samples)
+# plus their attempts, read back through a memory map.
+#
+# Layout (little-endian):
+#   header        fixed HEADER_DTYPE record (quantization + table offsets)
+#   column blocks per session, one contiguous array per column, 8-byte aligned:
+#                   tms, x, y    quantized, delta-encoded within each round
+#                   flags        bit 0 isDown, bits 1-2 pointerType
+#                   pointer_id   -1 = missing
+#                   pressure     quantized, -1 = missing
+#                 each column uses the narrowest integer type that fits the
+#                 session (int8..int64), recorded in the session table
+#   tables        sessions, rounds (per-round offset table: sample range +
+#                 base values), attempts (sample range + target/click), ids
+#
+# A round or attempt is a slice of its session's columns: .raw holds
+# zero-copy views into the map; decoding tms/x/y is one cumsum per round.
+# --------------------------
+
+MAGIC = b"MTRACE01"
+VERSION = 1
+
+TMS_QUANTUM_MS = 0.1     # time resolution
+XY_SCALE = 65536         # x/y are normalized 0..1 -> 1/65536 of the screen
+PRESSURE_SCALE = 100     # 0..1 -> 0..100
+
+COLUMNS = ("tms", "x", "y", "flags", "pointer_id", "pressure")
+DELTA_COLUMNS = ("tms", "x", "y")
+POINTER_TYPES = ("unknown", "mouse", "touch", "pen")
+DTYPES = [np.dtype(t) for t in ("<i1", "<i2", "<i4", "<i8", "u1")]
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"), ("version", "<u4"), ("n_columns", "<u4"),
+    ("tms_quantum", "<f8"), ("xy_scale", "<f8"), ("pressure_scale", "<f8"),
+    ("n_sessions", "<u8"), ("n_rounds", "<u8"), ("n_attempts", "<u8"), ("n_samples", "<u8"),
+    ("sessions_offset", "<u8"), ("rounds_offset", "<u8"), ("attempts_offset", "<u8"),
+    ("ids_offset", "<u8"), ("ids_length", "<u8"),
+])
+SESSION_DTYPE = np.dtype([
+    ("n_samples", "<u8"), ("first_round", "<u8"), ("n_rounds", "<u8"),
+    ("first_attempt", "<u8"), ("n_attempts", "<u8"),
+    ("offsets", "<u8", (len(COLUMNS),)), ("dtypes", "u1", (len(COLUMNS),)),
+])
+ROUND_DTYPE = np.dtype([
+    ("session", "<u8"), ("round", "<i8"), ("start", "<u8"), ("count", "<u8"),
+    ("base_tms", "<i8"), ("base_x", "<i8"), ("base_y", "<i8"),
+])
+ATTEMPT_DTYPE = np.dtype([
+    ("session", "<u8"), ("round", "<i8"), ("start", "<u8"), ("count", "<u8"),
+    ("clicked", "u1"), ("hit", "u1"),
+    ("spawnTms", "<f8"), ("click_tms", "<f8"), ("despawnTms", "<f8"),
+    ("target_x", "<f8"), ("target_y", "<f8"), ("target_radius", "<f8"),
+])
+
+ALIGN = 8
+
+def _narrowest(v):
+    # Index into DTYPES of the smallest signed type holding every value
+    if not len(v):
+        return 0
+    lo, hi = int(v.min()), int(v.max())
+    for code, dt in enumerate(DTYPES[:4]):
+        info = np.iinfo(dt)
+        if info.min <= lo and hi <= info.max:
+            return code
+    raise OverflowError("value out of int64 range")
+
+def _quantize(v, scale, missing=-1):
+    v = np.asarray(v, dtype=np.float64)
+    return np.where(np.isnan(v), missing, np.rint(np.nan_to_num(v) * scale)).astype(np.int64)
+
+def _optional(samples, col, default):
+    return samples[col].to_numpy() if col in samples else np.full(len(samples), default)
+
+# --------------------------
+# Writing
+# --------------------------
+
+class TraceWriter:
+    # Streams sessions into one file; tables and header are written on close()
+    def __init__(self, path, tms_quantum=TMS_QUANTUM_MS, xy_scale=XY_SCALE, pressure_scale=PRESSURE_SCALE):
+        self.path = path
+        self.tms_quantum, self.xy_scale, self.pressure_scale = tms_quantum, xy_scale, pressure_scale
+        self.f = open(path, "wb")
+        self.f.write(b"\0" * HEADER_DTYPE.itemsize)
+        self._pad()
+        self.ids, self.sessions, self.rounds, self.attempts = [], [], [], []
+        self.n_samples = 0
+
+    def _pad(self):
+        self.f.write(b"\0" * (-self.f.tell() % ALIGN))
+
+    def add_session(self, session_id, samples, attempts=None):
+        # samples: round, tms, x, y[, isDown, pointerType, pointerId, pressure]
+        # attempts: round, spawnTms, click_tms, despawnTms, target_x/_y/_radius, click_clicked, click_hit
+        s = samples.sort_values(["round", "tms"], kind="stable")
+        rnd = s["round"].to_numpy(np.int64)
+        tms = s["tms"].to_numpy(np.float64)
+        q = {
+            "tms": _quantize(tms, 1.0 / self.tms_quantum),
+            "x": _quantize(s["x"], self.xy_scale),
+            "y": _quantize(s["y"], self.xy_scale),
+        }
+        starts = np.flatnonzero(np.r_[True, rnd[1:] != rnd[:-1]]) if len(rnd) else np.zeros(0, dtype=np.int64)
+        counts = np.diff(np.r_[starts, len(rnd)])
+        bases = {c: q[c][starts] for c in DELTA_COLUMNS}
+        cols = {}
+        for c in DELTA_COLUMNS:
+            d = np.diff(q[c], prepend=q[c][:1])
+            d[starts] = 0  # every round decodes from its own base
+            cols[c] = d
+        ptype = pd.Series(_optional(s, "pointerType", "unknown")).map(
+            {p: i for i, p in enumerate(POINTER_TYPES)}).fillna(0).to_numpy(np.int64)
+        is_down = pd.Series(_optional(s, "isDown", False)).fillna(False).astype(bool).to_numpy()
+        cols["flags"] = is_down.astype(np.int64) | (ptype << 1)
+        cols["pointer_id"] = _quantize(_optional(s, "pointerId", np.nan), 1)
+        cols["pressure"] = _quantize(_optional(s, "pressure", np.nan), self.pressure_scale)
+
+        entry = np.zeros((), dtype=SESSION_DTYPE)
+        for j, c in enumerate(COLUMNS):
+            code = 4 if c == "flags" else _narrowest(cols[c])
+            entry["dtypes"][j] = code
+            entry["offsets"][j] = self.f.tell()
+            self.f.write(cols[c].astype(DTYPES[code]).tobytes())
+            self._pad()
+
+        sid = len(self.ids)
+        self.ids.append(str(session_id))
+        entry["n_samples"] = len(s)
+        entry["first_round"], entry["n_rounds"] = len(self.rounds), len(starts)
+        for k in range(len(starts)):
+            self.rounds.append((sid, rnd[starts[k]], starts[k], counts[k],
+                                bases["tms"][k], bases["x"][k], bases["y"][k]))
+        entry["first_attempt"] = len(self.attempts)
+        if attempts is not None and len(attempts):
+            self._add_attempts(sid, attempts, rnd, tms, starts, counts)
+        entry["n_attempts"] = len(self.attempts) - entry["first_attempt"]
+        self.sessions.append(entry)
+        self.n_samples += len(s)
+
+    def _add_attempts(self, sid, attempts, rnd, tms, starts, counts):
+        # Sample range of an attempt: spawnTms <= tms <= click_tms (despawnTms
+        # when not clicked) within its round, as trace_features.segment()
+        a = attempts
+        clicked = a["click_clicked"].fillna(False).astype(bool).to_numpy()
+        hit = a["click_hit"].fillna(False).astype(bool).to_numpy() if "click_hit" in a else np.zeros(len(a), dtype=bool)
+        target = {c: a[c].to_numpy(np.float64) if c in a else np.full(len(a), np.nan)
+                  for c in ("target_x", "target_y", "target_radius")}
+        click = a["click_tms"].to_numpy(np.float64)
+        despawn = a["despawnTms"].to_numpy(np.float64) if "despawnTms" in a else np.full(len(a), np.nan)
+        spawn = a["spawnTms"].to_numpy(np.float64)
+        end = np.where(clicked, click, despawn)
+        round_start = dict(zip(rnd[starts].tolist(), zip(starts.tolist(), counts.tolist())))
+        for i, r in enumerate(a["round"].to_numpy(np.int64)):
+            start, count = round_start.get(int(r), (0, 0))
+            t = tms[start:start + count]
+            lo = int(np.searchsorted(t, spawn[i], side="left"))
+            hi = int(np.searchsorted(t, end[i], side="right")) if np.isfinite(end[i]) else lo
+            self.attempts.append((sid, r, start + lo, max(hi - lo, 0), clicked[i], hit[i], spawn[i], click[i],
+                                  despawn[i], target["target_x"][i], target["target_y"][i], target["target_radius"][i]))
+
+    def _table(self, rows, dtype):
+        offset = self.f.tell()
+        self.f.write(np.array(rows, dtype=dtype).tobytes())
+        self._pad()
+        return offset
+
+    def close(self):
+        header = np.zeros((), dtype=HEADER_DTYPE)
+        header["sessions_offset"] = self.f.tell()
+        self.f.write(np.array(self.sessions, dtype=SESSION_DTYPE).tobytes() if self.sessions else b"")
+        self._pad()
+        header["rounds_offset"] = self._table(self.rounds, ROUND_DTYPE)
+        header["attempts_offset"] = self._table(self.attempts, ATTEMPT_DTYPE)
+        ids = "\n".join(self.ids).encode("utf-8")
+        header["ids_offset"], header["ids_length"] = self.f.tell(), len(ids)
+        self.f.write(ids)
+        header["magic"], header["version"], header["n_columns"] = MAGIC, VERSION, len(COLUMNS)
+        header["tms_quantum"], header["xy_scale"], header["pressure_scale"] = (
+            self.tms_quantum, self.xy_scale, self.pressure_scale)
+        header["n_sessions"], header["n_rounds"] = len(self.ids), len(self.rounds)
+        header["n_attempts"], header["n_samples"] = len(self.attempts), self.n_samples
+        self.f.seek(0)
+        self.f.write(header.tobytes())
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def encode_tables(samples, attempts, path, by="sessionId", **kw):
+    # Flat tables (trace_features.py inputs) -> one archive, sessions in first-seen order
+    attempt_groups = dict(tuple(attempts.groupby(by, sort=False))) if attempts is not None else {}
+    with TraceWriter(path, **kw) as w:
+        for sid, s in samples.groupby(by, sort=False):
+            w.add_session(sid, s, attempt_groups.pop(sid, None))
+        for sid, a in attempt_groups.items():  # attempts without samples
+            w.add_session(sid, samples.iloc[:0], a)
+
+# --------------------------
+# Reading
+# --------------------------
+
+class RoundTrace:
+    # One round (or attempt) of a session: raw columns are views into the map
+    def __init__(self, archive, raw, base):
+        self.archive = archive
+        self.raw = raw
+        self.base = base  # quantized tms/x/y of the first sample
+
+    def __len__(self):
+        return len(self.raw["tms"])
+
+    def _decode(self, col, scale):
+        return (self.base[col] + np.cumsum(self.raw[col], dtype=np.int64)) / scale
+
+    @property
+    def tms(self):
+        return self._decode("tms", 1.0 / self.archive.tms_quantum)
+
+    @property
+    def x(self):
+        return self._decode("x", self.archive.xy_scale)
+
+    @property
+    def y(self):
+        return self._decode("y", self.archive.xy_scale)
+
+    @property
+    def is_down(self):
+        return (self.raw["flags"] & 1).astype(bool)
+
+    @property
+    def pointer_type(self):
+        return np.asarray(POINTER_TYPES)[self.raw["flags"] >> 1]
+
+    @property
+    def pointer_id(self):
+        return np.where(self.raw["pointer_id"] < 0, np.nan, self.raw["pointer_id"])
+
+    @property
+    def pressure(self):
+        p = self.raw["pressure"]
+        return np.where(p < 0, np.nan, p / self.archive.pressure_scale)
+
+class TraceArchive:
+    def __init__(self, path):
+        self.path = path
+        self.mm = np.memmap(path, dtype=np.uint8, mode="r")
+        header = self.mm[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        if bytes(header["magic"]) != MAGIC:
+            raise ValueError(f"Not a trace archive: {path}")
+        if int(header["version"]) != VERSION:
+            raise ValueError(f"Unsupported trace archive version {int(header['version'])}")
+        self.header = header
+        self.tms_quantum = float(header["tms_quantum"])
+        self.xy_scale = float(header["xy_scale"])
+        self.pressure_scale = float(header["pressure_scale"])
+        self.sessions = self._table("sessions_offset", "n_sessions", SESSION_DTYPE)
+        self.rounds = self._table("rounds_offset", "n_rounds", ROUND_DTYPE)
+        self.attempts = self._table("attempts_offset", "n_attempts", ATTEMPT_DTYPE)
+        ids = bytes(self.mm[int(header["ids_offset"]):int(header["ids_offset"]) + int(header["ids_length"])])
+        self.session_ids = ids.decode("utf-8").split("\n") if len(self.sessions) else []
+        self.index = {sid: i for i, sid in enumerate(self.session_ids)}
+
+    def _table(self, offset_key, count_key, dtype):
+        offset, n = int(self.header[offset_key]), int(self.header[count_key])
+        return self.mm[offset:offset + n * dtype.itemsize].view(dtype)
+
+    def __len__(self):
+        return len(self.session_ids)
+
+    def _session(self, session):
+        return self.index[session] if isinstance(session, str) else int(session)
+
+    def columns(self, session, start=0, count=None):
+        # Raw (encoded) columns of a session, or of a sample range of it
+        entry = self.sessions[self._session(session)]
+        if count is None:
+            count = int(entry["n_samples"]) - start
+        out = {}
+        for j, c in enumerate(COLUMNS):
+            dt = DTYPES[entry["dtypes"][j]]
+            offset = int(entry["offsets"][j]) + start * dt.itemsize
+            out[c] = self.mm[offset:offset + count * dt.itemsize].view(dt)
+        return out
+
+    def session_rounds(self, session):
+        entry = self.sessions[self._session(session)]
+        first = int(entry["first_round"])
+        return self.rounds[first:first + int(entry["n_rounds"])]
+
+    def session_attempts(self, session):
+        entry = self.sessions[self._session(session)]
+        first = int(entry["first_attempt"])
+        return self.attempts[first:first + int(entry["n_attempts"])]
+
+    def _round_row(self, session, round_number):
+        rows = self.session_rounds(session)
+        hit = np.flatnonzero(rows["round"] == round_number)
+        if not len(hit):
+            raise KeyError(f"No round {round_number} in session {session}")
+        return rows[hit[0]]
+
+    def round(self, session, round_number):
+        r = self._round_row(session, round_number)
+        raw = self.columns(session, int(r["start"]), int(r["count"]))
+        return RoundTrace(self, raw, {c: int(r[f"base_{c}"]) for c in DELTA_COLUMNS})
+
+    def attempt(self, i):
+        # i: global attempt row (see session_attempts() for a session's range)
+        a = self.attempts[i]
+        if not a["count"]:
+            return RoundTrace(self, self.columns(int(a["session"]), 0, 0), dict.fromkeys(DELTA_COLUMNS, 0))
+        r = self._round_row(int(a["session"]), int(a["round"]))
+        skip = int(a["start"]) - int(r["start"])
+        raw = self.columns(int(a["session"]), int(a["start"]), int(a["count"]))
+        # Base = round base + the deltas before the attempt
+        prefix = self.columns(int(a["session"]), int(r["start"]), skip)
+        base = {c: int(r[f"base_{c}"]) + int(np.sum(prefix[c], dtype=np.int64)) for c in DELTA_COLUMNS}
+        return RoundTrace(self, raw, base)
+
+    # ---- whole-archive decode
+    def tables(self, sessions=None):
+        # -> (samples, attempts) DataFrames in trace_features.py's input schema
+        idx = np.arange(len(self)) if sessions is None else np.sort([self._session(s) for s in sessions])
+        dtypes, offsets = self.sessions["dtypes"], self.sessions["offsets"]
+        n_samples = self.sessions["n_samples"].astype(np.int64)
+        # Per session (column widths differ): running sums of the deltas
+        sums = {c: [] for c in DELTA_COLUMNS}
+        for i in idx:
+            for j, c in enumerate(DELTA_COLUMNS):
+                dt = DTYPES[dtypes[i, j]]
+                off = int(offsets[i, j])
+                sums[c].append(np.cumsum(self.mm[off:off + int(n_samples[i]) * dt.itemsize].view(dt), dtype=np.int64))
+        first = np.cumsum(n_samples[idx]) - n_samples[idx]  # session -> position in the batch
+        pos = np.full(len(self), -1, dtype=np.int64)
+        pos[idx] = first
+
+        rows = self.rounds[np.isin(self.rounds["session"], idx)]
+        owner = np.repeat(np.arange(len(rows)), rows["count"].astype(np.int64))
+        round_start = pos[rows["session"].astype(np.int64)] + rows["start"].astype(np.int64)
+        samples = {"sessionId": np.asarray(self.session_ids, dtype=object)[rows["session"][owner].astype(np.int64)],
+                   "round": rows["round"][owner]}
+        for c, scale in (("tms", 1.0 / self.tms_quantum), ("x", self.xy_scale), ("y", self.xy_scale)):
+            cs = np.concatenate(sums[c]) if sums[c] else np.zeros(0, dtype=np.int64)
+            # the running sum restarts at every round start (its delta is 0)
+            samples[c] = (rows[f"base_{c}"][owner] + cs - cs[round_start][owner]) / scale
+        samples = pd.DataFrame(samples)
+
+        att = self.attempts[np.isin(self.attempts["session"], idx)]
+        if not len(att):
+            return samples, None
+        attempts = pd.DataFrame({"sessionId": np.asarray(self.session_ids, dtype=object)[att["session"].astype(np.int64)]})
+        for name in ("round", "spawnTms", "target_x", "target_y", "target_radius", "click_tms", "despawnTms"):
+            attempts[name] = att[name]
+        attempts["click_clicked"] = att["clicked"].astype(bool)
+        attempts["click_hit"] = att["hit"].astype(bool)
+        return samples, attempts
+
+def archive_features(path, batch_sessions=5000):
+    # Session feature table straight from an archive, batch_sessions at a time
+    archive = TraceArchive(path)
+    parts = []
+    for lo in range(0, len(archive), batch_sessions):
+        samples, attempts = archive.tables(range(lo, min(lo + batch_sessions, len(archive))))
+        if attempts is not None:
+            parts.append(session_features(samples, attempts))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+# --------------------------
+# Mongo exports (through ingest_traces.py's partitioned spill)
+# --------------------------
+
+TRACE_COLS = ["userId", "bucketNumber", "seq", "round", "tms", "x", "y",
+              "isDown", "pointerType", "pointerId", "pressure"]
+
+def trace_rows(doc):
+    uid, bucket = str(doc["userId"]), doc.get("bucketNumber", 1)
+    return [(uid, bucket, i, s["round"], s["tms"], s["x"], s["y"], bool(s.get("isDown", False)),
+             s.get("pointerType", "unknown"), s.get("pointerId"), s.get("pressure"))
+            for i, s in enumerate(doc.get("samples", []))]
+
+def encode_exports(traces, attempts, out, spill_dir=None, partitions=64, flush_rows=200000, **kw):
+    spill_dir = spill_dir or out + ".spill"
+    if os.path.exists(spill_dir):
+        shutil.rmtree(spill_dir)
+    os.makedirs(spill_dir)
+    try:
+        spill(traces, "traces", TRACE_COLS, trace_rows, spill_dir, partitions, flush_rows)
+        if attempts:
+            spill(attempts, "attempts", ATTEMPT_COLS, attempt_rows, spill_dir, partitions, flush_rows)
+        with TraceWriter(out, **kw) as w:
+            for p in range(partitions):
+                s = _read_spill(spill_dir, "traces", p)
+                if s is None:
+                    continue
+                a = _read_spill(spill_dir, "attempts", p)
+                by_user = {} if a is None else dict(tuple(
+                    a.sort_values(["userId", "bucketNumber", "seq"], kind="stable").groupby("userId", sort=False)))
+                s = s.sort_values(["userId", "bucketNumber", "seq"], kind="stable")
+                for uid, g in s.groupby("userId", sort=False):
+                    w.add_session(uid, g, by_user.get(uid))
+            return len(w.ids), w.n_samples
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+def describe(path):
+    archive = TraceArchive(path)
+    n = int(archive.header["n_samples"])
+    size = os.path.getsize(path)
+    print(f"{path}: {len(archive)} sessions, {int(archive.header['n_rounds'])} rounds, "
+          f"{int(archive.header['n_attempts'])} attempts, {n} samples")
+    print(f"  {size} bytes ({size / max(n, 1):.2f} bytes/sample); quantization: tms {archive.tms_quantum} ms, "
+          f"x/y 1/{archive.xy_scale:g}, pressure 1/{archive.pressure_scale:g}")
+    if len(archive):
+        widths = pd.DataFrame(
+            [[DTYPES[c].name for c in row] for row in archive.sessions["dtypes"]], columns=list(COLUMNS))
+        for c in COLUMNS:
+            print(f"  {c:<10} " + ", ".join(f"{k}: {v}" for k, v in widths[c].value_counts().items()))
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    enc = sub.add_parser("encode", help="Encode pointer traces (+ attempts) into a trace archive")
+    enc.add_argument("--out", required=True, help="Archive path (e.g., traces.mtrace)")
+    enc.add_argument("--traces", default=None, help="MotorPointerTraceBucket export (JSONL)")
+    enc.add_argument("--attempts", default=None, help="MotorAttemptBucket export (JSONL)")
+    enc.add_argument("--samples", default=None,
+                     help="Or a flat samples table (.csv/.parquet): sessionId, round, tms, x, y[, isDown, pointerType, ...]")
+    enc.add_argument("--attempts_table", default=None, help="With --samples: flat attempts table (.csv/.parquet)")
+    enc.add_argument("--tms_quantum", type=float, default=TMS_QUANTUM_MS, help="Time resolution (ms)")
+    enc.add_argument("--xy_scale", type=float, default=XY_SCALE, help="Position steps per normalized unit")
+    enc.add_argument("--partitions", type=int, default=64, help="JSONL: hash partitions by userId")
+    enc.add_argument("--flush_rows", type=int, default=200000, help="JSONL: buffered rows before spilling")
+
+    feat = sub.add_parser("features", help="Session features (trace_features.py) from an archive")
+    feat.add_argument("--archive", required=True)
+    feat.add_argument("--out", required=True, help="Output dataset (.csv or .parquet)")
+    feat.add_argument("--batch_sessions", type=int, default=5000)
+
+    info = sub.add_parser("info", help="Print archive size and column widths")
+    info.add_argument("--archive", required=True)
+    args = ap.parse_args()
+
+    if args.cmd == "encode":
+        kw = {"tms_quantum": args.tms_quantum, "xy_scale": args.xy_scale}
+        if args.traces:
+            encode_exports(args.traces, args.attempts, args.out, partitions=args.partitions,
+                           flush_rows=args.flush_rows, **kw)
+        elif args.samples:
+            from dataset_io import read_dataset
+            attempts = read_dataset(args.attempts_table) if args.attempts_table else None
+            encode_tables(read_dataset(args.samples), attempts, args.out, **kw)
+        else:
+            ap.error("encode needs --traces or --samples")
+        describe(args.out)
+    elif args.cmd == "features":
+        from dataset_io import write_dataset
+        df = archive_features(args.archive, args.batch_sessions)
+        write_dataset(df, args.out)
+        print("Wrote session features:", os.path.abspath(args.out))
+        print("Shape:", df.shape)
+    else:
+        describe(args.archive)
+
+if __name__ == "__main__":
+    main()
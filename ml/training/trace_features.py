@@ -0,0 +1,369 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+from dataset_io import ROUND_METRICS, DELTA_COLS, read_dataset, write_dataset
+
+# --------------------------
+# Python port of server/utils/featureExtraction.js (extractAttemptFeatures)
+# and of the round aggregation in server/models/MotorSummary.js, vectorized
+# over all attempts of all sessions at once.
+#
+# Inputs are flat tables (Mongo sub-documents flattened with "_"):
+#   samples : sessionId, round, tms, x, y              (MotorPointerTraceBucket.samples)
+#   attempts: sessionId, round, spawnTms, target_x, target_y, target_radius,
+#             click_clicked, click_hit, click_tms[, despawnTms]   (MotorAttemptBucket.attempts)
+# Attempts only see samples of their own session and round.
+# --------------------------
+
+MIN_SAMPLES = 4           # fewer samples -> timing only
+EPS_MOVE = 0.003          # movement-start displacement (normalized)
+REVERSAL_EPS = 0.001      # distance-to-target reversal threshold
+OSCILLATION_EPS = 0.002   # x/y direction reversal threshold
+GATE_RADII = 4            # overshoot gate = 4 * target radius
+SUBMOVEMENT_FRAC = 0.15   # speed peaks >= 15% of peak speed
+SMOOTH_W = 5              # moving-average window for speed
+FINAL_PHASE = 0.7         # last 30% of the movement
+MIN_MT_SEC = 0.05
+
+ATTEMPT_FEATURES = [
+    "reactionTimeMs", "movementTimeMs", "interTapMs",
+    "errorDistNorm", "pathLengthNorm", "directDistNorm", "straightness",
+    "meanSpeed", "peakSpeed", "speedVar", "meanAccel", "peakAccel", "jerkRMS",
+    "submovementCount", "overshootCount",
+    "D", "W", "ID", "throughput",
+]
+
+# --------------------------
+# Ragged-segment helpers
+# --------------------------
+
+def _ragged(lo, hi):
+    # Flattens index ranges [lo, hi): (owner segment, position in segment, absolute index)
+    lens = hi - lo
+    owner = np.repeat(np.arange(len(lo)), lens)
+    starts = np.cumsum(lens) - lens
+    pos = np.arange(int(lens.sum())) - np.repeat(starts, lens)
+    return owner, pos, lo[owner] + pos
+
+def _rank(owner):
+    # Position of each element within its (contiguous) owner group
+    return np.arange(len(owner)) - np.searchsorted(owner, owner, side="left")
+
+def _seg_sum(v, owner, n):
+    # bincount accumulates in index order, like the JS reduce()
+    return np.bincount(owner, weights=v, minlength=n)
+
+def _seg_count(owner, n):
+    return np.bincount(owner, minlength=n)
+
+def _seg_max(v, owner, n):
+    out = np.full(n, -np.inf)
+    np.maximum.at(out, owner, v)
+    return out
+
+def _seg_min(v, owner, n):
+    out = np.full(n, np.inf)
+    np.minimum.at(out, owner, v)
+    return out
+
+def _safe_div(a, b):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b > 0, a / np.where(b > 0, b, 1), np.nan)
+
+def _reversals(d, owner, pos, min_pos):
+    # Approaching then receding: d[i-1]-d[i-2] < -eps and d[i]-d[i-1] > eps
+    ok = pos >= min_pos
+    i = np.nonzero(ok)[0]
+    dd_prev = d[i-1] - d[i-2]
+    dd = d[i] - d[i-1]
+    out = np.zeros(len(d), dtype=bool)
+    out[i] = (dd_prev < -REVERSAL_EPS) & (dd > REVERSAL_EPS)
+    return out
+
+# --------------------------
+# Segmentation
+# --------------------------
+
+def _group_codes(samples, attempts):
+    # One integer per (session, round); attempts and samples share the coding
+    if "sessionId" in samples and "sessionId" in attempts:
+        ids = pd.concat([samples["sessionId"], attempts["sessionId"]], ignore_index=True).astype(str)
+        codes, _ = pd.factorize(ids)
+        s_code, a_code = codes[:len(samples)], codes[len(samples):]
+    else:
+        s_code, a_code = np.zeros(len(samples), dtype=np.int64), np.zeros(len(attempts), dtype=np.int64)
+    return (s_code.astype(np.int64) * 4 + samples["round"].to_numpy(np.int64),
+            a_code.astype(np.int64) * 4 + attempts["round"].to_numpy(np.int64))
+
+def segment(samples, attempts):
+    # Sorts samples by (session, round, tms) and returns them plus, per attempt,
+    # the sample range [lo, hi) with spawnTms <= tms <= click_tms (searchsorted
+    # on an exact integer key: group * K + rank of the time value).
+    g_s, g_a = _group_codes(samples, attempts)
+    tms = samples["tms"].to_numpy(np.float64)
+    spawn = attempts["spawnTms"].to_numpy(np.float64)
+    click = attempts["click_tms"].to_numpy(np.float64)
+
+    uniq, inv = np.unique(np.concatenate([tms, spawn, np.nan_to_num(click, nan=-np.inf)]), return_inverse=True)
+    K = len(uniq) + 1
+    r_s, r_spawn, r_click = np.split(inv.astype(np.int64), [len(tms), len(tms) + len(spawn)])
+
+    key = g_s * K + r_s
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    lo = np.searchsorted(key, g_a * K + r_spawn, side="left")
+    hi = np.searchsorted(key, g_a * K + r_click, side="right")
+    hi = np.maximum(hi, lo)
+
+    sorted_samples = {
+        "tms": tms[order],
+        "x": samples["x"].to_numpy(np.float64)[order],
+        "y": samples["y"].to_numpy(np.float64)[order],
+    }
+    return sorted_samples, lo, hi
+
+# --------------------------
+# Attempt-level features
+# --------------------------
+
+def previous_click_tms(attempts):
+    # JS: attemptsArray[idx - 1].click.tms, within the same session and round
+    keys = [c for c in ("sessionId", "round") if c in attempts]
+    return attempts.groupby(keys, sort=False)["click_tms"].shift(1).to_numpy(np.float64)
+
+def extract_attempt_features(samples: pd.DataFrame, attempts: pd.DataFrame, prev_click_tms=None):
+    n = len(attempts)
+    out = {c: np.full(n, np.nan) for c in ATTEMPT_FEATURES}
+
+    spawn = attempts["spawnTms"].to_numpy(np.float64)
+    click = attempts["click_tms"].to_numpy(np.float64)
+    clicked = attempts["click_clicked"].fillna(False).to_numpy(bool)
+    prev = previous_click_tms(attempts) if prev_click_tms is None else np.asarray(prev_click_tms, dtype=np.float64)
+    despawn = attempts["despawnTms"].to_numpy(np.float64) if "despawnTms" in attempts else np.full(n, np.nan)
+
+    # Timing for every attempt (clicked -> click-based; missed -> despawn-based interTap)
+    out["reactionTimeMs"] = np.where(clicked, click - spawn, np.nan)
+    out["interTapMs"] = np.where(clicked, click - prev, despawn - prev)
+
+    if len(samples) == 0 or n == 0:
+        return pd.DataFrame(out, index=attempts.index)
+
+    s, lo, hi = segment(samples, attempts)
+    va = np.nonzero(clicked & (hi - lo >= MIN_SAMPLES))[0]
+    nv = len(va)
+    if nv == 0:
+        return pd.DataFrame(out, index=attempts.index)
+
+    X, Y, T = s["x"], s["y"], s["tms"]
+    tx = attempts["target_x"].to_numpy(np.float64)[va]
+    ty = attempts["target_y"].to_numpy(np.float64)[va]
+    radius = attempts["target_radius"].to_numpy(np.float64)[va]
+
+    # 2) Movement start: first sample farther than EPS from the first one
+    owner, pos, idx = _ragged(lo[va], hi[va])
+    x0, y0 = X[lo[va]][owner], Y[lo[va]][owner]
+    moved = (pos >= 1) & (np.hypot(X[idx] - x0, Y[idx] - y0) > EPS_MOVE)
+    first = _seg_min(np.where(moved, pos, np.inf), owner, nv)
+    start_idx = np.where(np.isfinite(first), first - 1, 0).astype(np.int64)
+
+    mlo, mhi = lo[va] + start_idx, hi[va]
+    m = mhi - mlo
+    owner, pos, idx = _ragged(mlo, mhi)
+    x, y, t = X[idx], Y[idx], T[idx] / 1000  # seconds, as in JS
+
+    out["movementTimeMs"][va] = T[mhi - 1] - T[mlo]
+
+    # 3) Spatial
+    step = np.zeros(len(idx))
+    k = pos >= 1
+    step[k] = np.hypot(x[k] - X[idx[k] - 1], y[k] - Y[idx[k] - 1])
+    path = _seg_sum(step, owner, nv)
+    direct = np.hypot(X[mlo] - tx, Y[mlo] - ty)
+    error = np.hypot(X[mhi - 1] - tx, Y[mhi - 1] - ty)
+    out["pathLengthNorm"][va] = path
+    out["directDistNorm"][va] = direct
+    out["straightness"][va] = _safe_div(direct, path)
+    out["errorDistNorm"][va] = _safe_div(error, radius)
+
+    # 4.1) Velocity over consecutive samples with dt > 0 (compacted, like the JS push())
+    dt = np.full(len(idx), np.nan)
+    dt[k] = t[k] - T[idx[k] - 1] / 1000
+    keep = k & (dt > 0)
+    v_owner = owner[keep]
+    vx = (x[keep] - X[idx[keep] - 1]) / dt[keep]
+    vy = (y[keep] - Y[idx[keep] - 1]) / dt[keep]
+    speed = np.hypot(vx, vy)
+    n_speed = _seg_count(v_owner, nv)
+    mean_speed = _safe_div(_seg_sum(speed, v_owner, nv), n_speed)
+    peak_speed = np.where(n_speed > 0, _seg_max(speed, v_owner, nv), np.nan)
+    speed_var = _safe_div(_seg_sum((speed - mean_speed[v_owner]) ** 2, v_owner, nv), n_speed)
+    out["meanSpeed"][va], out["peakSpeed"][va], out["speedVar"][va] = mean_speed, peak_speed, speed_var
+
+    # 4.2) Acceleration: compacted velocity index i uses dt = t[i+1] - t[i] of moveSeg
+    v_rank = _rank(v_owner)
+    c = np.nonzero(v_rank >= 1)[0]
+    dt_a = T[mlo[v_owner[c]] + v_rank[c] + 1] / 1000 - T[mlo[v_owner[c]] + v_rank[c]] / 1000
+    ok = dt_a > 0
+    c, dt_a = c[ok], dt_a[ok]
+    a_owner = v_owner[c]
+    ax = (vx[c] - vx[c - 1]) / dt_a
+    ay = (vy[c] - vy[c - 1]) / dt_a
+    acc = np.hypot(ax, ay)
+    n_acc = _seg_count(a_owner, nv)
+    out["meanAccel"][va] = _safe_div(_seg_sum(acc, a_owner, nv), n_acc)
+    out["peakAccel"][va] = np.where(n_acc > 0, _seg_max(acc, a_owner, nv), np.nan)
+
+    # 4.3) Jerk: compacted accel index i uses dt = t[i+2] - t[i+1]
+    a_rank = _rank(a_owner)
+    c = np.nonzero(a_rank >= 1)[0]
+    base = mlo[a_owner[c]] + a_rank[c]
+    dt_j = T[base + 2] / 1000 - T[base + 1] / 1000
+    ok = dt_j > 0
+    c, dt_j = c[ok], dt_j[ok]
+    j_owner = a_owner[c]
+    jerk = np.hypot((ax[c] - ax[c - 1]) / dt_j, (ay[c] - ay[c - 1]) / dt_j)
+    out["jerkRMS"][va] = np.sqrt(_safe_div(_seg_sum(jerk * jerk, j_owner, nv), _seg_count(j_owner, nv)))
+
+    # 5) Submovements: local maxima of the 5-sample moving average of speed
+    L = n_speed[v_owner]
+    smooth = speed.copy()
+    wide = L >= SMOOTH_W
+    acc_sum, acc_n = np.zeros(len(speed)), np.zeros(len(speed))
+    for off in range(-(SMOOTH_W // 2), SMOOTH_W // 2 + 1):  # same summation order as JS
+        nb = v_rank + off
+        inside = wide & (nb >= 0) & (nb < L)
+        src = np.nonzero(inside)[0]
+        acc_sum[src] += speed[src + off]
+        acc_n[src] += 1
+    smooth[wide] = acc_sum[wide] / acc_n[wide]
+    inner = np.nonzero((v_rank >= 1) & (v_rank <= L - 2))[0]
+    v_thresh = SUBMOVEMENT_FRAC * peak_speed[v_owner[inner]]
+    peak = (smooth[inner - 1] < smooth[inner]) & (smooth[inner] > smooth[inner + 1]) & (smooth[inner] >= v_thresh)
+    out["submovementCount"][va] = _seg_count(v_owner[inner][peak], nv)
+
+    # 6) Overshoots: max of distance reversals near target, reversals in the
+    #    final 30% of the movement, and x/y oscillations near target
+    d = np.hypot(x - tx[owner], y - ty[owner])
+    gate = GATE_RADII * radius[owner]
+    rev = _reversals(d, owner, pos, 2)
+    m1 = _seg_count(owner[rev & (d < gate)], nv)
+
+    final_start = np.floor(m * FINAL_PHASE).astype(np.int64)
+    in_final = (m[owner] > 5) & (pos >= final_start[owner] + 2)
+    m2 = _seg_count(owner[rev & in_final], nv)
+
+    i = np.nonzero((m[owner] > 4) & (pos >= 3))[0]
+    dx_prev, dx_ = x[i-1] - x[i-2], x[i] - x[i-1]
+    dy_prev, dy_ = y[i-1] - y[i-2], y[i] - y[i-1]
+    x_rev = ((dx_prev > OSCILLATION_EPS) & (dx_ < -OSCILLATION_EPS)) | ((dx_prev < -OSCILLATION_EPS) & (dx_ > OSCILLATION_EPS))
+    y_rev = ((dy_prev > OSCILLATION_EPS) & (dy_ < -OSCILLATION_EPS)) | ((dy_prev < -OSCILLATION_EPS) & (dy_ > OSCILLATION_EPS))
+    osc = i[(d[i] < gate[i]) & (x_rev | y_rev)]
+    m3 = _seg_count(owner[osc], nv)
+    out["overshootCount"][va] = np.maximum(np.maximum(m1, m2), m3)
+
+    # 7) Fitts' law
+    W = 2 * radius
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ID = np.where(W > 0, np.log2(direct / np.where(W > 0, W, 1) + 1), np.nan)
+    mt_sec = np.maximum(out["movementTimeMs"][va] / 1000, MIN_MT_SEC)
+    out["D"][va], out["W"][va], out["ID"][va] = direct, W, ID
+    out["throughput"][va] = ID / mt_sec
+
+    return pd.DataFrame(out, index=attempts.index)
+
+# --------------------------
+# Round / session aggregation (MotorSummary.computeRoundFeatures conventions:
+# population std, null below 2 values; spatial/kinematic/Fitts over hits only)
+# --------------------------
+
+# metric -> (attempt feature, statistic, hits only)
+ROUND_AGGREGATES = {
+    "reactionTime_mean": ("reactionTimeMs", "mean", False),
+    "reactionTime_std": ("reactionTimeMs", "std", False),
+    "reactionTime_median": ("reactionTimeMs", "median", False),
+    "movementTime_mean": ("movementTimeMs", "mean", True),
+    "movementTime_std": ("movementTimeMs", "std", True),
+    "movementTime_median": ("movementTimeMs", "median", True),
+    "interTap_mean": ("interTapMs", "mean", False),
+    "interTap_std": ("interTapMs", "std", False),
+    "errorDist_mean": ("errorDistNorm", "mean", True),
+    "errorDist_std": ("errorDistNorm", "std", True),
+    "pathLength_mean": ("pathLengthNorm", "mean", True),
+    "pathLength_std": ("pathLengthNorm", "std", True),
+    "straightness_mean": ("straightness", "mean", True),
+    "straightness_std": ("straightness", "std", True),
+    "meanSpeed_mean": ("meanSpeed", "mean", True),
+    "peakSpeed_mean": ("peakSpeed", "mean", True),
+    "speedVar_mean": ("speedVar", "mean", True),
+    "meanAccel_mean": ("meanAccel", "mean", True),
+    "peakAccel_mean": ("peakAccel", "mean", True),
+    "jerkRMS_mean": ("jerkRMS", "mean", True),
+    "jerkRMS_std": ("jerkRMS", "std", True),
+    "submovementCount_mean": ("submovementCount", "mean", True),
+    "submovementCount_std": ("submovementCount", "std", True),
+    "overshootCount_mean": ("overshootCount", "mean", True),
+    "overshootCount_std": ("overshootCount", "std", True),
+    "ID_mean": ("ID", "mean", True),
+    "throughput_mean": ("throughput", "mean", True),
+    "throughput_std": ("throughput", "std", True),
+}
+
+def round_features(attempts: pd.DataFrame, feats: pd.DataFrame, by="sessionId"):
+    # One row per (by, round) with every ROUND_METRICS column
+    hit = attempts["click_hit"].fillna(False).to_numpy(bool)
+    keys = [attempts[by].astype(str).to_numpy(), attempts["round"].to_numpy(np.int64)]
+    base = pd.DataFrame({by: keys[0], "round": keys[1], "hit": hit})
+    for metric, (src, _, hits_only) in ROUND_AGGREGATES.items():
+        v = feats[src].to_numpy(np.float64)
+        base[metric] = np.where(hit, v, np.nan) if hits_only else v
+
+    g = base.groupby([by, "round"], sort=False)
+    out = pd.DataFrame({
+        "nTargets": g.size(),
+        "nHits": g["hit"].sum().astype(np.int64),
+    })
+    out["nMisses"] = out["nTargets"] - out["nHits"]
+    out["hitRate"] = out["nHits"] / out["nTargets"]
+
+    metrics = list(ROUND_AGGREGATES)
+    counts = g[metrics].count()
+    means, medians = g[metrics].mean(), g[metrics].median()
+    stds = g[metrics].std(ddof=0).where(counts >= 2)
+    for metric, (_, stat, _) in ROUND_AGGREGATES.items():
+        out[metric] = {"mean": means, "std": stds, "median": medians}[stat][metric]
+    out["interTap_cv"] = _safe_div(out["interTap_std"].to_numpy(), out["interTap_mean"].to_numpy())
+    return out[ROUND_METRICS].reset_index()
+
+def session_features(samples: pd.DataFrame, attempts: pd.DataFrame, by="sessionId"):
+    # Wide session table: by + r{1,2,3}_<ROUND_METRICS> + DELTA_COLS
+    feats = extract_attempt_features(samples, attempts)
+    rounds = round_features(attempts, feats, by=by)
+    wide = rounds.pivot(index=by, columns="round", values=ROUND_METRICS)
+    cols = {}
+    for r in [1,2,3]:
+        for m in ROUND_METRICS:
+            cols[f"r{r}_{m}"] = wide[(m, r)] if (m, r) in wide.columns else np.nan
+    out = pd.DataFrame(cols, index=wide.index)
+    for c in DELTA_COLS:
+        _, ra, _, rb, metric = c.split("_", 4)
+        out[c] = out[f"{ra}_{metric}"] - out[f"{rb}_{metric}"]
+    return out.reset_index()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--samples", required=True, help="Pointer samples table (.csv/.parquet): sessionId, round, tms, x, y")
+    ap.add_argument("--attempts", required=True, help="Attempts table (.csv/.parquet), flattened with '_' (click_tms, target_x, ...)")
+    ap.add_argument("--out", required=True, help="Write session-level ROUND_METRICS + deltas here")
+    args = ap.parse_args()
+
+    samples, attempts = read_dataset(args.samples), read_dataset(args.attempts)
+    df = session_features(samples, attempts)
+    write_dataset(df, args.out)
+    print("Wrote session features:", os.path.abspath(args.out))
+    print("Shape:", df.shape)
+
+if __name__ == "__main__":
+    sys.exit(main())
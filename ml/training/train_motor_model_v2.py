@@ -1,15 +1,15 @@
 import argparse
 import os
 import json
-import copy
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 
-from sklearn.model_selection import GroupKFold
-from sklearn.preprocessing import RobustScaler, OneHotEncoder
+from sklearn.base import clone
+from sklearn.model_selection import GroupKFold, GroupShuffleSplit
+from sklearn.preprocessing import RobustScaler
 from sklearn.decomposition import PCA
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
 from sklearn.metrics import (
     classification_report,
     confusion_matrix,
@@ -20,6 +20,13 @@ from sklearn.metrics import (
 from xgboost import XGBClassifier
 import joblib
 
+from dataset_io import categorical, read_dataset, widen
+from fold_cache import FoldMatrices, fit_pipeline, predict_labels, quantile_dmatrix, train_booster
+from motor_bundle import BUNDLE_FILENAME, calibrate_fast_path, export_bundle
+from motor_student import STUDENT_FILENAME, distill_student, export_student, student_summary
+from incremental_state import build_state, save_state
+from perf_stages import StageRecorder, stage
+
 ID_COLS = ["sessionId", "participantId"]
 
 # Exclude "condition" columns from being treated as motor ability features
@@ -58,6 +65,13 @@ def make_percentile_labels(scores: np.ndarray, cuts=(10, 30, 60)):
     thresholds = {"p10": float(p10), "p30": float(p30), "p60": float(p60)}
     return y, thresholds
 
+def labels_from_thresholds(scores: np.ndarray, thresholds):
+    # Same bands as make_percentile_labels, with thresholds given
+    return np.select(
+        [scores <= thresholds["p10"], scores <= thresholds["p30"], scores <= thresholds["p60"]],
+        [3, 2, 1], default=0,
+    )
+
 def ensure_pc1_direction(pc1: np.ndarray, df_motor: pd.DataFrame):
     bad_candidates = [c for c in df_motor.columns if "reactionTime_mean" in c]
     if not bad_candidates:
@@ -68,34 +82,155 @@ def ensure_pc1_direction(pc1: np.ndarray, df_motor: pd.DataFrame):
         return -pc1, True
     return pc1, False
 
-def build_xgb():
+DEFAULT_XGB_PARAMS = {"n_estimators": 400, "max_depth": 4, "learning_rate": 0.05}
+
+def build_xgb(n_jobs=-1, **params):
+    params = {**DEFAULT_XGB_PARAMS, **params}
     return XGBClassifier(
-        n_estimators=400,
-        max_depth=4,
-        learning_rate=0.05,
+        n_estimators=params["n_estimators"],
+        max_depth=params["max_depth"],
+        learning_rate=params["learning_rate"],
         subsample=0.9,
         colsample_bytree=0.9,
         reg_lambda=1.0,
         objective="multi:softprob",
         num_class=4,
         random_state=42,
-        n_jobs=-1,
+        n_jobs=n_jobs,
         eval_metric="mlogloss",
     )
 
-def evaluate_cv(model_pipeline, X, y, groups, folds=5):
-    gkf = GroupKFold(n_splits=folds)
-    all_true, all_pred = [], []
-    fold_stats = []
+# --------------------------
+# Hyperparameter search (Model A, participant-grouped CV)
+# --------------------------
 
-    for fold, (tr, te) in enumerate(gkf.split(X, y, groups=groups), start=1):
-        Xtr, Xte = X.iloc[tr], X.iloc[te]
-        ytr, yte = y[tr], y[te]
+XGB_SEARCH_SPACE = {
+    "n_estimators": [100, 200, 400, 800],   # upper bound; early stopping picks the actual count
+    "max_depth": [2, 3, 4, 5, 6],
+    "learning_rate": (0.02, 0.3),           # log-uniform
+}
+
+def sample_xgb_configs(n_trials, seed):
+    rng = np.random.default_rng(seed)
+    lo, hi = XGB_SEARCH_SPACE["learning_rate"]
+    configs = [dict(DEFAULT_XGB_PARAMS)]  # always include the current defaults
+    while len(configs) < n_trials:
+        configs.append({
+            "n_estimators": int(rng.choice(XGB_SEARCH_SPACE["n_estimators"])),
+            "max_depth": int(rng.choice(XGB_SEARCH_SPACE["max_depth"])),
+            "learning_rate": float(np.exp(rng.uniform(np.log(lo), np.log(hi)))),
+        })
+    return configs
+
+def search_fold_data(model, X, y, groups, tr, te, seed):
+    # Early stopping watches a participant-disjoint slice of the training fold,
+    # never the test fold. Built once per fold and shared by every trial.
+    inner = GroupShuffleSplit(n_splits=1, test_size=0.2, random_state=seed)
+    fit_i, val_i = next(inner.split(tr, groups=groups[tr]))
+    fit_i, val_i = tr[fit_i], tr[val_i]
+
+    scaler = RobustScaler().fit(X[fit_i])
+    dfit = quantile_dmatrix(model, scaler.transform(X[fit_i]), y[fit_i])
+    dval = quantile_dmatrix(model, scaler.transform(X[val_i]), y[val_i], ref=dfit)
+    return dfit, dval, scaler.transform(X[te]), y[te]
+
+def search_fold(params, data, early_stopping):
+    dfit, dval, X_te, y_te = data
+    model = build_xgb(**params)
+
+    t0 = time.perf_counter()
+    booster = train_booster(model, dfit, dval=dval, early_stopping_rounds=early_stopping)
+    fit_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    yhat = predict_labels(booster, X_te, iteration_range=(0, booster.best_iteration + 1))
+    predict_s = time.perf_counter() - t0
+
+    return {
+        "macro_f1": float(f1_score(y_te, yhat, average="macro")),
+        "best_iteration": int(booster.best_iteration),
+        "fit_seconds": fit_s,
+        "predict_us_per_row": 1e6 * predict_s / max(len(y_te), 1),
+    }
 
-        model_fold = copy.deepcopy(model_pipeline)
-        model_fold.fit(Xtr, ytr)
-        yhat = model_fold.predict(Xte)
+def search_xgb(X, y, groups, folds=5, method="random", n_trials=20, early_stopping=30,
+               tolerance=0.0, eta=3, seed=42):
+    # method: "random" runs every config on every fold; "halving" runs all configs
+    # on 1 fold, keeps the top 1/eta, doubles the folds, and repeats.
+    t_start = time.perf_counter()
+    splits = list(GroupKFold(n_splits=folds).split(X, y, groups=groups))
+    trials = [{"params": p, "folds": []} for p in sample_xgb_configs(n_trials, seed)]
+
+    template = build_xgb()
+    fold_data = {}
+
+    def run(trial, k):
+        while len(trial["folds"]) < k:
+            i = len(trial["folds"])
+            if i not in fold_data:
+                fold_data[i] = search_fold_data(template, X, y, groups, *splits[i], seed)
+            trial["folds"].append(search_fold(trial["params"], fold_data[i], early_stopping))
+
+    def mean_f1(trial):
+        return float(np.mean([f["macro_f1"] for f in trial["folds"]]))
+
+    if method == "halving":
+        alive, k = trials, 1
+        while True:
+            for t in alive:
+                run(t, k)
+            if k == folds:
+                break
+            alive = sorted(alive, key=mean_f1, reverse=True)[:max(1, len(alive) // eta)]
+            k = folds if len(alive) == 1 else min(folds, k * 2)
+    else:
+        for t in trials:
+            run(t, folds)
+
+    for t in trials:
+        t["n_folds"] = len(t["folds"])
+        t["mean_macro_f1"] = mean_f1(t)
+        t["effective_n_estimators"] = int(np.median([f["best_iteration"] for f in t["folds"]])) + 1
+        t["fit_seconds"] = float(sum(f["fit_seconds"] for f in t["folds"]))
+        t["predict_us_per_row"] = float(np.mean([f["predict_us_per_row"] for f in t["folds"]]))
+
+    # Among configs that saw every fold, take the cheapest one within
+    # `tolerance` macro-F1 of the best (trees x depth as the size proxy).
+    complete = [t for t in trials if t["n_folds"] == max(t["n_folds"] for t in trials)]
+    best_f1 = max(t["mean_macro_f1"] for t in complete)
+    eligible = [t for t in complete if t["mean_macro_f1"] >= best_f1 - tolerance]
+    chosen = min(eligible, key=lambda t: (t["effective_n_estimators"] * t["params"]["max_depth"], -t["mean_macro_f1"]))
+
+    chosen_params = {**chosen["params"], "n_estimators": chosen["effective_n_estimators"]}
+    return chosen_params, {
+        "method": method,
+        "n_trials": len(trials),
+        "early_stopping_rounds": early_stopping,
+        "tolerance": tolerance,
+        "best_mean_macro_f1": best_f1,
+        "chosen_params": chosen_params,
+        "search_seconds": time.perf_counter() - t_start,
+        "trials": trials,
+    }
 
+def run_cv_fold(cache, model, y, tr, te, fold, recorder=None):
+    # Both models on one fold: preprocessing and DMatrix built once, shared
+    with stage(recorder, f"cv_fold{fold}_prep", rows=len(tr)):
+        mats = cache.fold(model, y, tr, te)
+    preds = {}
+    for name, (dtrain, X_te) in mats.items():
+        with stage(recorder, f"cv_{name}_fold{fold}_fit"):
+            booster = train_booster(model, dtrain)
+        with stage(recorder, f"cv_{name}_fold{fold}_predict", rows=len(te)):
+            preds[name] = predict_labels(booster, X_te)
+    return preds
+
+def summarize_cv(fold_preds):
+    # fold_preds: [(fold, yte, yhat), ...] in fold order
+    all_true, all_pred = [], []
+    fold_stats = []
+
+    for fold, yte, yhat in fold_preds:
         fold_stats.append({
             "fold": fold,
             "macro_f1": float(f1_score(yte, yhat, average="macro")),
@@ -116,22 +251,121 @@ def evaluate_cv(model_pipeline, X, y, groups, folds=5):
     }
     return fold_stats, overall
 
+def summarize_models(preds, splits, y):
+    # preds: {(name, fold): yhat} -> {name: (fold_stats, overall)}
+    names = sorted({name for name, _ in preds})
+    return {
+        name: summarize_cv([(fold, y[te], preds[(name, fold)]) for fold, (tr, te) in enumerate(splits, start=1)])
+        for name in names
+    }
+
+def oof_predictions(preds, splits, n):
+    # {(name, fold): yhat} -> {name: out-of-fold labels for all n rows}
+    out = {}
+    for (name, fold), yhat in preds.items():
+        out.setdefault(name, np.zeros(n, dtype=np.int64))[splits[fold - 1][1]] = yhat
+    return out
+
+def evaluate_cv(cache, model, y, groups, folds=5, recorder=None):
+    splits = list(GroupKFold(n_splits=folds).split(cache.df, y, groups=groups))
+    preds = {}
+    for fold, (tr, te) in enumerate(splits, start=1):
+        for name, yhat in run_cv_fold(cache, model, y, tr, te, fold, recorder).items():
+            preds[(name, fold)] = yhat
+    return summarize_models(preds, splits, y), oof_predictions(preds, splits, len(y))
+
+# Worker-side state for parallel CV: sent once per process instead of per fold
+_CV_STATE = {}
+
+def _init_cv_worker(cache, model, y):
+    _CV_STATE["cache"] = cache
+    _CV_STATE["model"] = model
+    _CV_STATE["y"] = y
+
+def _run_cv_fold(job):
+    fold, tr, te, n_jobs = job
+    model = clone(_CV_STATE["model"]).set_params(n_jobs=n_jobs)
+    # Fold timings are measured in the worker and merged into the parent recorder
+    rec = StageRecorder()
+    try:
+        preds = run_cv_fold(_CV_STATE["cache"], model, _CV_STATE["y"], tr, te, fold, rec)
+    finally:
+        rec.close()
+    return fold, preds, rec.stages, rec.t0
+
+def evaluate_cv_parallel(cache, model, y, groups, folds=5, workers=2, recorder=None):
+    # One job per fold (Model A and B together, sharing the fold's matrices);
+    # XGBoost threads are split across workers so cores are not oversubscribed.
+    # Results match evaluate_cv().
+    splits = list(GroupKFold(n_splits=folds).split(cache.df, y, groups=groups))
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+
+    jobs = [(fold, tr, te, n_jobs) for fold, (tr, te) in enumerate(splits, start=1)]
+    preds = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_cv_worker, initargs=(cache, model, y)) as ex:
+        for fold, fold_preds, stages, t0 in ex.map(_run_cv_fold, jobs):
+            for name, yhat in fold_preds.items():
+                preds[(name, fold)] = yhat
+            if recorder is not None:
+                recorder.absorb(stages, t0)
+
+    return summarize_models(preds, splits, y), oof_predictions(preds, splits, len(y))
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--csv", required=True)
+    ap.add_argument("--csv", required=True, help="Session dataset (.csv or .parquet)")
     ap.add_argument("--outdir", default="outputs")
     ap.add_argument("--folds", type=int, default=5)
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--cv_workers", type=int, default=1,
+                    help="Processes running CV folds of Model A and B concurrently (1 = serial)")
+    ap.add_argument("--search", choices=["none", "random", "halving"], default="none",
+                    help="Hyperparameter search over n_estimators/max_depth/learning_rate before training")
+    ap.add_argument("--search_trials", type=int, default=20)
+    ap.add_argument("--early_stopping", type=int, default=30, help="Early-stopping rounds per search fold")
+    ap.add_argument("--search_tolerance", type=float, default=0.0,
+                    help="Pick the smallest config within this macro-F1 of the best")
+    ap.add_argument("--fast_path_max_disagreement", type=float, default=0.01,
+                    help="Fast-path calibration: allowed disagreement with Model A outside the boundary margin")
+    ap.add_argument("--student", choices=["linear", "none"], default="linear",
+                    help=f"Distill Model A into a client-side student (models/{STUDENT_FILENAME})")
+    ap.add_argument("--student_C", type=float, default=1.0, help="Student: inverse L2 strength")
+    ap.add_argument("--student_max_rows", type=int, default=50000, help="Student: sessions sampled for distillation")
+    ap.add_argument("--out_of_core", action="store_true",
+                    help="Chunked multi-pass training for datasets larger than memory (see train_out_of_core.py)")
+    ap.add_argument("--chunksize", type=int, default=100000, help="Out-of-core: rows per chunk")
+    ap.add_argument("--cache_dir", default=None, help="Out-of-core: folder for XGBoost external-memory pages (default: temp)")
+    ap.add_argument("--trace", default=None, help="Also write per-stage timings as Chrome-trace JSON (chrome://tracing, Perfetto)")
+    ap.add_argument("--profile", default=None, help="cProfile the run and dump stats to this .prof file")
+    ap.add_argument("--profile_stages", default=None,
+                    help="With --profile: only profile stages matching this pattern (e.g. 'cv_A_fold*_fit')")
     args = ap.parse_args()
 
     np.random.seed(args.seed)
 
+    recorder = StageRecorder(profile_path=args.profile, profile_stages=args.profile_stages)
+    try:
+        if args.out_of_core:
+            if args.search != "none" or args.cv_workers > 1:
+                raise SystemExit("--out_of_core does not support --search or --cv_workers")
+            from train_out_of_core import train_out_of_core
+            train_out_of_core(args, recorder)
+        else:
+            train(args, recorder)
+    finally:
+        recorder.close()
+    if args.trace:
+        recorder.write_chrome_trace(args.trace)
+        print("Saved trace to:", args.trace)
+
+def train(args, recorder=None):
     os.makedirs(args.outdir, exist_ok=True)
     os.makedirs(os.path.join(args.outdir, "models"), exist_ok=True)
     os.makedirs(os.path.join(args.outdir, "preprocess"), exist_ok=True)
     os.makedirs(os.path.join(args.outdir, "reports"), exist_ok=True)
 
-    df = pd.read_csv(args.csv)
+    with stage(recorder, "load"):
+        df = read_dataset(args.csv)
     for col in ID_COLS:
         if col not in df.columns:
             raise ValueError(f"Missing required column: {col}")
@@ -141,71 +375,99 @@ def main():
         raise ValueError("Not enough motor features found. Ensure r1_/r2_/r3_/delta_ columns exist.")
 
     # Basic missing handling
-    motor_df = df[motor_cols].copy()
-    keep = (motor_df.isna().mean(axis=1) <= 0.25)
-    df = df.loc[keep].reset_index(drop=True)
+    with stage(recorder, "missing_values"):
+        motor_df = df[motor_cols].copy()
+        keep = (motor_df.isna().mean(axis=1) <= 0.25)
+        df = df.loc[keep].reset_index(drop=True)
 
-    for c in motor_cols:
-        if df[c].isna().any():
-            df[c] = df[c].fillna(df[c].median())
+        for c in motor_cols:
+            if df[c].isna().any():
+                df[c] = df[c].fillna(df[c].median())
 
-    for c in ctx_num_cols:
-        if df[c].isna().any():
-            df[c] = df[c].fillna(df[c].median())
+        for c in ctx_num_cols:
+            if df[c].isna().any():
+                df[c] = df[c].fillna(df[c].median())
 
-    for c in ctx_cat_cols:
-        df[c] = df[c].astype(str).fillna("unknown").replace({"nan":"unknown","None":"unknown"})
+        for c in ctx_cat_cols:
+            df[c] = categorical(df[c])
 
     groups = df["participantId"].astype(str).values
 
     # PCA on motor-only
-    pca_scaler = RobustScaler()
-    X_motor_scaled = pca_scaler.fit_transform(df[motor_cols].values)
+    with stage(recorder, "pca"):
+        pca_scaler = RobustScaler()
+        X_motor_scaled = pca_scaler.fit_transform(widen(df, motor_cols).values)
 
-    pca = PCA(n_components=1, random_state=args.seed)
-    pc1 = pca.fit_transform(X_motor_scaled).reshape(-1)
-    pc1_aligned, flipped = ensure_pc1_direction(pc1, df[motor_cols])
+        pca = PCA(n_components=1, random_state=args.seed)
+        pc1 = pca.fit_transform(X_motor_scaled).reshape(-1)
+        pc1_aligned, flipped = ensure_pc1_direction(pc1, df[motor_cols])
 
     # Labeling via percentiles on PC1
-    y, thresholds = make_percentile_labels(pc1_aligned, cuts=(10, 30, 60))
-
-    # Model A (motor-only)
-    modelA = Pipeline(steps=[
-        ("scaler", RobustScaler()),
-        ("xgb", build_xgb()),
-    ])
-
-    # Model B (motor + context) optional comparison
-    numeric_B = motor_cols + ctx_num_cols
-    categorical_B = ctx_cat_cols
-
-    preprocessor_B = ColumnTransformer(
-        transformers=[
-            ("num", RobustScaler(), numeric_B),
-            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical_B),
-        ],
-        remainder="drop",
-    )
-
-    modelB = Pipeline(steps=[
-        ("prep", preprocessor_B),
-        ("xgb", build_xgb()),
-    ])
-
-    foldA, overallA = evaluate_cv(modelA, df[motor_cols], y, groups, folds=args.folds)
-
-    X_B = df[motor_cols + ctx_num_cols + ctx_cat_cols]
-    foldB, overallB = evaluate_cv(modelB, X_B, y, groups, folds=args.folds)
+    with stage(recorder, "labeling"):
+        y, thresholds = make_percentile_labels(pc1_aligned, cuts=(10, 30, 60))
+
+    # Optional hyperparameter search on Model A; the chosen params are used for both models
+    xgb_params, search_report = dict(DEFAULT_XGB_PARAMS), None
+    if args.search != "none":
+        with stage(recorder, "search"):
+            xgb_params, search_report = search_xgb(
+                widen(df, motor_cols).values, y, groups, folds=args.folds, method=args.search,
+                n_trials=args.search_trials, early_stopping=args.early_stopping,
+                tolerance=args.search_tolerance, seed=args.seed,
+            )
+
+    # Model A (motor-only) and Model B (motor + context) share each fold's
+    # preprocessing and DMatrix construction (see fold_cache.py)
+    xgb_model = build_xgb(**xgb_params)
+    cache = FoldMatrices(df, motor_cols, ctx_num_cols, ctx_cat_cols)
+
+    with stage(recorder, "cv", workers=args.cv_workers):
+        if args.cv_workers > 1:
+            cv, oof = evaluate_cv_parallel(cache, xgb_model, y, groups, folds=args.folds,
+                                      workers=args.cv_workers, recorder=recorder)
+        else:
+            cv, oof = evaluate_cv(cache, xgb_model, y, groups, folds=args.folds, recorder=recorder)
+    foldA, overallA = cv["A"]
+    foldB, overallB = cv["B"]
+
+    # Threshold-only fast path: margin around the cuts where Model A must decide
+    fast_path = calibrate_fast_path(pc1_aligned, thresholds, oof["A"], args.fast_path_max_disagreement)
 
     # Fit final models on full data
-    modelA.fit(df[motor_cols], y)
-    modelB.fit(X_B, y)
+    with stage(recorder, "final_prep"):
+        full = cache.full(xgb_model, y)
+    with stage(recorder, "final_fit_A"):
+        modelA = fit_pipeline(xgb_model, *full["A"])
+    with stage(recorder, "final_fit_B"):
+        modelB = fit_pipeline(xgb_model, *full["B"])
+    del full
+
+    # Distilled client-side student (see motor_student.py)
+    student = None
+    if args.student != "none":
+        with stage(recorder, "distill"):
+            student, student_report = distill_student(
+                widen(df, motor_cols).values, teacher_proba(modelA, motor_cols), y, groups,
+                pca_scaler, pca, flipped, C=args.student_C, max_rows=args.student_max_rows, seed=args.seed,
+            )
 
     # Save artifacts
-    joblib.dump(pca_scaler, os.path.join(args.outdir, "preprocess", "pca_scaler_motor.joblib"))
-    joblib.dump(pca, os.path.join(args.outdir, "preprocess", "pca_pc1_motor.joblib"))
-    joblib.dump(modelA, os.path.join(args.outdir, "models", "modelA_motor_only.joblib"))
-    joblib.dump(modelB, os.path.join(args.outdir, "models", "modelB_motor_plus_context.joblib"))
+    with stage(recorder, "dump"):
+        joblib.dump(pca_scaler, os.path.join(args.outdir, "preprocess", "pca_scaler_motor.joblib"))
+        joblib.dump(pca, os.path.join(args.outdir, "preprocess", "pca_pc1_motor.joblib"))
+        joblib.dump(modelA, os.path.join(args.outdir, "models", "modelA_motor_only.joblib"))
+        joblib.dump(modelB, os.path.join(args.outdir, "models", "modelB_motor_plus_context.joblib"))
+
+        # Fused single-file bundle for lightweight scoring (see motor_bundle.py)
+        export_bundle(os.path.join(args.outdir, "models", BUNDLE_FILENAME),
+                      motor_cols, pca_scaler, pca, flipped, thresholds, modelA, fast_path=fast_path)
+        if student is not None:
+            export_student(os.path.join(args.outdir, "models", STUDENT_FILENAME), student, motor_cols,
+                           flipped, thresholds, agreement=student_summary(student_report))
+
+        # Sketches + motor covariance state for retrain_incremental.py
+        save_state(args.outdir, build_state(X_motor_scaled, pc1_aligned, y, df, motor_cols, ctx_num_cols,
+                                               seed=args.seed))
 
     report = {
         "seed": args.seed,
@@ -227,6 +489,8 @@ def main():
                 "3": "High difficulty",
             },
         },
+        "xgb_params": xgb_params,
+        "fast_path": fast_path,
         "modelA_motor_only": {"cv_folds": foldA, "overall": overallA},
         "modelB_motor_plus_context": {
             "context_numeric_columns": ctx_num_cols,
@@ -236,6 +500,15 @@ def main():
         }
     }
 
+    if student is not None:
+        report["student"] = student_report
+    if search_report is not None:
+        report["hyperparameter_search"] = search_report
+
+    # Everything up to here; writing the report and session table is not included
+    if recorder is not None:
+        report["timings"] = recorder.report()
+
     with open(os.path.join(args.outdir, "reports", "training_report.json"), "w") as f:
         json.dump(report, f, indent=2)
 
@@ -247,6 +520,29 @@ def main():
     print("Saved outputs to:", args.outdir)
     print("\nModel A overall:\n", overallA["classification_report"])
     print("\nModel B overall:\n", overallB["classification_report"])
+    print_fast_path(fast_path)
+    if student is not None:
+        print_student(student_report)
+
+def teacher_proba(modelA, motor_cols):
+    # Model A probabilities for raw motor features, as the scorer calls it
+    return lambda X: modelA.predict_proba(pd.DataFrame(X, columns=motor_cols))
+
+def print_student(report):
+    s = student_summary(report)
+    print(f"Student ({report['kind']}): agrees with Model A on {s['label_agreement']:.1%} of {s['measured_on']}, "
+          f"mean |p - p_A| {s['mean_abs_proba_diff']:.3f}")
+
+def print_fast_path(fast_path):
+    if fast_path["margin"] is None:
+        print("\nFast path: no margin meets the disagreement target; scoring always uses Model A")
+        return
+    agreement = fast_path["fast_rows_agreement"]
+    outside = "no sessions" if agreement is None else f"{1 - agreement:.2%}"
+    print(f"\nFast path: margin {fast_path['margin']:.4f} on aligned PC1, "
+          f"{fast_path['fallback_rate']:.1%} of sessions fall back to Model A, "
+          f"threshold-only labels disagree with Model A on {fast_path['threshold_only_disagreement']:.1%} "
+          f"overall and on {outside} outside the margin")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,421 @@
+import os
+import json
+import shutil
+import tempfile
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from dataset_io import categorical, iter_dataset, widen
+from motor_bundle import BUNDLE_FILENAME, calibrate_fast_path, export_bundle
+from motor_student import STUDENT_FILENAME, distill_student, export_student
+from streaming_stats import ColumnSketches, StreamingCovariance, QuantileSketch, refine_percentiles
+from incremental_state import pc1_from_covariance, save_state, update_sample
+from fold_cache import FixedRobustScaler, booster_classifier, xgb_train_params
+from perf_stages import stage
+from train_motor_model_v2 import (
+    ID_COLS, EXCLUDE_FROM_MOTOR, DEFAULT_XGB_PARAMS,
+    infer_column_groups, labels_from_thresholds, build_xgb, print_fast_path, print_student, summarize_cv,
+    student_summary, teacher_proba,
+)
+
+# --------------------------
+# Chunked training path (train_motor_model_v2.py --out_of_core).
+# Every pass re-reads the dataset with iter_dataset(), so memory is bounded by
+# --chunksize plus O(features^2) statistics:
+#   1. scan: kept rows, participant counts, category vocabularies, quantile
+#      sketches -> fill medians and RobustScaler center/scale
+#   2. streaming covariance of the scaled motor features -> PC1 (+ direction)
+#   3. PC1 sketch, then one refinement pass -> exact p10/p30/p60 thresholds
+#   4. labels/latent written out; Model B sparse/dense decision
+#   5. XGBoost CV folds + final models from ExtMemQuantileDMatrix(DataIter)
+# --------------------------
+
+CUTS = (10, 30, 60)
+
+class Columns:
+    def __init__(self, motor, ctx_num, ctx_cat):
+        self.motor, self.ctx_num, self.ctx_cat = motor, ctx_num, ctx_cat
+        self.numeric = motor + ctx_num
+        self.all = motor + ctx_num + ctx_cat
+
+def clean_chunk(chunk, cols, medians=None):
+    # Same row filter / filling as the in-memory trainer, chunk by chunk
+    chunk = chunk.loc[chunk[cols.motor].isna().mean(axis=1) <= 0.25].reset_index(drop=True)
+    chunk[cols.numeric] = widen(chunk, cols.numeric)
+    if medians is not None:
+        for c in cols.numeric:
+            if chunk[c].isna().any():
+                chunk[c] = chunk[c].fillna(medians[c])
+    for c in cols.ctx_cat:
+        chunk[c] = categorical(chunk[c])
+    return chunk
+
+def group_k_fold(group_counts, folds):
+    # GroupKFold's assignment (largest groups first, into the lightest fold),
+    # computed from per-participant counts instead of the full groups array
+    unique = np.array(sorted(group_counts))
+    sizes = np.array([group_counts[g] for g in unique])
+    order = np.argsort(sizes, kind="stable")[::-1]
+    load = np.zeros(folds)
+    fold_of = {}
+    for gi in order:
+        f = int(np.argmin(load))
+        load[f] += sizes[gi]
+        fold_of[unique[gi]] = f + 1
+    return fold_of
+
+def fitted_preprocessor_B(cols, center, scale, vocab, sparse_output):
+    # Model B's ColumnTransformer from streamed statistics: numeric scaling
+    # with the given center/scale, one-hot categories = the full vocabularies
+    # (sorted, as OneHotEncoder would find them), and the output layout
+    # decided on the full table (sparse_output) pinned by sparse_threshold.
+    # Neither step learns anything from the data fit() sees, so one row of
+    # known values is enough to set up column names and widths.
+    categories = [sorted(vocab[c]) or ["unknown"] for c in cols.ctx_cat]
+    prep = ColumnTransformer(
+        transformers=[
+            ("num", FixedRobustScaler(center, scale), cols.numeric),
+            ("cat", OneHotEncoder(categories=categories, handle_unknown="ignore"), cols.ctx_cat),
+        ],
+        remainder="drop",
+        # 1.0: sparse whenever the one-hot block is; 0.0: always dense
+        sparse_threshold=1.0 if sparse_output else 0.0,
+    )
+    row = pd.DataFrame({c: [float(v)] for c, v in zip(cols.numeric, center)})
+    for c, values in zip(cols.ctx_cat, categories):
+        row[c] = values[:1]
+    return prep.fit(row)
+
+class ChunkIter(xgb.DataIter):
+    # Feeds (X, y) chunks to XGBoost's external-memory DMatrix
+    def __init__(self, make_chunks, cache_prefix):
+        self._make = make_chunks
+        self._it = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._it is None:
+            self._it = self._make()
+        for X, y in self._it:
+            if X.shape[0]:
+                input_data(data=X, label=y)
+                return True
+        return False
+
+    def reset(self):
+        self._it = None
+
+class Trainer:
+    def __init__(self, args, recorder=None):
+        self.args = args
+        self.recorder = recorder
+        self.path = args.csv
+        self.chunksize = args.chunksize
+
+    def chunks(self, columns=None):
+        yield from iter_dataset(self.path, columns, chunksize=self.chunksize)
+
+    def clean_chunks(self):
+        for chunk in self.chunks(self.read_cols):
+            chunk = clean_chunk(chunk, self.cols, self.medians)
+            if len(chunk):
+                yield chunk
+
+    # ---- pass 1
+    def scan(self):
+        first = next(self.chunks())
+        for col in ID_COLS:
+            if col not in first.columns:
+                raise ValueError(f"Missing required column: {col}")
+        motor, ctx_num, ctx_cat = infer_column_groups(first)
+        if len(motor) < 10:
+            raise ValueError("Not enough motor features found. Ensure r1_/r2_/r3_/delta_ columns exist.")
+        self.cols = Columns(motor, ctx_num, ctx_cat)
+        self.read_cols = ID_COLS + self.cols.all
+        self.medians = None
+
+        sketches = ColumnSketches(self.cols.numeric)
+        missing = pd.Series(0, index=self.cols.numeric, dtype=np.int64)
+        group_counts = pd.Series(dtype=np.int64)
+        vocab = {c: set() for c in self.cols.ctx_cat}
+        self.n_rows = 0
+        for chunk in self.chunks(self.read_cols):
+            self.n_rows += len(chunk)
+            chunk = clean_chunk(chunk, self.cols)
+            sketches.update(chunk)
+            missing += chunk[self.cols.numeric].isna().sum()
+            group_counts = group_counts.add(chunk["participantId"].astype(str).value_counts(), fill_value=0)
+            for c in self.cols.ctx_cat:
+                vocab[c].update(chunk[c].unique().tolist())
+
+        self.n_kept = int(group_counts.sum())
+        self.group_counts = group_counts.astype(np.int64).to_dict()
+        self.vocab = vocab
+
+        # Fill medians; the filled column = observed values + `missing` copies of the median
+        self.medians = sketches.median()
+        for c in self.cols.numeric:
+            if missing[c] and np.isfinite(self.medians[c]):
+                sketches.sketches[c].update([self.medians[c]], weights=[missing[c]])
+        self.sketches = sketches
+        q25, q50, q75 = (sketches.quantile(q) for q in (0.25, 0.5, 0.75))
+        scale = q75 - q25
+        self.center = q50
+        self.scale = np.where(scale == 0, 1.0, scale)  # RobustScaler's zero-scale handling
+        self.n_motor = len(self.cols.motor)
+
+    def motor_scaled(self, chunk):
+        return (chunk[self.cols.motor].values - self.center[:self.n_motor]) / self.scale[:self.n_motor]
+
+    # ---- pass 2
+    def fit_pca(self):
+        cov = StreamingCovariance(self.n_motor)
+        for chunk in self.clean_chunks():
+            cov.update(self.motor_scaled(chunk))
+        C = cov.covariance()
+        self.motor_cov = cov
+        self.pca = pc1_from_covariance(cov)
+
+        # ensure_pc1_direction: sign of corr(PC1, first reactionTime_mean column),
+        # straight from the covariance (that column is an affine map of its scaled copy)
+        rt = [i for i, c in enumerate(self.cols.motor) if "reactionTime_mean" in c]
+        self.flipped = False
+        if rt:
+            v = self.pca.components_[0]
+            cov_pc1_rt = float(v @ C[:, rt[0]])
+            var_pc1 = float(v @ C @ v)
+            if var_pc1 > 0 and C[rt[0], rt[0]] > 0 and cov_pc1_rt > 0:
+                self.flipped = True
+
+    def pc1_aligned(self, chunk):
+        pc1 = (self.motor_scaled(chunk) - self.pca.mean_) @ self.pca.components_[0]
+        return -pc1 if self.flipped else pc1
+
+    # ---- pass 3
+    def fit_thresholds(self, seed=0):
+        # Also draws the scaled-row sample kept in the incremental state
+        sketch = QuantileSketch()
+        rng = np.random.default_rng(seed)
+        self.motor_sample = None
+        for chunk in self.clean_chunks():
+            sketch.update(self.pc1_aligned(chunk))
+            self.motor_sample = update_sample(self.motor_sample, self.motor_scaled(chunk), rng)
+        exact = refine_percentiles(lambda: (self.pc1_aligned(c) for c in self.clean_chunks()), sketch, CUTS)
+        self.pc1_sketch = sketch
+        self.thresholds = {f"p{p}": float(v) for p, v in zip(CUTS, exact)}
+
+    def labels(self, chunk):
+        return labels_from_thresholds(self.pc1_aligned(chunk), self.thresholds)
+
+    # ---- pass 4
+    def write_sessions(self, path):
+        # Also decides Model B's sparse output the way ColumnTransformer would on
+        # the full table (density of the stacked output < sparse_threshold=0.3)
+        label_counts = np.zeros(4, dtype=np.int64)
+        nnz, first = 0, True
+        for chunk in self.clean_chunks():
+            out = chunk.copy()
+            out["latent_pc1_motor"] = self.pc1_aligned(chunk)
+            out["label_level"] = self.labels(chunk)
+            label_counts += np.bincount(out["label_level"], minlength=4)
+            out.to_csv(path, index=False, mode="w" if first else "a", header=first)
+            first = False
+            num = (chunk[self.cols.numeric].values - self.center) / self.scale
+            nnz += int(np.count_nonzero(num)) + len(chunk) * len(self.cols.ctx_cat)
+        self.label_counts = label_counts
+        width = len(self.cols.numeric) + sum(len(v) for v in self.vocab.values())
+        # (only the one-hot block is sparse; without categorical columns the output stays dense)
+        self.sparse_B = bool(self.cols.ctx_cat) and nnz / max(self.n_kept * width, 1) < 0.3
+
+    # ---- pass 5
+    def make_models(self):
+        self.scaler_A = FixedRobustScaler(self.center[:self.n_motor], self.scale[:self.n_motor]).fit(
+            pd.DataFrame(columns=self.cols.motor))
+        self.prep_B = fitted_preprocessor_B(self.cols, self.center, self.scale, self.vocab, self.sparse_B)
+
+    def features(self, name, chunk):
+        if name == "A":
+            return self.scaler_A.transform(chunk[self.cols.motor])
+        return self.prep_B.transform(chunk[self.cols.all])
+
+    def sample_motor(self, max_rows, seed):
+        # ~max_rows clean rows in one pass: (raw motor features, labels, participantIds)
+        rate = min(1.0, max_rows / max(self.n_kept, 1))
+        rng = np.random.default_rng(seed)
+        X, y, groups = [], [], []
+        for chunk in self.clean_chunks():
+            chunk = chunk.loc[rng.random(len(chunk)) < rate]
+            X.append(chunk[self.cols.motor].values.astype(np.float64))
+            y.append(self.labels(chunk))
+            groups.append(chunk["participantId"].astype(str).values)
+        return np.concatenate(X), np.concatenate(y), np.concatenate(groups)
+
+    def fold_chunks(self, fold_filter=None):
+        for chunk in self.clean_chunks():
+            if fold_filter is not None:
+                chunk = chunk.loc[fold_filter(chunk)].reset_index(drop=True)
+                if not len(chunk):
+                    continue
+            yield chunk
+
+    def iter_xy(self, name, fold_filter=None):
+        for chunk in self.fold_chunks(fold_filter):
+            yield self.features(name, chunk), self.labels(chunk)
+
+    def train_booster(self, name, fold_filter=None):
+        self.n_cached += 1
+        cache = os.path.join(self.cache_dir, f"{name}-{self.n_cached}")
+        it = ChunkIter(lambda: self.iter_xy(name, fold_filter), cache)
+        dtrain = xgb.ExtMemQuantileDMatrix(it)
+        booster = xgb.train(self.xgb_train_params, dtrain, num_boost_round=self.xgb_params["n_estimators"])
+        del dtrain
+        return booster
+
+    def evaluate_cv(self, name, fold_of):
+        # -> (summary, (aligned PC1, out-of-fold labels)) over all held-out rows
+        fold_preds, aligned = [], []
+        for f in range(1, self.args.folds + 1):
+            in_fold = lambda c, f=f: c["participantId"].astype(str).map(fold_of).values == f
+            with stage(self.recorder, f"cv_{name}_fold{f}_fit"):
+                booster = self.train_booster(name, lambda c, m=in_fold: ~m(c))
+            yte, yhat = [], []
+            with stage(self.recorder, f"cv_{name}_fold{f}_predict"):
+                for chunk in self.fold_chunks(in_fold):
+                    pc1 = self.pc1_aligned(chunk)
+                    aligned.append(pc1)
+                    yte.append(labels_from_thresholds(pc1, self.thresholds))
+                    yhat.append(np.argmax(booster.inplace_predict(self.features(name, chunk)), axis=1))
+            fold_preds.append((f, np.concatenate(yte), np.concatenate(yhat)))
+        oof = np.concatenate([yhat for _, _, yhat in fold_preds])
+        return summarize_cv(fold_preds), (np.concatenate(aligned), oof)
+
+    def classifier(self, booster):
+        return booster_classifier(build_xgb(**self.xgb_params), booster)
+
+    def run(self):
+        args = self.args
+        for sub in ("models", "preprocess", "reports"):
+            os.makedirs(os.path.join(args.outdir, sub), exist_ok=True)
+
+        rec = self.recorder
+        with stage(rec, "scan"):
+            self.scan()
+        with stage(rec, "pca"):
+            self.fit_pca()
+        with stage(rec, "labeling"):
+            self.fit_thresholds(args.seed)
+            self.write_sessions(os.path.join(args.outdir, "reports", "sessions_with_latent_and_labels.csv"))
+        self.make_models()
+
+        self.xgb_params = dict(DEFAULT_XGB_PARAMS)
+        self.xgb_train_params = xgb_train_params(build_xgb(**self.xgb_params))
+        self.cache_dir = tempfile.mkdtemp(prefix="motor_xgb_cache_", dir=args.cache_dir)
+        self.n_cached = 0
+        try:
+            fold_of = group_k_fold(self.group_counts, args.folds)
+            with stage(rec, "cv_A"):
+                (foldA, overallA), (aligned, oofA) = self.evaluate_cv("A", fold_of)
+            with stage(rec, "cv_B"):
+                (foldB, overallB), _ = self.evaluate_cv("B", fold_of)
+            fast_path = calibrate_fast_path(aligned, self.thresholds, oofA, args.fast_path_max_disagreement)
+            del aligned, oofA
+            with stage(rec, "final_fit_A"):
+                modelA = Pipeline(steps=[("scaler", self.scaler_A), ("xgb", self.classifier(self.train_booster("A")))])
+            with stage(rec, "final_fit_B"):
+                modelB = Pipeline(steps=[("prep", self.prep_B), ("xgb", self.classifier(self.train_booster("B")))])
+        finally:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+        cols, pca = self.cols, self.pca
+        pca_scaler = FixedRobustScaler(self.center[:self.n_motor], self.scale[:self.n_motor]).fit(
+            np.empty((0, self.n_motor)))
+
+        student = None
+        if args.student != "none":
+            with stage(rec, "distill"):
+                X, y, groups = self.sample_motor(args.student_max_rows, args.seed)
+                student, student_report = distill_student(
+                    X, teacher_proba(modelA, cols.motor), y, groups, pca_scaler, pca, self.flipped,
+                    C=args.student_C, max_rows=args.student_max_rows, seed=args.seed,
+                )
+                del X, y, groups
+        with stage(rec, "dump"):
+            joblib.dump(pca_scaler, os.path.join(args.outdir, "preprocess", "pca_scaler_motor.joblib"))
+            joblib.dump(pca, os.path.join(args.outdir, "preprocess", "pca_pc1_motor.joblib"))
+            joblib.dump(modelA, os.path.join(args.outdir, "models", "modelA_motor_only.joblib"))
+            joblib.dump(modelB, os.path.join(args.outdir, "models", "modelB_motor_plus_context.joblib"))
+            export_bundle(os.path.join(args.outdir, "models", BUNDLE_FILENAME),
+                          cols.motor, pca_scaler, pca, self.flipped, self.thresholds, modelA,
+                          fast_path=fast_path)
+            if student is not None:
+                export_student(os.path.join(args.outdir, "models", STUDENT_FILENAME), student, cols.motor,
+                               self.flipped, self.thresholds, agreement=student_summary(student_report))
+
+            save_state(args.outdir, {
+                "n_sessions": self.n_kept,
+                "motor_cov": self.motor_cov,
+                "pc1_sketch": self.pc1_sketch,
+                "feature_sketches": self.sketches,
+                "label_counts": self.label_counts.tolist(),
+                "motor_sample": self.motor_sample,
+            })
+
+        report = {
+            "seed": args.seed,
+            "pca": {
+                "explained_variance_ratio_pc1": float(pca.explained_variance_ratio_[0]),
+                "pc1_flipped": bool(self.flipped),
+                "motor_feature_columns": cols.motor,
+                "excluded_condition_columns": sorted(list(EXCLUDE_FROM_MOTOR)),
+                "pc1_loadings": {c: float(w) for c, w in zip(cols.motor, pca.components_[0])},
+            },
+            "labeling": {
+                "method": "percentile_bands_on_pca_pc1",
+                "cuts_percentiles": list(CUTS),
+                "thresholds": self.thresholds,
+                "label_names": {
+                    "0": "Typical interaction performance",
+                    "1": "Mild difficulty",
+                    "2": "Moderate difficulty",
+                    "3": "High difficulty",
+                },
+            },
+            "xgb_params": self.xgb_params,
+            "fast_path": fast_path,
+            "modelA_motor_only": {"cv_folds": foldA, "overall": overallA},
+            "modelB_motor_plus_context": {
+                "context_numeric_columns": cols.ctx_num,
+                "context_categorical_columns": cols.ctx_cat,
+                "cv_folds": foldB,
+                "overall": overallB
+            },
+            "out_of_core": {
+                "chunksize": self.chunksize,
+                "n_rows": int(self.n_rows),
+                "n_rows_kept": self.n_kept,
+                "n_participants": len(self.group_counts),
+                "model_b_sparse_input": bool(self.sparse_B),
+            },
+        }
+        if student is not None:
+            report["student"] = student_report
+        if rec is not None:
+            report["timings"] = rec.report()
+        with open(os.path.join(args.outdir, "reports", "training_report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+
+        print("Saved outputs to:", args.outdir)
+        print("\nModel A overall:\n", overallA["classification_report"])
+        print("\nModel B overall:\n", overallB["classification_report"])
+        print_fast_path(fast_path)
+        if student is not None:
+            print_student(student_report)
+
+def train_out_of_core(args, recorder=None):
+    return Trainer(args, recorder).run()